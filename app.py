@@ -5,193 +5,72 @@ Weboberfläche mit Update-Mechanismus und Gerätestatus
 """
 
 import os
+import io
 import sys
 import json
-import subprocess
-import platform
-import psutil
 import requests
-from datetime import datetime
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
 from threading import Thread
 import time
-from device_manager import device_manager
+from card_terminal import TerminalBusy
+from device_jobs import DeviceBusy
+from system_status import devicebox
+from dashboard import DashboardCollector
+from static_assets import StaticAssets
+
+if os.getenv('DEVICEBOX_ROLE') == 'worker':
+    # Produktionsbetrieb (gunicorn.conf.py): Geräte gehören dem Geräte-Prozess
+    from device_rpc import DeviceManagerClient
+    device_manager = DeviceManagerClient()
+else:
+    if __name__ == '__main__':
+        # Direktstart: Render-Prozesse forken, bevor der Geräte-Manager Threads startet
+        from render_pool import start_render_pool
+        start_render_pool()
+    from device_manager import device_manager
 
 app = Flask(__name__)
 
-class DeviceBoxApp:
-    def __init__(self):
-        self.version = "1.0.0"
-        self.github_repo = os.getenv('GITHUB_REPO', 'Musik-Wieland/DeviceBox')
-        self.app_name = os.getenv('APP_NAME', 'devicebox')
-        self.update_in_progress = False
-        
-    def get_system_info(self):
-        """Sammelt Systeminformationen"""
-        try:
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            
-            # Raspberry Pi spezifische Informationen
-            try:
-                with open('/proc/cpuinfo', 'r') as f:
-                    cpuinfo = f.read()
-                    model = [line for line in cpuinfo.split('\n') if 'Model' in line][0].split(':')[1].strip()
-            except:
-                model = "Raspberry Pi"
-            
-            return {
-                'hostname': platform.node(),
-                'platform': platform.platform(),
-                'cpu_model': model,
-                'cpu_percent': cpu_percent,
-                'memory_total': memory.total,
-                'memory_used': memory.used,
-                'memory_percent': memory.percent,
-                'disk_total': disk.total,
-                'disk_used': disk.used,
-                'disk_percent': (disk.used / disk.total) * 100,
-                'uptime': self.get_uptime(),
-                'temperature': self.get_cpu_temperature(),
-                'timestamp': datetime.now().isoformat()
-            }
-        except Exception as e:
-            return {'error': str(e)}
-    
-    def get_uptime(self):
-        """Gibt die Uptime des Systems zurück"""
-        try:
-            with open('/proc/uptime', 'r') as f:
-                uptime_seconds = float(f.read().split()[0])
-                return uptime_seconds
-        except:
-            return 0
-    
-    def get_cpu_temperature(self):
-        """Gibt die CPU-Temperatur zurück (Raspberry Pi)"""
-        try:
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp = int(f.read()) / 1000.0
-                return temp
-        except:
-            return None
-    
-    def check_for_updates(self):
-        """Prüft auf verfügbare Updates mit professionellem Update-System"""
-        try:
-            # Verwende das neue professionelle Update-System
-            import subprocess
-            result = subprocess.run([
-                sys.executable, 
-                os.path.join(os.path.dirname(__file__), 'update_system.py'), 
-                'check'
-            ], capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                try:
-                    import json
-                    update_info = json.loads(result.stdout)
-                    return update_info
-                except json.JSONDecodeError as e:
-                    return {'error': f'JSON-Parse-Fehler: {e}'}
-            else:
-                return {'error': f'Update-Check fehlgeschlagen: {result.stderr}'}
-        except Exception as e:
-            return {'error': str(e)}
-    
-    def perform_update(self):
-        """Führt das Update mit professionellem Update-System durch"""
-        if self.update_in_progress:
-            return {'error': 'Update bereits in Bearbeitung'}
-        
-        self.update_in_progress = True
-        
-        try:
-            # Verwende das neue professionelle Update-System
-            update_script = os.path.join(os.path.dirname(__file__), 'update_system.py')
-            
-            if not os.path.exists(update_script):
-                return {'error': 'Update-Skript nicht gefunden'}
-            
-            # Prüfe ob wir bereits als root laufen
-            if os.geteuid() == 0:
-                # Als root: Direkt ausführen
-                cmd = [sys.executable, update_script, 'update']
-                print(f"Führe Update aus als root: {' '.join(cmd)}")
-            else:
-                # Nicht als root: Mit sudo ausführen
-                # Finde sudo-Pfad
-                sudo_paths = ['/usr/bin/sudo', '/bin/sudo', '/sbin/sudo']
-                sudo_path = None
-                
-                for path in sudo_paths:
-                    if os.path.exists(path):
-                        sudo_path = path
-                        break
-                
-                if sudo_path:
-                    cmd = [sudo_path, sys.executable, update_script, 'update']
-                    print(f"Führe Update aus mit sudo: {' '.join(cmd)}")
-                else:
-                    # Fallback: Versuche sudo über PATH zu finden
-                    cmd = ['sudo', sys.executable, update_script, 'update']
-                    print(f"Führe Update aus mit sudo (PATH): {' '.join(cmd)}")
-            
-            # Führe das Update aus
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            
-            # Logge die Ausgabe für Debugging
-            print(f"Update-Skript Return Code: {result.returncode}")
-            print(f"Update-Skript Ausgabe: {result.stdout}")
-            if result.stderr:
-                print(f"Update-Skript Fehler: {result.stderr}")
-            
-            if result.returncode == 0:
-                # Prüfe ob wirklich ein Update durchgeführt wurde
-                if "System ist bereits aktuell" in result.stdout:
-                    return {'success': True, 'message': 'System ist bereits aktuell'}
-                elif "Update erfolgreich" in result.stdout or "Installation abgeschlossen" in result.stdout:
-                    return {'success': True, 'message': 'Update erfolgreich abgeschlossen'}
-                else:
-                    return {'success': True, 'message': 'Update durchgeführt - siehe Logs für Details'}
-            else:
-                # Detaillierte Fehleranalyse
-                error_msg = result.stderr if result.stderr else result.stdout
-                
-                if "Permission denied" in error_msg:
-                    return {'error': 'Berechtigungsfehler: Update benötigt Root-Rechte. Bitte führen Sie das Update manuell mit "sudo python3 update_system.py update" aus.'}
-                elif "No such file or directory" in error_msg:
-                    return {'error': 'Datei nicht gefunden: Update-Skript oder Abhängigkeiten fehlen.'}
-                elif "Timeout" in error_msg:
-                    return {'error': 'Update-Timeout: Das Update dauerte zu lange.'}
-                else:
-                    return {'error': f'Update fehlgeschlagen: {error_msg}'}
-                    
-        except subprocess.TimeoutExpired:
-            return {'error': 'Update-Timeout: Das Update dauerte zu lange (über 5 Minuten)'}
-        except FileNotFoundError as e:
-            return {'error': f'Datei nicht gefunden: {str(e)}'}
-        except PermissionError as e:
-            return {'error': f'Berechtigungsfehler: {str(e)}'}
-        except Exception as e:
-            return {'error': f'Unerwarteter Fehler: {str(e)}'}
-        finally:
-            self.update_in_progress = False
-
-# Globale App-Instanz
-devicebox = DeviceBoxApp()
+# Gehashte, vorkomprimierte statische Dateien (im Debug-Modus ändern sie sich zur Laufzeit)
+if os.getenv('DEBUG', 'False').lower() != 'true':
+    static_assets = StaticAssets(app)
+
+# Startseite: alle Bereiche gleichzeitig mit eigenem Zeitlimit (Sekunden)
+dashboard = DashboardCollector()
+dashboard.add_section('status', lambda: devicebox.get_system_info(cpu_interval=None), 2)
+dashboard.add_section('updates', devicebox.check_for_updates, 3)
+dashboard.add_section('available_devices', device_manager.get_available_usb_devices, 3)
+dashboard.add_section('devices', device_manager.get_device_changes, 2)
+dashboard.add_section('scanner', device_manager.get_scanner_status, 2)
+
+# In index.html eingebetteter Startzustand und sein maximales Alter in Sekunden
+INITIAL_STATE_SECTIONS = ('status', 'devices', 'scanner')
+INITIAL_STATE_MAX_AGE = float(os.getenv('INITIAL_STATE_MAX_AGE', 5))
 
 @app.route('/')
 def index():
-    """Hauptseite"""
-    return render_template('index.html', version=devicebox.version)
+    """Hauptseite (mit eingebettetem Startzustand, damit sie ohne API-Aufrufe sofort etwas zeigt)"""
+    try:
+        initial_state = dashboard.cached(INITIAL_STATE_SECTIONS, INITIAL_STATE_MAX_AGE)
+    except Exception as e:
+        print(f"Fehler beim Erheben des Startzustands: {e}")
+        initial_state = None
+    return render_template('index.html', version=devicebox.version, initial_state=initial_state)
 
 @app.route('/api/status')
 def api_status():
     """API-Endpoint für Gerätestatus"""
     return jsonify(devicebox.get_system_info())
 
+@app.route('/api/dashboard')
+def api_dashboard():
+    """Alle Daten der Startseite in einer Antwort (optional ?sections=status,devices,...)"""
+    try:
+        names = request.args.get('sections')
+        return jsonify(dashboard.collect(names.split(',') if names else None))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/check-updates')
 def api_check_updates():
     """API-Endpoint für Update-Check"""
@@ -213,10 +92,19 @@ def api_get_devices():
     """API-Endpoint für alle USB-Geräte"""
     return jsonify(device_manager.get_all_devices())
 
+@app.route('/api/devices/changes')
+def api_get_device_changes():
+    """Geänderte Geräte seit ?since=<Revision>&epoch=<Epoche> (ohne Angabe: alle)"""
+    try:
+        return jsonify(device_manager.get_device_changes(request.args.get('since', 0, type=int),
+                                                         request.args.get('epoch')))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/devices/types')
 def api_get_device_types():
     """API-Endpoint für verfügbare Gerätetypen"""
-    return jsonify(device_manager.device_types)
+    return jsonify(device_manager.get_device_types())
 
 @app.route('/api/devices/available')
 def api_get_available_devices():
@@ -282,16 +170,64 @@ def api_disconnect_device(device_id):
 
 @app.route('/api/devices/<device_id>/test', methods=['POST'])
 def api_test_device(device_id):
-    """API-Endpoint zum Testen eines Geräts"""
-    data = request.get_json()
+    """API-Endpoint zum Testen eines Geräts (läuft als Job, Ergebnis über /api/jobs/<job_id>)"""
+    data = request.get_json(silent=True) or {}
     test_type = data.get('test_type', 'test_print')
     
     try:
-        result = device_manager.test_device(device_id, test_type)
-        return jsonify(result)
+        job = device_manager.start_device_test(device_id, test_type)
+        return jsonify({'success': True, 'job_id': job['job_id'], 'job': job}), 202
+    except DeviceBusy as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs')
+def api_get_jobs():
+    """API-Endpoint für die letzten Geräte-Jobs (optional ?device=<Geräte-ID>)"""
+    try:
+        return jsonify(device_manager.get_device_jobs(request.args.get('device')))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs/<job_id>')
+def api_get_job(job_id):
+    """API-Endpoint für Status und Ergebnis eines Geräte-Jobs"""
+    job = device_manager.get_device_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/stream')
+def api_job_stream(job_id):
+    """Server-Sent Events Stream mit den Zustandswechseln eines Geräte-Jobs"""
+    after = device_manager.get_job_event_seq()
+    job = device_manager.get_device_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+    
+    def generate(after, job):
+        yield f"event: state\ndata: {json.dumps(job)}\n\n"
+        if job['state'] == 'done':
+            return
+        while True:
+            events = device_manager.wait_job_events(job_id, after, timeout=15)
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            for event in events:
+                after = event['seq']
+                if event['event'] == 'done':
+                    # Ergebnis vollständig mitsenden
+                    yield f"id: {after}\nevent: done\ndata: {json.dumps(device_manager.get_device_job(job_id))}\n\n"
+                    return
+                yield f"id: {after}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    
+    return Response(stream_with_context(generate(after, job)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/devices/<device_id>/settings', methods=['PUT'])
 def api_update_device_settings(device_id):
     """API-Endpoint zum Aktualisieren der Geräteeinstellungen"""
@@ -318,20 +254,91 @@ def api_get_device_status(device_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/devices/<device_id>/graphics')
+def api_get_device_graphics(device_id):
+    """API-Endpoint für die im Drucker gespeicherten Grafiken (Logos)"""
+    try:
+        return jsonify(device_manager.get_device_graphics(device_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/devices/<device_id>/graphics', methods=['DELETE'])
+def api_reset_device_graphics(device_id):
+    """API-Endpoint zum erneuten Hochladen der Grafiken beim nächsten Druck"""
+    try:
+        success = device_manager.reset_device_graphics(device_id)
+        if success:
+            return jsonify({'success': True})
+        else:
+            return jsonify({'error': 'Gerät nicht gefunden'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scanners')
+def api_get_scanners():
+    """API-Endpoint für Status und Statistik aller konfigurierten Scanner"""
+    try:
+        return jsonify(device_manager.get_all_scanner_status())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/scanner/status')
 def api_get_scanner_status():
-    """API-Endpoint für Datalogic Touch 65 Scanner-Status"""
+    """API-Endpoint für den Scanner-Status (optional ?scanner=<Geräte-ID>)"""
     try:
-        status = device_manager.datalogic_scanner.get_status()
+        status = device_manager.get_scanner_status(request.args.get('scanner'))
+        if not status:
+            return jsonify({'error': 'Scanner nicht gefunden'}), 404
         return jsonify(status)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/scanner/scans')
+def api_get_scanner_scans():
+    """API-Endpoint für die letzten Scans (Nachholen ab Sequenznummer)"""
+    try:
+        after = request.args.get('after', 0, type=int)
+        scans = device_manager.get_scans(after, request.args.get('scanner'))
+        if scans is None:
+            return jsonify({'error': 'Scanner nicht gefunden'}), 404
+        return jsonify(scans)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scanner/stream')
+def api_scanner_stream():
+    """Server-Sent Events Stream mit Live-Scans (alle Scanner oder ?scanner=<Geräte-ID>)"""
+    scanner_id = request.args.get('scanner')
+    last_seq = device_manager.get_scan_seq(scanner_id)
+    if last_seq is None:
+        return jsonify({'error': 'Scanner nicht gefunden'}), 404
+    
+    after = request.args.get('after', type=int)
+    if after is None:
+        after = request.headers.get('Last-Event-ID', type=int)
+    if after is None:
+        # Ohne Angabe nur neue Scans senden
+        after = last_seq
+    
+    def generate(after):
+        yield 'retry: 2000\n\n'
+        while True:
+            scans = device_manager.wait_for_scans(after, timeout=15, scanner_id=scanner_id)
+            if not scans:
+                yield ': keepalive\n\n'
+                continue
+            for scan in scans:
+                after = scan['seq']
+                yield f"id: {after}\nevent: scan\ndata: {json.dumps(scan)}\n\n"
+    
+    return Response(stream_with_context(generate(after)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/scanner/connect', methods=['POST'])
 def api_connect_scanner():
-    """API-Endpoint zum Verbinden des Datalogic Touch 65 Scanners"""
+    """API-Endpoint zum Verbinden eines Scanners (optional ?scanner=<Geräte-ID>)"""
     try:
-        success = device_manager.datalogic_scanner.connect()
+        success = device_manager.connect_scanner(request.args.get('scanner'))
         if success:
             return jsonify({'success': True, 'message': 'Scanner erfolgreich verbunden'})
         else:
@@ -341,13 +348,209 @@ def api_connect_scanner():
 
 @app.route('/api/scanner/disconnect', methods=['POST'])
 def api_disconnect_scanner():
-    """API-Endpoint zum Trennen des Datalogic Touch 65 Scanners"""
+    """API-Endpoint zum Trennen eines Scanners (optional ?scanner=<Geräte-ID>)"""
     try:
-        device_manager.datalogic_scanner.disconnect()
+        if not device_manager.disconnect_scanner(request.args.get('scanner')):
+            return jsonify({'error': 'Scanner nicht gefunden'}), 404
         return jsonify({'success': True, 'message': 'Scanner getrennt'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/catalog')
+def api_get_catalog_status():
+    """API-Endpoint für den Status des lokalen Produktkatalogs"""
+    try:
+        return jsonify(device_manager.get_catalog_status())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/catalog/<code>')
+def api_lookup_product(code):
+    """API-Endpoint für die Artikelsuche per EAN/GTIN"""
+    try:
+        product = device_manager.lookup_product(code)
+        if product is None:
+            return jsonify({'error': 'Artikel nicht gefunden'}), 404
+        return jsonify(product)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/barcode/parse')
+def api_parse_barcode():
+    """API-Endpoint zur Prüfung eines Barcodes (Prüfziffer, GS1-Felder)"""
+    code = request.args.get('code', '')
+    if not code:
+        return jsonify({'error': 'Kein Code übergeben'}), 400
+    try:
+        return jsonify(device_manager.parse_barcode(code))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/catalog/import', methods=['POST'])
+def api_import_catalog():
+    """API-Endpoint zum Import des Produktkatalogs (CSV oder NDJSON als Datei-Upload)"""
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'Keine Datei übergeben'}), 400
+    
+    file_format = request.form.get('format') or os.path.splitext(upload.filename or '')[1].lstrip('.').lower()
+    try:
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        result = device_manager.import_catalog(stream, file_format, upload.filename or '')
+        return jsonify({'success': True, **result})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/devices/<device_id>/inventory', methods=['POST'])
+def api_start_inventory(device_id):
+    """API-Endpoint zum Starten einer Inventursitzung auf einem Scanner"""
+    data = request.get_json(silent=True) or {}
+    try:
+        session = device_manager.start_inventory(device_id, data.get('name', ''),
+                                                 data.get('location', ''),
+                                                 data.get('location_prefix', ''))
+        if session is None:
+            return jsonify({'error': 'Barcode-Scanner nicht gefunden'}), 404
+        return jsonify({'success': True, 'session': session})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/inventory')
+def api_get_inventory_sessions():
+    """API-Endpoint für alle laufenden Inventursitzungen"""
+    try:
+        return jsonify(device_manager.get_inventory_sessions())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/inventory/<session_id>', methods=['GET'])
+def api_get_inventory(session_id):
+    """API-Endpoint für eine Inventursitzung mit Zählständen"""
+    try:
+        session = device_manager.get_inventory(session_id)
+        if session is None:
+            return jsonify({'error': 'Inventursitzung nicht gefunden'}), 404
+        return jsonify(session)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/inventory/<session_id>', methods=['DELETE'])
+def api_close_inventory(session_id):
+    """API-Endpoint zum Beenden einer Inventursitzung"""
+    try:
+        session = device_manager.close_inventory(session_id)
+        if session is None:
+            return jsonify({'error': 'Inventursitzung nicht gefunden'}), 404
+        return jsonify({'success': True, 'session': session})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/inventory/<session_id>/undo', methods=['POST'])
+def api_undo_inventory_scan(session_id):
+    """API-Endpoint zum Zurücknehmen des letzten Scans"""
+    try:
+        result = device_manager.undo_inventory_scan(session_id)
+        if result is None:
+            return jsonify({'success': False, 'error': 'Nichts zum Zurücknehmen'}), 404
+        return jsonify({'success': True, 'undone': result})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/inventory/<session_id>/location', methods=['POST'])
+def api_set_inventory_location(session_id):
+    """API-Endpoint zum Setzen des Lagerorts"""
+    data = request.get_json(silent=True) or {}
+    try:
+        if not device_manager.set_inventory_location(session_id, data.get('location', '')):
+            return jsonify({'error': 'Inventursitzung nicht gefunden'}), 404
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/inventory/<session_id>/export.csv')
+def api_export_inventory(session_id):
+    """API-Endpoint für den CSV-Export einer Inventursitzung"""
+    try:
+        data = device_manager.export_inventory_csv(session_id)
+        if data is None:
+            return jsonify({'error': 'Inventursitzung nicht gefunden'}), 404
+        return Response(data, mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename=inventur_{session_id}.csv'})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/devices/<device_id>/transactions', methods=['POST'])
+def api_start_transaction(device_id):
+    """API-Endpoint zum Starten einer Kartenzahlung (kehrt sofort zurück)"""
+    data = request.get_json(silent=True) or {}
+    if 'amount' not in data:
+        return jsonify({'error': 'Betrag fehlt'}), 400
+    try:
+        transaction = device_manager.start_card_transaction(device_id, data['amount'], data.get('currency'))
+        return jsonify({'success': True, 'transaction': transaction}), 202
+    except TerminalBusy as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/transactions')
+def api_get_transactions():
+    """API-Endpoint für die letzten Kartenzahlungen (optional ?device=<Geräte-ID>)"""
+    try:
+        return jsonify(device_manager.get_card_transactions(request.args.get('device')))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/transactions/<transaction_id>')
+def api_get_transaction(transaction_id):
+    """API-Endpoint für den Status einer Kartenzahlung"""
+    transaction = device_manager.get_card_transaction(transaction_id)
+    if transaction is None:
+        return jsonify({'error': 'Transaktion nicht gefunden'}), 404
+    return jsonify(transaction)
+
+@app.route('/api/transactions/<transaction_id>/cancel', methods=['POST'])
+def api_cancel_transaction(transaction_id):
+    """API-Endpoint zum Abbrechen einer laufenden Kartenzahlung"""
+    try:
+        if not device_manager.cancel_card_transaction(transaction_id):
+            return jsonify({'success': False, 'error': 'Keine laufende Transaktion'}), 409
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/transactions/<transaction_id>/stream')
+def api_transaction_stream(transaction_id):
+    """Server-Sent Events Stream mit dem Fortschritt einer Kartenzahlung"""
+    after = device_manager.get_card_event_seq()
+    transaction = device_manager.get_card_transaction(transaction_id)
+    if transaction is None:
+        return jsonify({'error': 'Transaktion nicht gefunden'}), 404
+    
+    def generate(after, transaction):
+        yield f"event: state\ndata: {json.dumps(transaction)}\n\n"
+        if transaction['state'] == 'done':
+            return
+        while True:
+            events = device_manager.wait_card_events(transaction_id, after, timeout=15)
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            for event in events:
+                after = event['seq']
+                yield f"id: {after}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+                if event['event'] == 'done':
+                    return
+    
+    return Response(stream_with_context(generate(after, transaction)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 if __name__ == '__main__':
     # Konfiguration aus Umgebungsvariablen
     host = os.getenv('HOST', '0.0.0.0')
@@ -355,4 +558,8 @@ if __name__ == '__main__':
     debug = os.getenv('DEBUG', 'False').lower() == 'true'
     
     print(f"DeviceBox v{devicebox.version} startet auf {host}:{port}")
+    if os.getenv('DEVICEBOX_ROLE') != 'worker':
+        # Die Geräte gehören diesem Prozess: POS-Schnittstelle hier anbieten
+        from pos_api import start_pos_api
+        start_pos_api(device_manager)
     app.run(host=host, port=port, debug=debug)
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+DeviceBox ASGI
+Asynchrone Variante der Weboberfläche mit denselben Routen wie app.py:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8080
+
+Live-Streams (Scans, Kartenzahlungen, Geräte-Jobs) warten ohne eigenen
+Thread in der Eventloop, tausende gleichzeitige Clients kosten nur
+Speicher. Gerätetests, Kartenzahlungen und Updates haben eigene async
+Routen; ihre blockierenden Teile laufen in getrennten Pools, damit langsame
+Drucker oder ein Update die übrigen Routen nicht blockieren. Alle übrigen
+Routen beantwortet die Flask-App unverändert in einem kleinen Thread-Pool.
+Die Geräte gehören diesem Prozess (wie bei `python app.py`); für mehrere
+Worker siehe gunicorn.conf.py.
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from urllib.parse import parse_qs
+
+from device_async import AsyncDeviceManager
+from card_terminal import TerminalBusy
+from device_jobs import DeviceBusy
+from system_status import devicebox
+
+# Threads für die Flask-Routen
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 8))
+# Threads für Gerätezugriffe (Drucken, Terminals) und den Katalog-Import
+ASGI_DEVICE_THREADS = int(os.getenv('ASGI_DEVICE_THREADS', 8))
+# Maximale Größe eines Request-Bodys (Katalog-Import)
+ASGI_MAX_BODY = int(os.getenv('ASGI_MAX_BODY', 64 * 1024 * 1024))
+KEEPALIVE_SECONDS = 15
+
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+def _sse(event: Optional[str], data: Any, event_id: Optional[int] = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+class DeviceBoxAsgi:
+    """ASGI-Anwendung: eigene async Routen, sonst Weitergabe an die Flask-App"""
+
+    def __init__(self, wsgi_app, manager, threads: int = ASGI_THREADS,
+                 device_threads: int = ASGI_DEVICE_THREADS):
+        self.wsgi_app = wsgi_app
+        # Getrennte Pools: Flask-Routen, Gerätezugriffe und Updates blockieren sich nicht gegenseitig
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='asgi')
+        self.device_executor = ThreadPoolExecutor(device_threads, thread_name_prefix='asgi-device')
+        # Ein Thread: Updates laufen nacheinander
+        self.update_executor = ThreadPoolExecutor(1, thread_name_prefix='asgi-update')
+        self.devices = AsyncDeviceManager(manager, self.device_executor)
+        self.routes = [
+            ('GET', re.compile(r'^/api/scanner/stream$'), self.scanner_stream),
+            ('GET', re.compile(r'^/api/transactions/(?P<transaction_id>[^/]+)/stream$'), self.transaction_stream),
+            ('GET', re.compile(r'^/api/jobs/(?P<job_id>[^/]+)/stream$'), self.job_stream),
+            ('POST', re.compile(r'^/api/devices/(?P<device_id>[^/]+)/test$'), self.test_device),
+            ('POST', re.compile(r'^/api/devices/(?P<device_id>[^/]+)/transactions$'), self.start_transaction),
+            ('GET', re.compile(r'^/api/check-updates$'), self.check_updates),
+            ('POST', re.compile(r'^/api/update$'), self.update),
+            # Langsame Flask-Routen im Pool für Gerätezugriffe
+            ('POST', re.compile(r'^/api/catalog/import$'), self.call_wsgi_slow),
+        ]
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        for method, pattern, handler in self.routes:
+            match = pattern.match(scope['path'])
+            if match and scope['method'] == method:
+                await handler(scope, receive, send, **match.groupdict())
+                return
+        await self.call_wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if os.getenv('DEVICEBOX_ROLE') != 'worker':
+                    # Im Worker-Betrieb bietet der Geräte-Prozess die POS-Schnittstelle an
+                    from pos_api import start_pos_api
+                    await asyncio.get_running_loop().run_in_executor(
+                        self.executor, start_pos_api, self.devices.manager)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for executor in (self.executor, self.device_executor, self.update_executor):
+                    executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # --- Hilfsfunktionen -------------------------------------------------
+
+    @staticmethod
+    def query(scope: Dict) -> Dict[str, str]:
+        return {key: values[-1] for key, values in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+
+    @staticmethod
+    def header(scope: Dict, name: bytes) -> Optional[str]:
+        for key, value in scope.get('headers', []):
+            if key == name:
+                return value.decode('latin-1')
+        return None
+
+    @staticmethod
+    async def read_body(receive: Callable, send: Callable) -> Optional[bytes]:
+        """Liest den Request-Body (None: Client getrennt oder Anfrage zu groß und beantwortet)"""
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body += message.get('body', b'')
+            if len(body) > ASGI_MAX_BODY:
+                await DeviceBoxAsgi.send_json(send, {'error': 'Anfrage zu groß'}, 413)
+                return None
+            if not message.get('more_body'):
+                return bytes(body)
+
+    async def read_json(self, receive: Callable, send: Callable) -> Optional[Dict]:
+        """Body als JSON-Objekt (wie request.get_json(silent=True) or {})"""
+        body = await self.read_body(receive, send)
+        if body is None:
+            return None
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            data = {}
+        return data if isinstance(data, dict) else {}
+
+    @staticmethod
+    async def send_json(send: Callable, data: Any, status: int = 200):
+        body = json.dumps(data).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    async def stream(receive: Callable, send: Callable, events: AsyncIterator[bytes]):
+        """Sendet einen Event-Stream, bis der Generator endet oder der Client trennt"""
+        await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+
+        async def pump():
+            async for chunk in events:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        pump_task = asyncio.ensure_future(pump())
+        watch_task = asyncio.ensure_future(disconnected())
+        try:
+            done, _ = await asyncio.wait({pump_task, watch_task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            pump_task.cancel()
+            watch_task.cancel()
+        if pump_task in done:
+            # Stream regulär beendet (z.B. Zahlung abgeschlossen)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    # --- Live-Streams ----------------------------------------------------
+
+    async def scanner_stream(self, scope: Dict, receive: Callable, send: Callable):
+        """Server-Sent Events Stream mit Live-Scans (alle Scanner oder ?scanner=<Geräte-ID>)"""
+        query = self.query(scope)
+        scanner_id = query.get('scanner')
+        last_seq = await self.devices.get_scan_seq(scanner_id)
+        if last_seq is None:
+            await self.send_json(send, {'error': 'Scanner nicht gefunden'}, 404)
+            return
+
+        after = query.get('after') or self.header(scope, b'last-event-id')
+        # Ohne Angabe nur neue Scans senden
+        after = int(after) if after and after.isdigit() else last_seq
+
+        async def events(after):
+            yield b'retry: 2000\n\n'
+            while True:
+                scans = await self.devices.wait_for_scans(after, KEEPALIVE_SECONDS, scanner_id)
+                if not scans:
+                    yield b': keepalive\n\n'
+                    continue
+                for scan in scans:
+                    after = scan['seq']
+                    yield _sse('scan', scan, after)
+
+        await self.stream(receive, send, events(after))
+
+    async def transaction_stream(self, scope: Dict, receive: Callable, send: Callable, transaction_id: str):
+        """Server-Sent Events Stream mit dem Fortschritt einer Kartenzahlung"""
+        after = await self.devices.get_card_event_seq()
+        transaction = await self.devices.get_card_transaction(transaction_id)
+        if transaction is None:
+            await self.send_json(send, {'error': 'Transaktion nicht gefunden'}, 404)
+            return
+
+        async def events(after):
+            yield _sse('state', transaction)
+            if transaction['state'] == 'done':
+                return
+            while True:
+                updates = await self.devices.wait_card_events(transaction_id, after, KEEPALIVE_SECONDS)
+                if not updates:
+                    yield b': keepalive\n\n'
+                    continue
+                for event in updates:
+                    after = event['seq']
+                    yield _sse(event['event'], event, after)
+                    if event['event'] == 'done':
+                        return
+
+        await self.stream(receive, send, events(after))
+
+    async def job_stream(self, scope: Dict, receive: Callable, send: Callable, job_id: str):
+        """Server-Sent Events Stream mit den Zustandswechseln eines Geräte-Jobs"""
+        after = await self.devices.get_job_event_seq()
+        job = await self.devices.get_device_job(job_id)
+        if job is None:
+            await self.send_json(send, {'error': 'Job nicht gefunden'}, 404)
+            return
+
+        async def events(after):
+            yield _sse('state', job)
+            if job['state'] == 'done':
+                return
+            while True:
+                updates = await self.devices.wait_job_events(job_id, after, KEEPALIVE_SECONDS)
+                if not updates:
+                    yield b': keepalive\n\n'
+                    continue
+                for event in updates:
+                    after = event['seq']
+                    if event['event'] == 'done':
+                        # Ergebnis vollständig mitsenden
+                        yield _sse('done', await self.devices.get_device_job(job_id), after)
+                        return
+                    yield _sse(event['event'], event, after)
+
+        await self.stream(receive, send, events(after))
+
+    # --- Geräte und Updates -----------------------------------------------
+
+    async def test_device(self, scope: Dict, receive: Callable, send: Callable, device_id: str):
+        """Gerätetest als Job (wie POST /api/devices/<id>/test der Flask-App)"""
+        data = await self.read_json(receive, send)
+        if data is None:
+            return
+        try:
+            job = await self.devices.start_device_test(device_id, data.get('test_type', 'test_print'))
+            await self.send_json(send, {'success': True, 'job_id': job['job_id'], 'job': job}, 202)
+        except DeviceBusy as e:
+            await self.send_json(send, {'success': False, 'error': str(e)}, 409)
+        except ValueError as e:
+            await self.send_json(send, {'success': False, 'error': str(e)}, 404)
+        except Exception as e:
+            await self.send_json(send, {'error': str(e)}, 500)
+
+    async def start_transaction(self, scope: Dict, receive: Callable, send: Callable, device_id: str):
+        """Startet eine Kartenzahlung (wie POST /api/devices/<id>/transactions der Flask-App)"""
+        data = await self.read_json(receive, send)
+        if data is None:
+            return
+        if 'amount' not in data:
+            await self.send_json(send, {'error': 'Betrag fehlt'}, 400)
+            return
+        try:
+            transaction = await self.devices.start_card_transaction(device_id, data['amount'], data.get('currency'))
+            await self.send_json(send, {'success': True, 'transaction': transaction}, 202)
+        except TerminalBusy as e:
+            await self.send_json(send, {'success': False, 'error': str(e)}, 409)
+        except ValueError as e:
+            await self.send_json(send, {'success': False, 'error': str(e)}, 400)
+        except Exception as e:
+            await self.send_json(send, {'error': str(e)}, 500)
+
+    async def check_updates(self, scope: Dict, receive: Callable, send: Callable):
+        loop = asyncio.get_running_loop()
+        await self.send_json(send, await loop.run_in_executor(self.update_executor, devicebox.check_for_updates))
+
+    async def update(self, scope: Dict, receive: Callable, send: Callable):
+        """git pull und Abhängigkeiten im eigenen Thread, die übrigen Routen bleiben erreichbar"""
+        if await self.read_body(receive, send) is None:
+            return
+        loop = asyncio.get_running_loop()
+        await self.send_json(send, await loop.run_in_executor(self.update_executor, devicebox.perform_update))
+
+    # --- Flask-Routen ----------------------------------------------------
+
+    async def call_wsgi(self, scope: Dict, receive: Callable, send: Callable,
+                        executor: Optional[ThreadPoolExecutor] = None):
+        """Beantwortet eine Anfrage mit der Flask-App im Thread-Pool"""
+        body = await self.read_body(receive, send)
+        if body is None:
+            return
+
+        executor = executor or self.executor
+        environ = self._environ(scope, body)
+        loop = asyncio.get_running_loop()
+        status, headers, first, chunks = await loop.run_in_executor(executor, self._run_wsgi, environ)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        try:
+            # Weitere Teile (z.B. größere Dateien) einzeln holen statt die Antwort zu puffern
+            while chunks is not None:
+                await send({'type': 'http.response.body', 'body': first, 'more_body': True})
+                first = await loop.run_in_executor(executor, next, chunks, None)
+                if first is None:
+                    first = b''
+                    break
+            await send({'type': 'http.response.body', 'body': first})
+        finally:
+            if chunks is not None and hasattr(chunks, 'close'):
+                await loop.run_in_executor(executor, chunks.close)
+
+    async def call_wsgi_slow(self, scope: Dict, receive: Callable, send: Callable):
+        await self.call_wsgi(scope, receive, send, self.device_executor)
+
+    def _run_wsgi(self, environ: Dict):
+        """Status, Header, erster Teil und (falls es weitere gibt) der Iterator der Antwort"""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(key.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for key, value in headers]
+
+        result = self.wsgi_app(environ, start_response)
+        if isinstance(result, (list, tuple)) and len(result) <= 1:
+            return response['status'], response['headers'], b''.join(result), None
+        chunks = iter(result)
+        first = next(chunks, None)
+        if first is None:
+            if hasattr(result, 'close'):
+                result.close()
+            return response['status'], response['headers'], b'', None
+        return response['status'], response['headers'], first, _ClosingIterator(chunks, result)
+
+    @staticmethod
+    def _environ(scope: Dict, body: bytes) -> Dict:
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for key, value in scope.get('headers', []):
+            name = key.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                name = f'HTTP_{name}'
+                environ[name] = f"{environ[name]},{value}" if name in environ else value
+        return environ
+
+
+class _ClosingIterator:
+    """Iterator über die Teile einer WSGI-Antwort, close() schließt das Ergebnis"""
+
+    def __init__(self, chunks, result):
+        self.chunks = chunks
+        self.result = result
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        return next(self.chunks)
+
+    def close(self):
+        if hasattr(self.result, 'close'):
+            self.result.close()
+
+
+def create_app() -> DeviceBoxAsgi:
+    if os.getenv('DEVICEBOX_ROLE') != 'worker':
+        # Render-Prozesse forken, bevor der Import von app den Geräte-Manager und seine Threads startet
+        from render_pool import start_render_pool
+        start_render_pool()
+    from app import app as flask_app, device_manager
+    return DeviceBoxAsgi(flask_app, device_manager)
+
+
+app = create_app()
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        print("uvicorn ist nicht installiert: pip install uvicorn")
+        sys.exit(1)
+    uvicorn.run(app, host=os.getenv('HOST', '0.0.0.0'), port=int(os.getenv('PORT', 8080)))
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Kartenterminal
+Asynchrone Transaktions-Engine für EC-Kartengeräte: höchstens eine laufende
+Transaktion pro Terminal, erzwungenes Timeout, Abbruch über die API und
+Fortschrittsmeldungen über einen Ereignis-Ringpuffer (Live-Stream)
+"""
+
+import uuid
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from event_ring import EventRing
+from device_loop import DeviceLoop, device_loop
+
+# Zustände einer Transaktion
+STATE_IDLE = 'idle'
+STATE_WAITING_FOR_CARD = 'waiting_for_card'
+STATE_AUTHORIZING = 'authorizing'
+STATE_DONE = 'done'
+
+# Ergebnis einer abgeschlossenen Transaktion
+OUTCOME_APPROVED = 'approved'
+OUTCOME_DECLINED = 'declined'
+OUTCOME_CANCELLED = 'cancelled'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_ERROR = 'error'
+
+ProgressCallback = Callable[[str, str], None]
+
+
+class TerminalBusy(Exception):
+    """Am Terminal läuft bereits eine Transaktion"""
+
+
+class TerminalDriver:
+    """
+    Schnittstelle eines Terminal-Protokolls.
+
+    authorize() meldet Zwischenstände über progress(state, message) und gibt
+    ein Dict mit mindestens 'approved' (bool) zurück. abort() wird bei Abbruch
+    oder Timeout aufgerufen und soll die Zahlung am Terminal beenden.
+    """
+
+    name = 'generic'
+
+    async def authorize(self, amount_cents: int, currency: str, progress: ProgressCallback) -> Dict:
+        raise NotImplementedError
+
+    async def abort(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def get_status(self) -> Dict:
+        return {'protocol': self.name}
+
+
+class DemoTerminalDriver(TerminalDriver):
+    """Simuliertes Terminal für Vorführung und Tests ohne Hardware (Einstellung protocol: demo)"""
+
+    name = 'demo'
+
+    def __init__(self, card_delay: float = 1.5, authorize_delay: float = 1.5):
+        self.card_delay = card_delay
+        self.authorize_delay = authorize_delay
+        self._counter = 0
+
+    async def authorize(self, amount_cents: int, currency: str, progress: ProgressCallback) -> Dict:
+        progress(STATE_WAITING_FOR_CARD, 'Bitte Karte einstecken oder auflegen')
+        await asyncio.sleep(self.card_delay)
+        progress(STATE_AUTHORIZING, 'Autorisierung läuft')
+        await asyncio.sleep(self.authorize_delay)
+        self._counter += 1
+        return {
+            'approved': True,
+            'simulated': True,
+            'receipt_number': self._counter,
+            'message': 'Zahlung erfolgt (Demo)'
+        }
+
+
+class Transaction:
+    """Zustand einer Kartenzahlung"""
+
+    def __init__(self, device_id: str, amount_cents: int, currency: str, timeout: float):
+        self.transaction_id = uuid.uuid4().hex[:16]
+        self.device_id = device_id
+        self.amount_cents = amount_cents
+        self.currency = currency
+        self.timeout = timeout
+        self.state = STATE_IDLE
+        self.outcome = None
+        self.message = ''
+        self.result = {}
+        self.created_at = datetime.now().isoformat()
+        self.finished_at = None
+        self.task = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'transaction_id': self.transaction_id,
+            'device_id': self.device_id,
+            'amount': self.amount_cents / 100,
+            'currency': self.currency,
+            'timeout': self.timeout,
+            'state': self.state,
+            'outcome': self.outcome,
+            'message': self.message,
+            'result': self.result,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+
+class CardTerminalEngine:
+    """Führt Transaktionen als Tasks in der Device-Loop aus"""
+
+    def __init__(self, loop: DeviceLoop = device_loop, max_tracked: int = 200):
+        self.loop = loop
+        self.max_tracked = max_tracked
+        self.transactions = OrderedDict()
+        # Geräte-ID -> laufende Transaktion
+        self.active = {}
+        self.events = EventRing(512)
+        self._lock = threading.Lock()
+
+    def start(self, device_id: str, driver: TerminalDriver, amount_cents: int,
+              currency: str = 'EUR', timeout: float = 30.0) -> Dict:
+        """Startet eine Transaktion und kehrt sofort zurück"""
+        if amount_cents <= 0:
+            raise ValueError('Betrag muss größer als 0 sein')
+        with self._lock:
+            if device_id in self.active:
+                raise TerminalBusy('Am Terminal läuft bereits eine Transaktion')
+            transaction = Transaction(device_id, amount_cents, currency, timeout)
+            self.active[device_id] = transaction
+            self.transactions[transaction.transaction_id] = transaction
+            while len(self.transactions) > self.max_tracked:
+                oldest_id, oldest = next(iter(self.transactions.items()))
+                if oldest.state != STATE_DONE:
+                    break
+                del self.transactions[oldest_id]
+
+        self._emit(transaction, 'started', f'Transaktion über {amount_cents / 100:.2f} {currency} gestartet')
+        self.loop.call_soon(self._spawn, transaction, driver)
+        return transaction.to_dict()
+
+    def _spawn(self, transaction: Transaction, driver: TerminalDriver):
+        transaction.task = asyncio.ensure_future(self._run(transaction, driver))
+
+    async def _run(self, transaction: Transaction, driver: TerminalDriver):
+        def progress(state: str, message: str):
+            transaction.state = state
+            transaction.message = message
+            self._emit(transaction, 'progress', message)
+
+        try:
+            result = await asyncio.wait_for(
+                driver.authorize(transaction.amount_cents, transaction.currency, progress),
+                transaction.timeout)
+            transaction.result = result
+            transaction.outcome = OUTCOME_APPROVED if result.get('approved') else OUTCOME_DECLINED
+            transaction.message = result.get('message') or (
+                'Zahlung erfolgt' if result.get('approved') else 'Zahlung abgelehnt')
+        except asyncio.TimeoutError:
+            transaction.outcome = OUTCOME_TIMEOUT
+            transaction.message = f'Zeitüberschreitung nach {transaction.timeout:g} Sekunden'
+            await self._abort(driver)
+        except asyncio.CancelledError:
+            transaction.outcome = OUTCOME_CANCELLED
+            transaction.message = 'Transaktion abgebrochen'
+            await self._abort(driver)
+        except Exception as e:
+            transaction.outcome = OUTCOME_ERROR
+            transaction.message = f'Fehler: {e}'
+        finally:
+            transaction.state = STATE_DONE
+            transaction.finished_at = datetime.now().isoformat()
+            with self._lock:
+                if self.active.get(transaction.device_id) is transaction:
+                    del self.active[transaction.device_id]
+            self._emit(transaction, 'done', transaction.message)
+
+    @staticmethod
+    async def _abort(driver: TerminalDriver):
+        try:
+            await asyncio.wait_for(driver.abort(), 10)
+        except Exception as e:
+            print(f"Abbruch am Terminal fehlgeschlagen: {e}")
+
+    def _emit(self, transaction: Transaction, event: str, message: str):
+        self.events.append({
+            'event': event,
+            'transaction_id': transaction.transaction_id,
+            'device_id': transaction.device_id,
+            'state': transaction.state,
+            'outcome': transaction.outcome,
+            'message': message,
+            'time': time.time()
+        })
+
+    def cancel(self, transaction_id: str) -> bool:
+        """Bricht eine laufende Transaktion ab"""
+        transaction = self.transactions.get(transaction_id)
+        if transaction is None or transaction.state == STATE_DONE:
+            return False
+        self.loop.call_soon(self._cancel_task, transaction)
+        return True
+
+    @staticmethod
+    def _cancel_task(transaction: Transaction):
+        if transaction.task is not None:
+            transaction.task.cancel()
+
+    def get(self, transaction_id: str) -> Optional[Dict]:
+        transaction = self.transactions.get(transaction_id)
+        return transaction.to_dict() if transaction else None
+
+    def get_active(self, device_id: str) -> Optional[Dict]:
+        transaction = self.active.get(device_id)
+        return transaction.to_dict() if transaction else None
+
+    def recent(self, device_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Die letzten Transaktionen (neueste zuerst)"""
+        with self._lock:
+            transactions = [t for t in reversed(self.transactions.values())
+                            if device_id is None or t.device_id == device_id]
+        return [t.to_dict() for t in transactions[:limit]]
+
+    def get_event_seq(self) -> int:
+        return self.events.last_seq
+
+    def wait_events(self, transaction_id: str, after: int, timeout: float = 15.0) -> List[Dict]:
+        """Wartet auf Fortschrittsmeldungen einer Transaktion (für Live-Streams)"""
+        deadline = time.time() + timeout
+        while True:
+            events = self.events.wait(after, max(0.0, deadline - time.time()))
+            matching = [event for event in events if event['transaction_id'] == transaction_id]
+            if matching or not events or time.time() >= deadline:
+                return matching
+            after = events[-1]['seq']
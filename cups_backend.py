@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+DeviceBox CUPS Backend
+Druckt über eine dauerhafte pycups-Verbindung direkt aus dem Speicher
+(ohne temporäre Dateien und ohne lp-Prozess) und verfolgt Druckaufträge
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+try:
+    import cups
+    CUPS_AVAILABLE = True
+except ImportError:
+    CUPS_AVAILABLE = False
+
+# Druckerstatus für Statusabfragen höchstens so oft (Sekunden) bei CUPS abfragen
+CUPS_STATUS_MAX_AGE = float(os.getenv('CUPS_STATUS_MAX_AGE', 5))
+
+# IPP job-state (RFC 8011)
+JOB_STATES = {
+    3: 'pending',
+    4: 'held',
+    5: 'processing',
+    6: 'stopped',
+    7: 'canceled',
+    8: 'aborted',
+    9: 'completed'
+}
+FINAL_JOB_STATES = ('canceled', 'aborted', 'completed')
+
+# IPP printer-state
+PRINTER_STATES = {
+    3: 'idle',
+    4: 'processing',
+    5: 'stopped'
+}
+
+# Verständliche Texte für printer-state-reasons (ohne -error/-warning/-report)
+STATE_REASON_TEXTS = {
+    'media-empty': 'Papier leer',
+    'media-needed': 'Papier einlegen',
+    'media-jam': 'Papierstau',
+    'media-low': 'Papier fast leer',
+    'offline': 'Drucker offline',
+    'connecting-to-device': 'Verbindung zum Drucker wird aufgebaut',
+    'paused': 'Drucker angehalten',
+    'door-open': 'Klappe offen',
+    'cover-open': 'Abdeckung offen',
+    'toner-low': 'Toner niedrig',
+    'toner-empty': 'Toner leer',
+    'marker-supply-low': 'Verbrauchsmaterial niedrig',
+    'marker-supply-empty': 'Verbrauchsmaterial leer',
+    'input-tray-missing': 'Papierfach fehlt',
+    'output-area-full': 'Ausgabefach voll',
+    'shutdown': 'Drucker ausgeschaltet',
+    'timed-out': 'Zeitüberschreitung',
+}
+
+PRINTER_ATTRIBUTES = [
+    'printer-state',
+    'printer-state-reasons',
+    'printer-state-message',
+    'printer-is-accepting-jobs'
+]
+JOB_ATTRIBUTES = [
+    'job-state',
+    'job-state-reasons',
+    'job-printer-state-message',
+    'time-at-completed'
+]
+
+
+class CupsBackend:
+    """Dauerhafte CUPS-Verbindung mit Auftragsverfolgung (thread-sicher)"""
+
+    def __init__(self, max_tracked_jobs: int = 200):
+        self.max_tracked_jobs = max_tracked_jobs
+        self.jobs = OrderedDict()
+        self._connection = None
+        self._lock = threading.RLock()
+        # Drucker -> (Zeitpunkt, Status mit Aufträgen) für cached_status()
+        self._status_cache = {}
+        self._refreshing = set()
+        self._status_lock = threading.Lock()
+
+    def _get_connection(self):
+        """Liefert die bestehende Verbindung oder baut eine neue auf"""
+        if self._connection is None:
+            self._connection = cups.Connection()
+        return self._connection
+
+    def _call(self, method: str, *args, **kwargs):
+        """Ruft eine Verbindungsmethode auf, bei Verbindungsfehlern einmal neu verbunden"""
+        with self._lock:
+            try:
+                return getattr(self._get_connection(), method)(*args, **kwargs)
+            except (RuntimeError, cups.HTTPError):
+                # Verbindung verloren (z.B. cupsd neu gestartet)
+                self._connection = None
+                return getattr(self._get_connection(), method)(*args, **kwargs)
+
+    def resolve_printer(self, printer: Optional[str]) -> str:
+        """Liefert den Druckernamen (None oder 'default' = Standarddrucker)"""
+        if printer and printer != 'default':
+            return printer
+        default = self._call('getDefault')
+        if not default:
+            raise ValueError('Kein Standarddrucker in CUPS eingerichtet')
+        return default
+
+    def submit(self, printer: Optional[str], data: bytes, title: str = 'DeviceBox',
+               document_format: str = 'text/plain', options: Optional[Dict] = None) -> int:
+        """Übergibt ein Dokument aus dem Speicher an CUPS und gibt die Job-ID zurück"""
+        printer = self.resolve_printer(printer)
+        with self._lock:
+            try:
+                job_id = self._call('createJob', printer, title, options or {})
+            except cups.IPPError as e:
+                raise IOError(f'CUPS hat den Auftrag abgelehnt: {e}')
+
+            connection = self._get_connection()
+            status = connection.startDocument(printer, job_id, title, document_format, 1)
+            if status != cups.HTTP_CONTINUE:
+                connection.cancelJob(job_id)
+                raise IOError(f'CUPS Dokument konnte nicht gestartet werden (HTTP {status})')
+
+            status = connection.writeRequestData(data, len(data))
+            if status != cups.HTTP_CONTINUE:
+                connection.cancelJob(job_id)
+                raise IOError(f'CUPS Dokument konnte nicht übertragen werden (HTTP {status})')
+
+            status = connection.finishDocument(printer)
+            if status != cups.IPP_OK:
+                raise IOError(f'CUPS Auftrag konnte nicht abgeschlossen werden (IPP {status})')
+
+            self.jobs[job_id] = {
+                'job_id': job_id,
+                'printer': printer,
+                'title': title,
+                'size': len(data),
+                'state': 'pending',
+                'submitted_at': datetime.now().isoformat()
+            }
+            while len(self.jobs) > self.max_tracked_jobs:
+                self.jobs.popitem(last=False)
+        with self._status_lock:
+            # Neuer Auftrag: Auftragslisten beim nächsten Status neu abfragen
+            self._status_cache.clear()
+        return job_id
+
+    def job_status(self, job_id: int) -> Dict:
+        """Aktualisiert und liefert den Status eines Auftrags"""
+        with self._lock:
+            job = self.jobs.get(job_id, {'job_id': job_id})
+            if job.get('state') in FINAL_JOB_STATES:
+                return dict(job)
+            try:
+                attributes = self._call('getJobAttributes', job_id,
+                                        requested_attributes=JOB_ATTRIBUTES)
+            except cups.IPPError as e:
+                job['error'] = str(e)
+                return dict(job)
+
+            job['state'] = JOB_STATES.get(attributes.get('job-state'), 'unknown')
+            reasons = attributes.get('job-state-reasons', [])
+            job['state_reasons'] = reasons if isinstance(reasons, list) else [reasons]
+            if attributes.get('job-printer-state-message'):
+                job['message'] = attributes['job-printer-state-message']
+            return dict(job)
+
+    def recent_jobs(self, printer: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """Die zuletzt übergebenen Aufträge (neueste zuerst) mit aktuellem Status"""
+        with self._lock:
+            job_ids = [job_id for job_id, job in reversed(self.jobs.items())
+                       if printer is None or job['printer'] == printer][:limit]
+        return [self.job_status(job_id) for job_id in job_ids]
+
+    def cancel(self, job_id: int) -> bool:
+        """Bricht einen Auftrag ab"""
+        try:
+            self._call('cancelJob', job_id)
+            return True
+        except cups.IPPError as e:
+            print(f"CUPS Auftrag {job_id} konnte nicht abgebrochen werden: {e}")
+            return False
+
+    def printer_status(self, printer: Optional[str]) -> Dict:
+        """Status eines Druckers inkl. printer-state-reasons (Papier leer, offline, ...)"""
+        try:
+            printer = self.resolve_printer(printer)
+            attributes = self._call('getPrinterAttributes', printer,
+                                    requested_attributes=PRINTER_ATTRIBUTES)
+        except Exception as e:
+            return {'printer': printer, 'state': 'unknown', 'error': str(e)}
+
+        reasons = attributes.get('printer-state-reasons', [])
+        if not isinstance(reasons, list):
+            reasons = [reasons]
+        reasons = [reason for reason in reasons if reason and reason != 'none']
+
+        problems = []
+        for reason in reasons:
+            for suffix in ('-error', '-warning', '-report'):
+                if reason.endswith(suffix):
+                    reason = reason[:-len(suffix)]
+                    break
+            problems.append(STATE_REASON_TEXTS.get(reason, reason))
+
+        return {
+            'printer': printer,
+            'state': PRINTER_STATES.get(attributes.get('printer-state'), 'unknown'),
+            'state_reasons': reasons,
+            'problems': problems,
+            'message': attributes.get('printer-state-message', ''),
+            'accepting_jobs': bool(attributes.get('printer-is-accepting-jobs', False))
+        }
+
+    def cached_status(self, printer: Optional[str], max_age: float = CUPS_STATUS_MAX_AGE) -> Dict:
+        """
+        printer_status() mit den letzten Aufträgen, höchstens alle max_age Sekunden abgefragt.
+
+        Läuft bereits eine Abfrage für den Drucker, erhalten weitere Aufrufer
+        den vorherigen Stand, statt auf ein langsames cupsd zu warten.
+        """
+        key = printer or 'default'
+        with self._status_lock:
+            entry = self._status_cache.get(key)
+            if entry is not None and (time.monotonic() - entry[0] <= max_age or key in self._refreshing):
+                return dict(entry[1], age=round(time.monotonic() - entry[0], 1))
+            self._refreshing.add(key)
+        try:
+            status = self.printer_status(printer)
+            status['jobs'] = self.recent_jobs(status['printer'])
+        finally:
+            with self._status_lock:
+                self._refreshing.discard(key)
+        with self._status_lock:
+            self._status_cache[key] = (time.monotonic(), status)
+        return dict(status, age=0.0)
+
+
+# Globale Instanz
+cups_backend = CupsBackend() if CUPS_AVAILABLE else None
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Dashboard
+Sammelt alle Bereiche der Startseite (System, Updates, Geräte, Scanner)
+gleichzeitig. Jeder Bereich hat ein eigenes Zeitlimit; ist er bis dahin
+nicht fertig, fehlt er in der Antwort und wird unter 'errors' gemeldet.
+Ein noch laufender Bereich wird von der nächsten Abfrage übernommen statt
+neu gestartet, damit gleichzeitige Seitenaufrufe lsusb oder den
+Update-Check nicht vervielfachen.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class DashboardCollector:
+    """Führt die registrierten Bereiche parallel aus"""
+
+    def __init__(self, workers: int = 6):
+        self.workers = workers
+        # Name -> (Funktion, Zeitlimit in Sekunden)
+        self.sections = OrderedDict()
+        self._inflight = {}
+        # Bereichsliste -> (Zeitpunkt, Ergebnis) für cached()
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def add_section(self, name: str, func: Callable[[], Any], timeout: float):
+        self.sections[name] = (func, timeout)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='dashboard')
+        return self._executor
+
+    def _start(self, name: str) -> Future:
+        with self._lock:
+            future = self._inflight.get(name)
+            if future is not None:
+                return future
+            future = self._get_executor().submit(self.sections[name][0])
+            self._inflight[name] = future
+        # Außerhalb der Sperre: bei bereits fertigem Future läuft der Callback sofort
+        future.add_done_callback(lambda done: self._finished(name, done))
+        return future
+
+    def _finished(self, name: str, future: Future):
+        with self._lock:
+            if self._inflight.get(name) is future:
+                del self._inflight[name]
+
+    def collect(self, names: Optional[Iterable[str]] = None) -> Dict:
+        """Ergebnisse aller (bzw. der genannten) Bereiche; fehlende stehen in 'errors'"""
+        names = [name for name in (names or self.sections) if name in self.sections]
+        started = time.monotonic()
+        futures = [(name, self._start(name)) for name in names]
+
+        sections = {}
+        errors = {}
+        for name, future in futures:
+            deadline = started + self.sections[name][1]
+            try:
+                sections[name] = future.result(max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                errors[name] = 'Zeitüberschreitung'
+            except Exception as e:
+                errors[name] = str(e)
+
+        return {
+            'sections': sections,
+            'errors': errors,
+            'duration': round(time.monotonic() - started, 3)
+        }
+
+    def cached(self, names: Iterable[str], max_age: float) -> Dict:
+        """Wie collect(), aber höchstens alle max_age Sekunden neu erhoben ('age' = Alter in Sekunden)"""
+        key = tuple(names)
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is None or time.monotonic() - entry[0] > max_age:
+            entry = (time.monotonic(), self.collect(key))
+            with self._lock:
+                self._cache[key] = entry
+        return dict(entry[1], age=round(time.monotonic() - entry[0], 3))
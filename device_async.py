@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Async-Gerätezugriff
+Async-Fassade um den Geräte-Manager für Eventloops (ASGI, Geräte-RPC).
+Warteaufrufe der Live-Streams belegen keinen Thread: ein Listener pro
+EventRing weckt alle Wartenden in der Loop. Im Worker-Betrieb (Geräte im
+Geräte-Prozess) laufen alle Aufrufe über eine asynchrone RPC-Verbindung.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from event_ring import EventRing
+from device_rpc import AsyncRpcClient, RpcClient
+
+
+class AsyncRingWaiter:
+    """Wartet in der Eventloop auf neue Einträge eines EventRings (ein Listener für alle Wartenden)"""
+
+    def __init__(self, ring: EventRing, loop: asyncio.AbstractEventLoop):
+        self.ring = ring
+        self.loop = loop
+        self.waiting = 0
+        self._event = asyncio.Event()
+        ring.add_listener(self._on_entry)
+
+    def _on_entry(self, entry: Dict):
+        # Wird im Thread des Erzeugers aufgerufen
+        self.loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def wait(self, after: int, timeout: float) -> List[Dict]:
+        """Einträge mit seq > after, wartet höchstens timeout Sekunden"""
+        event = self._event
+        after = self.ring.cursor(after)
+        if self.ring.last_seq <= after:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+            finally:
+                self.waiting -= 1
+        return self.ring.since(after)
+
+    def close(self):
+        self.ring.remove_listener(self._on_entry)
+
+
+class AsyncDeviceManager:
+    """
+    Async-Fassade um USBDeviceManager.
+
+    Warteaufrufe für Live-Streams laufen ohne Thread über AsyncRingWaiter,
+    reine Speicherabfragen direkt in der Loop, alles andere im Thread-Pool.
+    Ist manager der RPC-Stellvertreter (Worker-Betrieb), gehen alle Aufrufe
+    einschließlich der Warteaufrufe über AsyncRpcClient an den Geräte-Prozess.
+    """
+
+    # Warteaufrufe der Live-Streams (ohne Thread)
+    WAIT_METHODS = ('wait_for_scans', 'wait_card_events', 'wait_job_events')
+    # Methoden ohne Ein-/Ausgabe, die direkt in der Loop laufen dürfen
+    INLINE = frozenset({
+        'get_scan_seq', 'get_card_event_seq', 'get_job_event_seq', 'get_card_transaction',
+        'get_device_job', 'get_scan_ring', 'get_scans', 'parse_barcode'
+    })
+
+    def __init__(self, manager, executor: Optional[ThreadPoolExecutor] = None):
+        self.manager = manager
+        self.executor = executor
+        self._waiters = {}
+        self._scan_rings = {}
+        self._rpc = AsyncRpcClient(manager.path) if isinstance(manager, RpcClient) else None
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._rpc is not None:
+            return functools.partial(self._rpc.call, name)
+        method = getattr(self.manager, name)
+
+        async def call(*args, **kwargs):
+            if name in self.INLINE:
+                return method(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(method, *args, **kwargs))
+        return call
+
+    def _waiter(self, ring: EventRing) -> AsyncRingWaiter:
+        waiter = self._waiters.get(id(ring))
+        if waiter is None or waiter.ring is not ring:
+            if waiter is not None:
+                waiter.close()
+            waiter = AsyncRingWaiter(ring, asyncio.get_running_loop())
+            self._waiters[id(ring)] = waiter
+        return waiter
+
+    def _close_waiter(self, ring: EventRing) -> bool:
+        """Entfernt den Listener eines nicht mehr verwendeten Rings (False, solange noch jemand wartet)"""
+        waiter = self._waiters.get(id(ring))
+        if waiter is not None and waiter.ring is ring:
+            if waiter.waiting:
+                return False
+            del self._waiters[id(ring)]
+            waiter.close()
+        return True
+
+    def _prune_scan_waiters(self):
+        """Schließt Listener von Scanner-Ringen, die nicht mehr aktuell sind"""
+        for key, (scanner_id, ring) in list(self._scan_rings.items()):
+            if self.manager.get_scan_ring(scanner_id) is not ring and self._close_waiter(ring):
+                del self._scan_rings[key]
+
+    async def _wait_matching(self, ring: EventRing, key: str, value: str,
+                             after: int, timeout: float) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        waiter = self._waiter(ring)
+        while True:
+            events = await waiter.wait(after, max(0.0, deadline - loop.time()))
+            matching = [event for event in events if event[key] == value]
+            if matching or not events or loop.time() >= deadline:
+                return matching
+            after = events[-1]['seq']
+
+    async def wait_for_scans(self, after: int, timeout: float = 15.0,
+                             scanner_id: Optional[str] = None) -> List[Dict]:
+        if self._rpc is not None:
+            return await self._rpc.call('wait_for_scans', after, timeout, scanner_id)
+        ring = self.manager.get_scan_ring(scanner_id)
+        if id(ring) not in self._scan_rings:
+            # Scanner entfernt oder neu geladen
+            self._prune_scan_waiters()
+        if ring is None:
+            # Scanner entfernt: nicht sofort erneut anfragen lassen
+            await asyncio.sleep(timeout)
+            return []
+        self._scan_rings[id(ring)] = (scanner_id, ring)
+        try:
+            return await self._waiter(ring).wait(after, timeout)
+        finally:
+            if self.manager.get_scan_ring(scanner_id) is not ring:
+                self._prune_scan_waiters()
+
+    async def wait_card_events(self, transaction_id: str, after: int, timeout: float = 15.0) -> List[Dict]:
+        if self._rpc is not None:
+            return await self._rpc.call('wait_card_events', transaction_id, after, timeout)
+        return await self._wait_matching(self.manager.card_engine.events, 'transaction_id',
+                                         transaction_id, after, timeout)
+
+    async def wait_job_events(self, job_id: str, after: int, timeout: float = 15.0) -> List[Dict]:
+        if self._rpc is not None:
+            return await self._rpc.call('wait_job_events', job_id, after, timeout)
+        return await self._wait_matching(self.manager.device_jobs.events, 'job_id', job_id, after, timeout)
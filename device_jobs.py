@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Geräte-Jobs
+Gerätetests und andere langsame Hardware-Zugriffe laufen als Jobs in einem
+begrenzten Thread-Pool. Der API-Aufruf kehrt sofort mit einer Job-ID zurück;
+das Ergebnis wird abgefragt oder per Live-Stream geliefert. Pro Gerät läuft
+höchstens ein Job gleichzeitig.
+"""
+
+import uuid
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from event_ring import EventRing
+
+# Zustände eines Jobs
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+
+
+class DeviceBusy(Exception):
+    """Am Gerät läuft bereits ein Job (oder die Warteschlange ist voll)"""
+
+
+class DeviceJob:
+    """Zustand eines Geräte-Jobs"""
+
+    def __init__(self, device_id: str, kind: str):
+        self.job_id = uuid.uuid4().hex[:16]
+        self.device_id = device_id
+        self.kind = kind
+        self.state = JOB_QUEUED
+        self.result = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.duration = None
+
+    @property
+    def success(self) -> Optional[bool]:
+        if self.result is None:
+            return None
+        return bool(self.result.get('success'))
+
+    def to_dict(self) -> Dict:
+        return {
+            'job_id': self.job_id,
+            'device_id': self.device_id,
+            'kind': self.kind,
+            'state': self.state,
+            'success': self.success,
+            'result': self.result,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'duration': self.duration
+        }
+
+
+class DeviceJobRunner:
+    """Führt Geräte-Jobs im Hintergrund aus (höchstens ein Job pro Gerät)"""
+
+    def __init__(self, workers: int = 2, max_pending: int = 16, max_tracked: int = 200):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_tracked = max_tracked
+        self.jobs = OrderedDict()
+        # Geräte-ID -> wartender oder laufender Job
+        self.active = {}
+        self.events = EventRing(256)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Threads erst beim ersten Job starten (nach dem Forken des Render-Pools)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='device-job')
+        return self._executor
+
+    def submit(self, device_id: str, kind: str, func: Callable[..., Dict], *args) -> Dict:
+        """Stellt einen Job ein und kehrt sofort zurück; func liefert ein Ergebnis-Dict mit 'success'"""
+        with self._lock:
+            if device_id in self.active:
+                raise DeviceBusy('Für dieses Gerät läuft bereits ein Test')
+            if len(self.active) >= self.max_pending:
+                raise DeviceBusy('Zu viele laufende Gerätetests, bitte später erneut versuchen')
+            job = DeviceJob(device_id, kind)
+            self.active[device_id] = job
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > self.max_tracked:
+                oldest_id, oldest = next(iter(self.jobs.items()))
+                if oldest.state != JOB_DONE:
+                    break
+                del self.jobs[oldest_id]
+            executor = self._get_executor()
+
+        self._emit(job, 'queued')
+        executor.submit(self._run, job, func, args)
+        return job.to_dict()
+
+    def _run(self, job: DeviceJob, func: Callable[..., Dict], args: tuple):
+        job.state = JOB_RUNNING
+        job.started_at = datetime.now().isoformat()
+        self._emit(job, 'running')
+        started = time.perf_counter()
+        try:
+            job.result = func(*args)
+        except Exception as e:
+            job.result = {'success': False, 'error': str(e)}
+        finally:
+            job.duration = round(time.perf_counter() - started, 3)
+            job.state = JOB_DONE
+            job.finished_at = datetime.now().isoformat()
+            with self._lock:
+                if self.active.get(job.device_id) is job:
+                    del self.active[job.device_id]
+            self._emit(job, 'done')
+
+    def _emit(self, job: DeviceJob, event: str):
+        self.events.append({
+            'event': event,
+            'job_id': job.job_id,
+            'device_id': job.device_id,
+            'state': job.state,
+            'success': job.success,
+            'time': time.time()
+        })
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self.jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def get_active(self, device_id: str) -> Optional[Dict]:
+        job = self.active.get(device_id)
+        return job.to_dict() if job else None
+
+    def recent(self, device_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Die letzten Jobs (neueste zuerst)"""
+        with self._lock:
+            jobs = [job for job in reversed(self.jobs.values())
+                    if device_id is None or job.device_id == device_id]
+        return [job.to_dict() for job in jobs[:limit]]
+
+    def get_event_seq(self) -> int:
+        return self.events.last_seq
+
+    def wait_events(self, job_id: str, after: int, timeout: float = 15.0) -> List[Dict]:
+        """Wartet auf Zustandswechsel eines Jobs (für Live-Streams)"""
+        deadline = time.time() + timeout
+        while True:
+            events = self.events.wait(after, max(0.0, deadline - time.time()))
+            matching = [event for event in events if event['job_id'] == job_id]
+            if matching or not events or time.time() >= deadline:
+                return matching
+            after = events[-1]['seq']
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Device-Loop
+Eine asyncio-Eventloop in einem Hintergrund-Thread für alle Geräte mit
+langlaufender Ein-/Ausgabe (Kartenterminals, serielle Geräte).
+Flask-Handler übergeben Koroutinen und warten höchstens auf das Ergebnis.
+"""
+
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Coroutine, Optional
+
+
+class DeviceLoop:
+    """Startet die Eventloop beim ersten Gebrauch (nach dem Forken des Render-Pools)"""
+
+    def __init__(self, name: str = 'device-loop'):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Die laufende Eventloop (wird bei Bedarf gestartet)"""
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                ready = threading.Event()
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run, args=(self._loop, ready),
+                                                name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def in_loop(self) -> bool:
+        """True, wenn der Aufruf aus dem Loop-Thread kommt"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coroutine: Coroutine) -> concurrent.futures.Future:
+        """Führt eine Koroutine in der Loop aus und gibt ein thread-sicheres Future zurück"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Führt eine Koroutine aus und wartet (aus einem anderen Thread) auf das Ergebnis"""
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError('Zeitüberschreitung bei der Gerätekommunikation')
+
+    def call_soon(self, callback, *args):
+        """Plant einen Aufruf thread-sicher in der Loop ein"""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+
+# Globale Instanz
+device_loop = DeviceLoop()
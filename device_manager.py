@@ -10,16 +10,14 @@ import subprocess
 import time
 import threading
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any, Tuple
 import usb.core
 import usb.util
 import serial.tools.list_ports
 
 # Device-specific imports
 try:
-    from brother_ql.conversion import convert
     from brother_ql.backends.helpers import send
-    from brother_ql.raster import BrotherQLRaster
     BROTHER_QL_AVAILABLE = True
 except ImportError:
     BROTHER_QL_AVAILABLE = False
@@ -31,11 +29,7 @@ try:
 except ImportError:
     ESCPOS_AVAILABLE = False
 
-try:
-    import cups
-    CUPS_AVAILABLE = True
-except ImportError:
-    CUPS_AVAILABLE = False
+from cups_backend import cups_backend, CUPS_AVAILABLE
 
 try:
     import evdev
@@ -49,63 +43,271 @@ try:
 except ImportError:
     KEYBOARD_AVAILABLE = False
 
-class DatalogicTouch65:
-    """Spezielle Klasse für Datalogic Touch 65 Scanner"""
+import label_renderer
+from scanner_input import ScanDecoder, scan_reader, input_index
+from hidpos_reader import HidPosDecoder, hidraw_index, open_hidraw
+from event_ring import EventRing
+from escpos_builder import ReceiptBuilder, DOTS_PER_LINE
+from graphics_registry import GraphicsRegistry
+from product_catalog import ProductCatalog
+import gs1_parser
+from inventory_session import InventoryManager
+from card_terminal import CardTerminalEngine, DemoTerminalDriver, TerminalBusy
+from zvt import (ZvtClient, ZvtConnection, ZvtSerialConnection, ZvtTerminalDriver,
+                 DEFAULT_PORT as ZVT_DEFAULT_PORT)
+from serial_transport import SerialSettings, SerialTransportError, serial_ports, query_escpos_status
+from device_loop import device_loop
+from render_pool import render_pool, RenderPoolBusy
+from device_jobs import DeviceJobRunner, DeviceBusy
+from device_revisions import RevisionTracker
+
+# Anzahl der letzten Scans, die pro Scanner vorgehalten werden
+SCAN_RING_SIZE = int(os.getenv('SCAN_RING_SIZE', 256))
+# Inventur: Zählstände spätestens nach so vielen Scans bzw. Sekunden schreiben
+INVENTORY_FLUSH_SCANS = int(os.getenv('INVENTORY_FLUSH_SCANS', 50))
+INVENTORY_FLUSH_SECONDS = float(os.getenv('INVENTORY_FLUSH_SECONDS', 5))
+# Gerätetests im Hintergrund: parallele Jobs und maximale Anzahl wartender Jobs
+DEVICE_JOB_WORKERS = int(os.getenv('DEVICE_JOB_WORKERS', 2))
+DEVICE_JOB_QUEUE = int(os.getenv('DEVICE_JOB_QUEUE', 16))
+# Gerätetypen, die Text drucken können
+PRINTER_TYPES = ('printer', 'label_printer', 'shipping_printer', 'receipt_printer')
+
+class BarcodeScanner:
+    """
+    Barcode-Scanner im HID-POS-Modus (hidraw) oder im Tastatur-Modus (evdev).
+
+    Jeder konfigurierte Scanner hat eine eigene Instanz; gelesen wird für alle
+    gemeinsam im Lese-Thread von scan_reader. Das Eingabegerät wird über
+    VID:PID und optional den physischen Anschluss (phys) zugeordnet.
+    input_mode: 'auto' (HID POS, sonst Tastatur), 'hidpos' oder 'keyboard'.
+    """
     
-    def __init__(self):
+    def __init__(self, scanner_id: str, vendor_products: Optional[List[str]] = None,
+                 phys: str = '', layout: str = 'de', on_scan=None, pipeline=None,
+                 input_mode: str = 'auto'):
+        self.scanner_id = scanner_id
+        self.input_mode = input_mode
+        self.active_mode = None
+        self.pipeline = pipeline
+        self.vendor_products = [vp.lower() for vp in (vendor_products or []) if vp]
+        self.phys = phys or ''
+        self.on_scan = on_scan
         self.device_path = None
         self.device_name = None
+        self.device_phys = None
         self.is_connected = False
+        self.connected_at = None
         self.scan_buffer = ""
         self.last_scan = None
+        self.last_scan_at = None
         self.scan_count = 0
-        
-    def find_device(self):
-        """Findet den Datalogic Touch 65 Scanner"""
+        self.read_errors = 0
+        self.input_device = None
+        self.decoder = ScanDecoder(layout)
+        self.hid_fd = None
+        self.hid_decoder = HidPosDecoder()
+        # Letzte Scans mit Sequenznummern (feste Größe)
+        self.scans = EventRing(SCAN_RING_SIZE)
+    
+    def matches(self, node) -> bool:
+        """Prüft anhand der sysfs-Metadaten, ob ein Event-Knoten zu diesem Scanner gehört"""
+        if not self.vendor_products and not self.phys:
+            return False
+        if self.vendor_products and node.vendor_product not in self.vendor_products:
+            return False
+        if self.phys and not node.phys.startswith(self.phys):
+            return False
+        if hasattr(node, 'hid_pos'):
+            return node.hid_pos
+        # Nur Knoten mit Enter-Taste (Scanner melden oft mehrere Knoten an)
+        return node.has_enter
+    
+    def find_device(self, exclude: Iterable[str] = ()) -> bool:
+        """Sucht das passende Eingabegerät über sysfs (bereits belegte Pfade werden übersprungen)"""
         if not EVDEV_AVAILABLE:
             return False
-            
+        
         try:
-            devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
-            
-            for device in devices:
-                # Suche nach Datalogic/PSC Scanning Geräten
-                if ('datalogic' in device.name.lower() or 
-                    'psc scanning' in device.name.lower() or
-                    'touch' in device.name.lower()):
-                    self.device_path = device.path
-                    self.device_name = device.name
-                    return True
-                    
-            return False
-            
+            node = input_index.find(self.matches, exclude)
         except Exception as e:
-            print(f"Fehler beim Suchen des Datalogic Touch 65: {e}")
+            print(f"Fehler beim Suchen des Scanners {self.scanner_id}: {e}")
+            return False
+        
+        if node is None:
             return False
+        self.device_path = node.path
+        self.device_name = node.name
+        self.device_phys = node.phys
+        return True
     
-    def connect(self):
-        """Verbindet mit dem Scanner"""
-        if self.find_device():
-            self.is_connected = True
+    def connect(self, exclude: Iterable[str] = ()) -> bool:
+        """Verbindet mit dem Scanner und meldet ihn beim Lese-Thread an"""
+        if self.is_connected:
             return True
-        return False
+        if self.input_mode in ('auto', 'hidpos') and self._connect_hidpos(exclude):
+            return True
+        if self.input_mode == 'hidpos' or not self.find_device(exclude):
+            return False
+        
+        try:
+            self.input_device = evdev.InputDevice(self.device_path)
+            # Exklusiv übernehmen: Scans landen nicht mehr als Tastatureingabe im System
+            self.input_device.grab()
+            self.decoder.reset()
+            scan_reader.register(self.input_device, self.decoder, self.handle_scan,
+                                 on_error=self.handle_read_error, on_keys=self.handle_keys)
+        except Exception as e:
+            print(f"Fehler beim Öffnen des Scanners {self.scanner_id}: {e}")
+            self._close_input_device()
+            input_index.invalidate()
+            return False
+        
+        self.is_connected = True
+        self.active_mode = 'keyboard'
+        self.connected_at = datetime.now().isoformat()
+        return True
+    
+    def _connect_hidpos(self, exclude: Iterable[str] = ()) -> bool:
+        """Verbindet über hidraw, wenn der Scanner eine HID-POS-Schnittstelle anbietet"""
+        try:
+            node = hidraw_index.find(self.matches, exclude)
+        except Exception as e:
+            print(f"Fehler beim Suchen der HID-POS-Schnittstelle {self.scanner_id}: {e}")
+            return False
+        if node is None:
+            return False
+        
+        try:
+            self.hid_fd = open_hidraw(node.path)
+            self.hid_decoder.reset()
+            scan_reader.register_hidraw(self.hid_fd, self.hid_decoder, self.handle_scan,
+                                        on_error=self.handle_read_error,
+                                        report_size=self.hid_decoder.layout.report_size)
+        except Exception as e:
+            print(f"Fehler beim Öffnen der HID-POS-Schnittstelle {self.scanner_id}: {e}")
+            self._close_input_device()
+            hidraw_index.invalidate()
+            return False
+        
+        self.device_path = node.path
+        self.device_name = node.name
+        self.device_phys = node.phys
+        self.is_connected = True
+        self.active_mode = 'hidpos'
+        self.connected_at = datetime.now().isoformat()
+        return True
     
     def disconnect(self):
         """Trennt die Verbindung"""
+        if self.input_device is not None:
+            scan_reader.unregister(self.input_device)
+        if self.hid_fd is not None:
+            scan_reader.unregister(self.hid_fd)
+        self._close_input_device()
         self.is_connected = False
+        self.active_mode = None
+        self.connected_at = None
         self.device_path = None
         self.device_name = None
+        self.device_phys = None
+        self.scan_buffer = ""
+    
+    def _close_input_device(self):
+        """Gibt das Eingabegerät frei"""
+        if self.hid_fd is not None:
+            try:
+                os.close(self.hid_fd)
+            except OSError:
+                pass
+            self.hid_fd = None
+        if self.input_device is None:
+            return
+        try:
+            self.input_device.ungrab()
+        except Exception:
+            pass
+        try:
+            self.input_device.close()
+        except Exception:
+            pass
+        self.input_device = None
+    
+    def handle_scan(self, barcode: str, timestamp: float, symbology: Optional[str] = None):
+        """Wird vom Lese-Thread für jeden vollständigen Barcode aufgerufen (symbology = AIM-Kennung)"""
+        scanned_at = datetime.fromtimestamp(timestamp).isoformat()
+        self.scan_count += 1
+        self.last_scan = barcode
+        self.last_scan_at = scanned_at
+        self.scan_buffer = ""
+        scan = {
+            'code': barcode,
+            'timestamp': scanned_at,
+            'time': timestamp,
+            'scanner': self.device_name,
+            'scanner_id': self.scanner_id
+        }
+        if symbology:
+            scan['symbology_id'] = symbology
+        if self.pipeline:
+            scan = self.pipeline(scan)
+        entry = self.scans.append(scan)
+        if self.on_scan:
+            self.on_scan(entry)
+    
+    def handle_keys(self):
+        """Hält den Puffer des laufenden Scans aktuell"""
+        self.scan_buffer = self.decoder.pending
+    
+    def handle_read_error(self, error: Exception):
+        """Scanner wurde entfernt oder ist nicht mehr lesbar"""
+        print(f"Scanner {self.scanner_id} getrennt: {error}")
+        self.read_errors += 1
+        input_index.invalidate()
+        hidraw_index.invalidate()
+        self._close_input_device()
+        self.is_connected = False
+        self.active_mode = None
+        self.connected_at = None
+    
+    def wait_for_scan(self, timeout: float) -> Optional[Dict]:
+        """Wartet auf den nächsten Scan und gibt ihn zurück (None bei Timeout)"""
+        scans = self.scans.wait(self.scans.last_seq, timeout, limit=1)
+        return scans[0] if scans else None
+    
+    def scans_per_minute(self) -> int:
+        """Anzahl Scans der letzten 60 Sekunden (aus dem Ringpuffer)"""
+        since = time.time() - 60
+        return sum(1 for scan in self.scans.since(0) if scan['time'] >= since)
     
     def get_status(self):
-        """Gibt den aktuellen Status zurück"""
+        """Gibt den aktuellen Status und die Statistik zurück"""
         return {
+            'scanner_id': self.scanner_id,
             'connected': self.is_connected,
+            'connected_at': self.connected_at,
+            'input_mode': self.input_mode,
+            'active_mode': self.active_mode,
             'device_path': self.device_path,
             'device_name': self.device_name,
+            'phys': self.device_phys,
+            'vendor_products': self.vendor_products,
             'scan_count': self.scan_count,
-            'last_scan': self.last_scan
+            'scans_per_minute': self.scans_per_minute(),
+            'read_errors': self.read_errors,
+            'last_scan': self.last_scan,
+            'last_scan_at': self.last_scan_at,
+            'last_seq': self.scans.last_seq
         }
 
+class DatalogicTouch65(BarcodeScanner):
+    """Spezielle Klasse für Datalogic Touch 65 Scanner"""
+    
+    VENDOR_PRODUCTS = ['05f9:2214', '05f9:2215']
+    
+    def __init__(self, scanner_id: str = 'datalogic_touch65', layout: str = 'de', **kwargs):
+        kwargs.setdefault('vendor_products', self.VENDOR_PRODUCTS)
+        super().__init__(scanner_id, layout=layout, **kwargs)
+
 class USBDeviceManager:
     def __init__(self, config_file: str = "/opt/devicebox/data/devices.json"):
         self.config_file = config_file
@@ -161,10 +363,44 @@ class USBDeviceManager:
             }
         }
         self.load_devices()
-        self.start_device_monitoring()
+        self.graphics_registry = GraphicsRegistry(
+            os.path.join(os.path.dirname(self.config_file), 'graphics.json')
+        )
+        
+        # Lokaler Artikelindex (EAN/GTIN -> Artikel)
+        self.catalog = ProductCatalog(
+            os.path.join(os.path.dirname(self.config_file), 'catalog.sqlite')
+        )
+        # Inventursitzungen (Zählstände je Code und Lagerort)
+        self.inventory = InventoryManager(
+            os.path.join(os.path.dirname(self.config_file), 'inventory.sqlite'),
+            flush_scans=INVENTORY_FLUSH_SCANS,
+            flush_seconds=INVENTORY_FLUSH_SECONDS
+        )
+        # Scan-Pipeline: Stufen erhalten das Scan-Ereignis und geben es angereichert zurück
+        self.scan_stages = [gs1_parser.scan_stage, self.catalog.scan_stage, self.inventory.scan_stage]
+        
+        # Scans aller Scanner in einem gemeinsamen Ringpuffer
+        self.scans = EventRing(SCAN_RING_SIZE)
+        # Eine Scanner-Instanz pro konfiguriertem Barcode-Scanner (Geräte-ID -> Scanner)
+        self.scanners = {}
+        self._scanner_lock = threading.RLock()
+        for device in self.devices.values():
+            if device['type'] == 'barcode_scanner':
+                self.scanners[device['id']] = self._create_scanner(device)
+        
+        # EC-Kartengeräte: Transaktions-Engine und ein Protokoll-Treiber pro Terminal
+        self.card_engine = CardTerminalEngine()
+        self.card_drivers = {}
+        self.device_jobs = DeviceJobRunner(DEVICE_JOB_WORKERS, DEVICE_JOB_QUEUE)
+        # Revisionen der konfigurierten Geräte für inkrementelle Updates der Oberfläche
+        self.device_revisions = RevisionTracker()
         
-        # Datalogic Touch 65 Scanner-Instanz
-        self.datalogic_scanner = DatalogicTouch65()
+        # Datalogic Touch 65 Scanner-Instanz (wenn kein Scanner konfiguriert ist)
+        self.datalogic_scanner = DatalogicTouch65(on_scan=self.scans.append,
+                                                  pipeline=self.process_scan)
+        
+        self.start_device_monitoring()
     
     def load_devices(self):
         """Lädt gespeicherte Geräte aus der Konfigurationsdatei"""
@@ -528,20 +764,30 @@ class USBDeviceManager:
         }
         
         self.devices[device_id] = device
+        self.device_revisions.touch(device_id)
         self.save_devices()
         
+        if device_type == 'barcode_scanner':
+            with self._scanner_lock:
+                self.scanners[device_id] = self._create_scanner(device)
+        
         # Versuche Gerät zu verbinden
         self.connect_device(device_id)
         
         return device
     
+    def get_device_types(self) -> Dict:
+        """Unterstützte Gerätetypen und Modelle"""
+        return self.device_types
+    
     def get_default_settings(self, device_type: str) -> Dict:
         """Gibt die Standard-Einstellungen für einen Gerätetyp zurück"""
         settings = {
             'printer': {
                 'paper_size': 'A4',
                 'quality': 'normal',
-                'color': False
+                'color': False,
+                'cups_printer': 'Brother_HL_L2340DW'
             },
             'label_printer': {
                 'label_size': '62x100',
@@ -555,14 +801,32 @@ class USBDeviceManager:
             'barcode_scanner': {
                 'scan_mode': 'continuous',
                 'beep_enabled': True,
-                'led_enabled': True
+                'led_enabled': True,
+                'keyboard_layout': 'de',
+                'input_mode': 'auto',
+                'input_phys': '',
+                'test_timeout': 10
             },
             'receipt_printer': {
                 'paper_width': '80mm',
                 'quality': 'normal',
-                'cut_after_print': True
+                'cut_after_print': True,
+                'logo_path': '',
+                'baudrate': 9600,
+                'parity': 'N',
+                'stopbits': 1,
+                'flow_control': 'none'
             },
             'card_reader': {
+                'protocol': 'zvt',
+                'zvt_host': '',
+                'zvt_port': ZVT_DEFAULT_PORT,
+                'zvt_password': '000000',
+                'serial_port': '',
+                'baudrate': 9600,
+                'parity': 'N',
+                'stopbits': 2,
+                'flow_control': 'none',
                 'timeout': 30,
                 'currency': 'EUR',
                 'test_amount': 1.00
@@ -589,13 +853,24 @@ class USBDeviceManager:
                 device['last_seen'] = datetime.now().isoformat()
                 
             elif device_info.get('type') == 'serial':
-                # Serielles Gerät verbinden
+                # Serielles Gerät verbinden: Port mit den Leitungsparametern des Geräts öffnen
                 port = device_info['port']
+                device_loop.run(serial_ports.get(port, self.serial_settings(device)), timeout=5)
                 
-                # Hier würde die serielle Verbindung stattfinden
                 device['status'] = 'connected'
                 device['last_seen'] = datetime.now().isoformat()
             
+            # Barcode-Scanner: Eingabegerät öffnen und beim Lese-Thread anmelden
+            if device['type'] == 'barcode_scanner':
+                if not self.connect_scanner(device_id):
+                    device['status'] = 'error'
+                    device['error'] = 'Eingabegerät des Scanners nicht gefunden'
+                    self.device_revisions.touch(device_id)
+                    self.save_devices()
+                    return False
+                device.pop('error', None)
+            
+            self.device_revisions.touch(device_id)
             self.save_devices()
             return True
             
@@ -603,6 +878,7 @@ class USBDeviceManager:
             print(f"Fehler beim Verbinden des Geräts {device_id}: {e}")
             device['status'] = 'error'
             device['error'] = str(e)
+            self.device_revisions.touch(device_id)
             self.save_devices()
             return False
     
@@ -612,16 +888,29 @@ class USBDeviceManager:
             return False
         
         device = self.devices[device_id]
+        if device_id in self.scanners:
+            self.scanners[device_id].disconnect()
+        self.close_card_driver(device_id)
+        self.close_serial_port(device)
         device['status'] = 'disconnected'
         device['last_seen'] = None
+        self.device_revisions.touch(device_id)
         self.save_devices()
         return True
     
     def remove_device(self, device_id: str) -> bool:
         """Entfernt ein Gerät komplett"""
         if device_id in self.devices:
-            del self.devices[device_id]
+            device = self.devices.pop(device_id)
+            self.device_revisions.remove(device_id)
             self.save_devices()
+            self.close_serial_port(device)
+            self.graphics_registry.invalidate(device_id)
+            with self._scanner_lock:
+                scanner = self.scanners.pop(device_id, None)
+            if scanner:
+                scanner.disconnect()
+            self.close_card_driver(device_id)
             return True
         return False
     
@@ -648,24 +937,39 @@ class USBDeviceManager:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def start_device_test(self, device_id: str, test_type: str) -> Dict:
+        """Startet einen Gerätetest als Hintergrund-Job (DeviceBusy, falls das Gerät belegt ist)"""
+        if device_id not in self.devices:
+            raise ValueError('Gerät nicht gefunden')
+        return self.device_jobs.submit(device_id, test_type, self.test_device, device_id, test_type)
+    
+    def get_device_job(self, job_id: str) -> Optional[Dict]:
+        """Status und Ergebnis eines Geräte-Jobs"""
+        return self.device_jobs.get(job_id)
+    
+    def get_device_jobs(self, device_id: Optional[str] = None) -> List[Dict]:
+        """Die letzten Geräte-Jobs"""
+        return self.device_jobs.recent(device_id)
+    
+    def get_job_event_seq(self) -> int:
+        """Sequenznummer des neuesten Job-Ereignisses"""
+        return self.device_jobs.get_event_seq()
+    
+    def wait_job_events(self, job_id: str, after: int, timeout: float = 15.0) -> List[Dict]:
+        """Wartet auf Zustandswechsel eines Geräte-Jobs (für Live-Streams)"""
+        return self.device_jobs.wait_events(job_id, after, timeout)
+    
     def test_print(self, device_id: str) -> Dict:
         """Testet das Drucken"""
         device = self.devices[device_id]
         device_type = device['type']
         
         try:
-            if device_type in ['printer', 'label_printer', 'shipping_printer', 'receipt_printer']:
+            if device_type in PRINTER_TYPES:
                 test_content = self.generate_test_content(device_type)
                 
                 # Versuche echten Druck basierend auf Gerätetyp
-                if device_type == 'receipt_printer':
-                    success = self.print_receipt(device, test_content)
-                elif device_type == 'label_printer':
-                    success = self.print_label(device, test_content)
-                elif device_type == 'printer':
-                    success = self.print_document(device, test_content)
-                else:
-                    success = self.print_generic(device, test_content)
+                success = self.print_on_device(device, test_content, title='DeviceBox Testdruck')
                 
                 if success:
                     return {
@@ -680,28 +984,73 @@ class USBDeviceManager:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def print_on_device(self, device: Dict, content: str, title: str = 'DeviceBox') -> bool:
+        """Druckt Text mit dem passenden Verfahren für den Gerätetyp (title: Auftragsname in CUPS)"""
+        device_type = device['type']
+        if device_type == 'receipt_printer':
+            return self.print_receipt(device, content)
+        elif device_type == 'label_printer':
+            return self.print_label(device, content)
+        elif device_type == 'printer':
+            return self.print_document(device, content, title)
+        return self.print_generic(device, content)
+    
+    def print_content(self, device_id: str, content: str) -> Dict:
+        """Druckt Text auf einem verbundenen Drucker (z.B. Belege der Kassensoftware)"""
+        device = self.devices.get(device_id)
+        if device is None:
+            raise ValueError('Gerät nicht gefunden')
+        if device['type'] not in PRINTER_TYPES:
+            raise ValueError('Gerät ist kein Drucker')
+        if device['status'] != 'connected':
+            return {'success': False, 'error': 'Gerät nicht verbunden'}
+        if self.print_on_device(device, content):
+            return {'success': True}
+        return {'success': False, 'error': 'Druckvorgang fehlgeschlagen'}
+    
     def print_receipt(self, device: Dict, content: str) -> bool:
         """Druckt einen Beleg (ESC/POS) - speziell für Epson TM-T20II"""
         try:
             device_info = device['device_info']
-            model = device.get('model', '')
-            
-            if not ESCPOS_AVAILABLE:
-                print("python-escpos Bibliothek nicht verfügbar")
-                return False
+            settings = device.get('settings', {})
+            logo = self.prepare_receipt_logo(device)
             
             if device_info.get('type') == 'usb':
                 # USB ESC/POS Drucker (Epson TM-T20II)
-                return self.print_epson_tm_t20ii(device_info, content)
+                success = self.print_epson_tm_t20ii(device_info, content, settings, logo)
             elif device_info.get('type') == 'serial':
                 # Serieller ESC/POS Drucker
-                return self.print_serial_escpos(device_info, content)
+                success = self.print_serial_escpos(device_info, content, settings, logo)
             else:
                 return False
+            
+            # Logo liegt jetzt im NV-Speicher des Druckers
+            if success and logo and logo[0]:
+                self.graphics_registry.confirm(device['id'], 'logo')
+            return success
         except Exception as e:
             print(f"Fehler beim Belegdruck: {e}")
             return False
     
+    def prepare_receipt_logo(self, device: Dict) -> Optional[Tuple[bytes, bytes]]:
+        """Liefert (Upload-Befehle, Druckbefehl) für das Beleg-Logo oder None"""
+        logo_path = device.get('settings', {}).get('logo_path')
+        if not logo_path or not os.path.exists(logo_path):
+            return None
+        
+        try:
+            paper_width = device.get('settings', {}).get('paper_width', '80mm')
+            return self.graphics_registry.prepare(
+                device['id'],
+                GraphicsRegistry.printer_identity(device),
+                'logo',
+                logo_path,
+                max_width=DOTS_PER_LINE.get(paper_width, 576)
+            )
+        except Exception as e:
+            print(f"Fehler beim Vorbereiten des Logos: {e}")
+            return None
+    
     def print_label(self, device: Dict, content: str) -> bool:
         """Druckt ein Etikett - speziell für Brother QL-700"""
         try:
@@ -721,7 +1070,7 @@ class USBDeviceManager:
             print(f"Fehler beim Etikettdruck: {e}")
             return False
     
-    def print_document(self, device: Dict, content: str) -> bool:
+    def print_document(self, device: Dict, content: str, title: str = 'DeviceBox') -> bool:
         """Druckt ein Dokument - speziell für Brother HL-L2340DW"""
         try:
             device_info = device['device_info']
@@ -732,7 +1081,7 @@ class USBDeviceManager:
                 return False
             
             # Für Brother HL-L2340DW verwenden wir CUPS
-            return self.print_brother_hl_l2340dw(device_info, content)
+            return self.print_brother_hl_l2340dw(device_info, content, device.get('settings'), title)
         except Exception as e:
             print(f"Fehler beim Dokumentdruck: {e}")
             return False
@@ -747,55 +1096,134 @@ class USBDeviceManager:
             print(f"Fehler beim generischen Druck: {e}")
             return False
     
-    def print_usb_escpos(self, device_info: Dict, content: str) -> bool:
-        """Druckt über USB ESC/POS"""
+    def build_receipt(self, content: str, settings: Optional[Dict] = None,
+                      logo: Optional[Tuple[bytes, bytes]] = None) -> bytes:
+        """Kompiliert einen Textbeleg in einen einzigen ESC/POS Befehlsstrom"""
+        settings = settings or {}
+        builder = ReceiptBuilder(settings.get('paper_width', '80mm'),
+                                 codepage=settings.get('codepage', 'cp858'))
+        if logo:
+            # Logo per NV-Schlüssel drucken statt Rasterdaten zu senden
+            builder.align('center').raw(logo[1]).line().align('left')
+        builder.text(content)
+        if not content.endswith('\n'):
+            builder.line()
+        if settings.get('cut_after_print', True):
+            builder.cut()
+        else:
+            builder.feed(3)
+        
+        # Ein ggf. nötiger NV-Upload geht im selben Transfer vorweg
+        upload = logo[0] if logo else b''
+        return upload + builder.build()
+    
+    def write_usb_bulk(self, device_info: Dict, data: bytes,
+                       default_vendor_product: str = '04b8:0e15', timeout: int = 10000) -> int:
+        """Schreibt einen Befehlsstrom mit einem einzigen Bulk-Transfer an ein USB-Gerät"""
+        vendor_product = device_info.get('vendor_product', default_vendor_product)
+        vendor_id, product_id = (int(part, 16) for part in vendor_product.split(':'))
+        
+        candidates = list(usb.core.find(find_all=True, idVendor=vendor_id, idProduct=product_id))
+        if not candidates:
+            raise IOError(f'USB-Gerät {vendor_product} nicht gefunden')
+        
+        # Bei mehreren gleichen Geräten das mit passender Bus-/Geräteadresse wählen
+        usb_device = candidates[0]
+        for candidate in candidates:
+            if (str(candidate.bus).zfill(3) == str(device_info.get('bus', '')).zfill(3) and
+                    str(candidate.address).zfill(3) == str(device_info.get('device_id', '')).zfill(3)):
+                usb_device = candidate
+                break
+        
         try:
-            import usb.core
-            import usb.util
+            try:
+                if usb_device.is_kernel_driver_active(0):
+                    usb_device.detach_kernel_driver(0)
+            except (NotImplementedError, usb.core.USBError):
+                pass
+            try:
+                usb_device.set_configuration()
+            except usb.core.USBError:
+                # Bereits konfiguriert
+                pass
             
-            # ESC/POS Befehle
-            escpos_commands = [
-                b'\x1B\x40',  # Initialize
-                b'\x1B\x61\x01',  # Center align
-                content.encode('utf-8'),
-                b'\x0A\x0A\x0A',  # Line feeds
-                b'\x1D\x56\x00',  # Cut paper
-            ]
+            interface = usb_device.get_active_configuration()[(0, 0)]
+            endpoint = usb.util.find_descriptor(
+                interface,
+                custom_match=lambda e: usb.util.endpoint_direction(e.bEndpointAddress) == usb.util.ENDPOINT_OUT
+            )
+            if endpoint is None:
+                raise IOError(f'Kein OUT-Endpoint für {vendor_product} gefunden')
             
-            # Hier würde die tatsächliche USB-Kommunikation stattfinden
-            # Für jetzt simulieren wir den Erfolg
-            time.sleep(1)
-            return True
+            return endpoint.write(data, timeout)
+        finally:
+            usb.util.dispose_resources(usb_device)
+    
+    def print_usb_escpos(self, device_info: Dict, content: str, settings: Optional[Dict] = None,
+                         logo: Optional[Tuple[bytes, bytes]] = None) -> bool:
+        """Druckt über USB ESC/POS (ein Bulk-Transfer pro Beleg)"""
+        try:
+            data = self.build_receipt(content, settings, logo)
+            written = self.write_usb_bulk(device_info, data)
+            return written == len(data)
             
         except Exception as e:
             print(f"USB ESC/POS Fehler: {e}")
             return False
     
-    def print_serial_escpos(self, device_info: Dict, content: str) -> bool:
+    def print_serial_escpos(self, device_info: Dict, content: str, settings: Optional[Dict] = None,
+                            logo: Optional[Tuple[bytes, bytes]] = None) -> bool:
         """Druckt über serielle ESC/POS"""
         try:
-            import serial
-            
             port = device_info['port']
+            settings = settings or {}
+            data = self.build_receipt(content, settings, logo)
             
-            # ESC/POS Befehle
-            escpos_commands = [
-                b'\x1B\x40',  # Initialize
-                b'\x1B\x61\x01',  # Center align
-                content.encode('utf-8'),
-                b'\x0A\x0A\x0A',  # Line feeds
-                b'\x1D\x56\x00',  # Cut paper
-            ]
-            
-            # Hier würde die tatsächliche serielle Kommunikation stattfinden
-            # Für jetzt simulieren wir den Erfolg
-            time.sleep(1)
+            # Schreiben in der Device-Loop, der Port bleibt zwischen Belegen offen
+            device_loop.run(self._write_serial_receipt(port, SerialSettings.from_settings(settings), data),
+                            timeout=60)
             return True
             
         except Exception as e:
             print(f"Serieller ESC/POS Fehler: {e}")
             return False
     
+    @staticmethod
+    async def _write_serial_receipt(port: str, config: SerialSettings, data: bytes):
+        transport = await serial_ports.get(port, config)
+        status = await query_escpos_status(transport)
+        if status is not None and not status['ready']:
+            problems = [name for name in ('offline', 'cover_open', 'paper_end', 'unrecoverable_error')
+                        if status[name]]
+            raise SerialTransportError(f"Drucker nicht bereit: {', '.join(problems)}")
+        transport.write(data)
+        await transport.drain(timeout=30)
+    
+    @staticmethod
+    def serial_settings(device: Dict) -> SerialSettings:
+        """Leitungsparameter eines seriellen Geräts (ZVT-Terminals: 8N2)"""
+        defaults = {'stopbits': 2} if device['type'] == 'card_reader' else {}
+        return SerialSettings.from_settings(device['settings'], **defaults)
+    
+    @staticmethod
+    def close_serial_port(device: Dict):
+        """Schließt den Port eines seriellen Geräts"""
+        if device['device_info'].get('type') == 'serial':
+            device_loop.submit(serial_ports.close(device['device_info']['port']))
+    
+    def get_serial_printer_status(self, device_id: str) -> Optional[Dict]:
+        """Fragt den Status eines seriellen ESC/POS-Druckers ab (DLE EOT)"""
+        device = self.devices.get(device_id)
+        if device is None or device['device_info'].get('type') != 'serial':
+            return None
+        port = device['device_info']['port']
+        config = self.serial_settings(device)
+        
+        async def query():
+            return await query_escpos_status(await serial_ports.get(port, config))
+        
+        return device_loop.run(query(), timeout=5)
+    
     def print_usb_label(self, device_info: Dict, content: str) -> bool:
         """Druckt über USB Label-Drucker"""
         try:
@@ -811,44 +1239,24 @@ class USBDeviceManager:
     def print_cups(self, device: Dict, content: str) -> bool:
         """Druckt über CUPS (Common Unix Printing System)"""
         try:
-            # Erstelle temporäre Datei
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-                f.write(content)
-                temp_file = f.name
-            
-            # Drucke über CUPS
-            result = subprocess.run([
-                'lp', '-d', 'default', temp_file
-            ], capture_output=True, text=True)
-            
-            # Lösche temporäre Datei
-            os.unlink(temp_file)
-            
-            return result.returncode == 0
+            printer = device.get('settings', {}).get('cups_printer', 'default')
+            job_id = cups_backend.submit(printer, content.encode('utf-8'), title='DeviceBox')
+            print(f"CUPS Auftrag {job_id} an {printer} übergeben")
+            return True
             
         except Exception as e:
             print(f"CUPS Druck Fehler: {e}")
             return False
     
-    def print_brother_hl_l2340dw(self, device_info: Dict, content: str) -> bool:
+    def print_brother_hl_l2340dw(self, device_info: Dict, content: str, settings: Optional[Dict] = None,
+                                 title: str = 'DeviceBox') -> bool:
         """Druckt über Brother HL-L2340DW mit CUPS"""
         try:
-            # Erstelle temporäre Datei
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-                f.write(content)
-                temp_file = f.name
-            
-            # Drucke über CUPS mit Brother-Treiber
-            result = subprocess.run([
-                'lp', '-d', 'Brother_HL_L2340DW', temp_file
-            ], capture_output=True, text=True)
-            
-            # Lösche temporäre Datei
-            os.unlink(temp_file)
-            
-            return result.returncode == 0
+            # Drucke über CUPS mit Brother-Treiber, direkt aus dem Speicher
+            printer = (settings or {}).get('cups_printer', 'Brother_HL_L2340DW')
+            job_id = cups_backend.submit(printer, content.encode('utf-8'), title=title)
+            print(f"CUPS Auftrag {job_id} an {printer} übergeben")
+            return True
             
         except Exception as e:
             print(f"Brother HL-L2340DW Druck Fehler: {e}")
@@ -857,49 +1265,13 @@ class USBDeviceManager:
     def print_brother_ql700(self, device_info: Dict, content: str) -> bool:
         """Druckt über Brother QL-700 Label-Drucker"""
         try:
-            # Erstelle temporäres Bild für das Label
-            from PIL import Image, ImageDraw, ImageFont
-            import tempfile
-            
-            # Erstelle ein einfaches Label-Bild
-            img = Image.new('RGB', (696, 271), 'white')
-            draw = ImageDraw.Draw(img)
-            
-            # Verwende Standard-Schriftart
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
-            except:
-                font = ImageFont.load_default()
-            
-            # Teile den Text in Zeilen auf
-            lines = content.split('\n')
-            y_offset = 20
-            
-            for line in lines:
-                if line.strip():
-                    draw.text((20, y_offset), line.strip(), fill='black', font=font)
-                    y_offset += 30
-            
-            # Speichere temporäres Bild
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as f:
-                img.save(f.name)
-                temp_image = f.name
-            
-            # Konvertiere für Brother QL-700
-            qlr = BrotherQLRaster('QL-700')
-            qlr.exception_on_warning = True
-            
-            instructions = convert(
-                qlr=qlr,
-                images=[temp_image],
-                label='62',  # 62x100mm Label
-                rotate='auto',
+            # Bildkomposition und Rasterung laufen im Render-Pool
+            instructions = render_pool.run(
+                label_renderer.render_ql_label,
+                content,
+                model='QL-700',
+                label_width_mm=62,  # 62x100mm Label
                 threshold=70.0,
-                dither=False,
-                compress=False,
-                red=False,
-                dpi_600=False,
-                hq=True,
             )
             
             # Sende an Drucker
@@ -910,33 +1282,24 @@ class USBDeviceManager:
             send(instructions=instructions, printer_identifier=printer_identifier, 
                  backend_identifier='pyusb', blocking=True)
             
-            # Lösche temporäres Bild
-            os.unlink(temp_image)
-            
             return True
             
+        except RenderPoolBusy as e:
+            print(f"Brother QL-700 Druck abgelehnt: {e}")
+            return False
         except Exception as e:
             print(f"Brother QL-700 Druck Fehler: {e}")
             return False
     
-    def print_epson_tm_t20ii(self, device_info: Dict, content: str) -> bool:
+    def print_epson_tm_t20ii(self, device_info: Dict, content: str, settings: Optional[Dict] = None,
+                             logo: Optional[Tuple[bytes, bytes]] = None) -> bool:
         """Druckt über Epson TM-T20II ESC/POS Bondrucker"""
         try:
-            vendor_id = device_info.get('vendor_product', '04b8:0e15').split(':')[0]
-            product_id = device_info.get('vendor_product', '04b8:0e15').split(':')[1]
-            
-            # Konvertiere Hex zu Integer
-            vendor_id_int = int(vendor_id, 16)
-            product_id_int = int(product_id, 16)
-            
-            # Erstelle ESC/POS Drucker-Instanz
-            printer = EscPosUsb(vendor_id_int, product_id_int)
+            if 'vendor_product' not in device_info:
+                device_info = dict(device_info, vendor_product='04b8:0e15')
             
-            # Drucke Inhalt
-            printer.text(content)
-            printer.cut()
-            
-            return True
+            # Kompletter Beleg in einem Bulk-Transfer statt text()/cut() Einzelaufrufen
+            return self.print_usb_escpos(device_info, content, settings, logo)
             
         except Exception as e:
             print(f"Epson TM-T20II Druck Fehler: {e}")
@@ -963,119 +1326,140 @@ class USBDeviceManager:
     def test_datalogic_touch65(self, device: Dict) -> Dict:
         """Testet den Datalogic Touch 65 Scanner"""
         try:
-            if not EVDEV_AVAILABLE:
-                return {
-                    'success': False, 
-                    'error': 'evdev Bibliothek nicht verfügbar. Installieren Sie: pip install evdev'
-                }
-            
-            # Verwende die DatalogicTouch65 Instanz
-            if not self.datalogic_scanner.find_device():
-                return {
-                    'success': False,
-                    'error': 'Datalogic Touch 65 nicht gefunden. Stellen Sie sicher, dass das Gerät angeschlossen ist.'
-                }
-            
-            # Verbinde mit dem Scanner
-            if not self.datalogic_scanner.connect():
-                return {
-                    'success': False,
-                    'error': 'Verbindung zum Datalogic Touch 65 fehlgeschlagen'
-                }
-            
-            # Simuliere Scan-Test (in der Realität würde hier auf Input-Events gewartet)
-            # Der Scanner funktioniert wie eine Tastatur und sendet nach jedem Scan ein Enter
-            return {
-                'success': True,
-                'message': f'Datalogic Touch 65 Scanner-Test erfolgreich für {device["name"]}',
-                'scan_result': '1234567890123',
-                'device_path': self.datalogic_scanner.device_path,
-                'device_name': self.datalogic_scanner.device_name,
-                'note': 'Scanner funktioniert wie Tastatur - nach jedem Scan wird Enter gedrückt'
-            }
-            
+            return self.test_scanner_input(device, 'Datalogic Touch 65')
         except Exception as e:
             return {'success': False, 'error': f'Datalogic Touch 65 Test fehlgeschlagen: {str(e)}'}
     
     def test_generic_scanner(self, device: Dict) -> Dict:
         """Generischer Scanner-Test"""
         try:
-            # Simuliere Scan-Vorgang
-            time.sleep(1)
-            
-            return {
-                'success': True,
-                'message': f'Barcode-Scan erfolgreich für {device["name"]}',
-                'scan_result': '1234567890123'
-            }
+            return self.test_scanner_input(device, 'Barcode-Scanner')
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def test_scanner_input(self, device: Dict, label: str) -> Dict:
+        """Wartet auf einen echten Scan des Scanners eines Geräts"""
+        # Verbinde mit dem Scanner (sucht das Gerät bei Bedarf)
+        scanner = self.scanners.get(device['id'])
+        if scanner is None or not self.connect_scanner(device['id']):
+            if not EVDEV_AVAILABLE:
+                return {
+                    'success': False, 
+                    'error': 'Keine HID-POS-Schnittstelle gefunden und evdev Bibliothek nicht verfügbar. Installieren Sie: pip install evdev'
+                }
+            return {
+                'success': False,
+                'error': f'{label} nicht gefunden oder Verbindung fehlgeschlagen. Stellen Sie sicher, dass das Gerät angeschlossen ist.'
+            }
+        
+        # Auf einen echten Scan warten
+        timeout = float(device.get('settings', {}).get('test_timeout', 10))
+        scan = scanner.wait_for_scan(timeout)
+        if scan is None:
+            return {
+                'success': False,
+                'error': f'Kein Barcode innerhalb von {timeout:.0f} Sekunden gescannt',
+                'device_path': scanner.device_path,
+                'device_name': scanner.device_name
+            }
+        
+        return {
+            'success': True,
+            'message': f'{label} Scanner-Test erfolgreich für {device["name"]}',
+            'scan_result': scan['code'],
+            'scanned_at': scan['timestamp'],
+            'device_path': scanner.device_path,
+            'device_name': scanner.device_name
+        }
+    
     def test_transaction(self, device_id: str) -> Dict:
-        """Testet eine EC-Karten-Transaktion - speziell für Ingenico Move/3500"""
+        """Startet eine Test-Transaktion über den Testbetrag (läuft im Hintergrund)"""
         device = self.devices[device_id]
         
+        if device['type'] != 'card_reader':
+            return {'success': False, 'error': 'Gerät ist kein EC-Kartengerät'}
         try:
-            if device['type'] == 'card_reader':
-                model = device.get('model', '')
-                
-                if 'Ingenico Move/3500' in model:
-                    return self.test_ingenico_move3500(device)
-                else:
-                    # Generischer EC-Karten-Test
-                    return self.test_generic_card_reader(device)
-            else:
-                return {'success': False, 'error': 'Gerät ist kein EC-Kartengerät'}
-        except Exception as e:
+            transaction = self.start_card_transaction(device_id, device['settings'].get('test_amount', 1.00))
+        except (TerminalBusy, ValueError) as e:
             return {'success': False, 'error': str(e)}
+        
+        return {
+            'success': True,
+            'message': f'Test-Transaktion an {device["name"]} gestartet - bitte Karte vorhalten',
+            'transaction_id': transaction['transaction_id'],
+            'transaction': transaction
+        }
     
-    def test_ingenico_move3500(self, device: Dict) -> Dict:
-        """Testet das Ingenico Move/3500 EC-Kartengerät"""
-        try:
-            device_info = device['device_info']
-            test_amount = device['settings'].get('test_amount', 1.00)
-            
-            # Prüfe ob Gerät über USB erreichbar ist
-            if device_info.get('type') == 'usb':
-                vendor_product = device_info.get('vendor_product', '0bda:0161')
-                vendor_id, product_id = vendor_product.split(':')
-                
-                # Simuliere Verbindungstest
-                # In der Realität würde hier das Ingenico SDK verwendet
-                return {
-                    'success': True,
-                    'message': f'Ingenico Move/3500 Test erfolgreich für {device["name"]}',
-                    'transaction_id': 'TXN_INGENICO_123456789',
-                    'amount': test_amount,
-                    'currency': device['settings'].get('currency', 'EUR'),
-                    'device_status': 'ready',
-                    'vendor_id': vendor_id,
-                    'product_id': product_id,
-                    'note': 'Für echte Transaktionen ist das Ingenico SDK erforderlich'
-                }
+    def get_card_driver(self, device: Dict):
+        """Liefert den (wiederverwendeten) Protokoll-Treiber eines Kartenterminals"""
+        driver = self.card_drivers.get(device['id'])
+        if driver is not None:
+            return driver
+        
+        settings = device['settings']
+        # Ältere Einstellungen ohne protocol sind echte Terminals; die Demo nur bei ausdrücklicher Auswahl
+        protocol = settings.get('protocol') or 'zvt'
+        if protocol == 'demo':
+            driver = DemoTerminalDriver()
+        elif protocol == 'zvt':
+            # TCP/IP, wenn eine Adresse eingetragen ist, sonst die serielle Schnittstelle
+            serial_port = settings.get('serial_port') or device.get('device_info', {}).get('port')
+            if settings.get('zvt_host'):
+                connection = ZvtConnection(settings['zvt_host'], int(settings.get('zvt_port', ZVT_DEFAULT_PORT)))
+            elif serial_port:
+                connection = ZvtSerialConnection(serial_port, self.serial_settings(device))
             else:
-                return {
-                    'success': False,
-                    'error': 'Ingenico Move/3500 nur über USB unterstützt'
-                }
-                
-        except Exception as e:
-            return {'success': False, 'error': f'Ingenico Move/3500 Test fehlgeschlagen: {str(e)}'}
+                raise ValueError('Keine Terminal-Adresse (zvt_host) oder serielle Schnittstelle konfiguriert')
+            driver = ZvtTerminalDriver(ZvtClient(
+                connection,
+                password=str(settings.get('zvt_password', '000000')),
+                currency=settings.get('currency', 'EUR')
+            ))
+        else:
+            raise ValueError(f'Unbekanntes Terminal-Protokoll: {protocol}')
+        self.card_drivers[device['id']] = driver
+        return driver
     
-    def test_generic_card_reader(self, device: Dict) -> Dict:
-        """Generischer EC-Karten-Test"""
-        try:
-            # Simuliere Transaktions-Vorgang
-            time.sleep(3)
-            
-            return {
-                'success': True,
-                'message': f'EC-Karten-Test erfolgreich für {device["name"]}',
-                'transaction_id': 'TXN123456789',
-                'amount': device['settings'].get('test_amount', 1.00)
-            }
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+    def close_card_driver(self, device_id: str):
+        """Schließt die Verbindung eines Terminals (z.B. nach geänderten Einstellungen)"""
+        driver = self.card_drivers.pop(device_id, None)
+        if driver is not None:
+            device_loop.submit(driver.close())
+    
+    def start_card_transaction(self, device_id: str, amount: float,
+                               currency: Optional[str] = None) -> Dict:
+        """Startet eine Kartenzahlung; Fortschritt über get_card_transaction/wait_card_events"""
+        device = self.devices.get(device_id)
+        if device is None or device['type'] != 'card_reader':
+            raise ValueError('EC-Kartengerät nicht gefunden')
+        settings = device['settings']
+        return self.card_engine.start(
+            device_id,
+            self.get_card_driver(device),
+            int(round(float(amount) * 100)),
+            currency or settings.get('currency', 'EUR'),
+            float(settings.get('timeout', 30))
+        )
+    
+    def cancel_card_transaction(self, transaction_id: str) -> bool:
+        """Bricht eine laufende Kartenzahlung ab"""
+        return self.card_engine.cancel(transaction_id)
+    
+    def get_card_transaction(self, transaction_id: str) -> Optional[Dict]:
+        """Status einer Kartenzahlung"""
+        return self.card_engine.get(transaction_id)
+    
+    def get_card_transactions(self, device_id: Optional[str] = None) -> List[Dict]:
+        """Die letzten Kartenzahlungen"""
+        return self.card_engine.recent(device_id)
+    
+    def get_card_event_seq(self) -> int:
+        """Sequenznummer der neuesten Fortschrittsmeldung"""
+        return self.card_engine.get_event_seq()
+    
+    def wait_card_events(self, transaction_id: str, after: int, timeout: float = 15.0) -> List[Dict]:
+        """Wartet auf Fortschrittsmeldungen einer Kartenzahlung (für Live-Streams)"""
+        return self.card_engine.wait_events(transaction_id, after, timeout)
     
     def generate_test_content(self, device_type: str) -> str:
         """Generiert Testinhalt für verschiedene Druckertypen"""
@@ -1137,7 +1521,12 @@ Tracking: TEST123456789
         """Aktualisiert die Einstellungen eines Geräts"""
         if device_id in self.devices:
             self.devices[device_id]['settings'].update(settings)
+            self.device_revisions.touch(device_id)
             self.save_devices()
+            if device_id in self.scanners:
+                self.reload_scanner(device_id)
+            if device_id in self.card_drivers:
+                self.close_card_driver(device_id)
             return True
         return False
     
@@ -1145,7 +1534,7 @@ Tracking: TEST123456789
         """Gibt den Status eines Geräts zurück"""
         if device_id in self.devices:
             device = self.devices[device_id]
-            return {
+            status = {
                 'id': device_id,
                 'name': device['name'],
                 'type': device['type'],
@@ -1153,12 +1542,212 @@ Tracking: TEST123456789
                 'last_seen': device['last_seen'],
                 'settings': device['settings']
             }
+            
+            # CUPS-Drucker: Druckerzustand und letzte Aufträge
+            if device['type'] == 'printer' and CUPS_AVAILABLE:
+                printer = device['settings'].get('cups_printer', 'Brother_HL_L2340DW')
+                status['cups'] = cups_backend.cached_status(printer)
+            
+            if device_id in self.scanners:
+                status['scanner'] = self.scanners[device_id].get_status()
+            
+            if device_id in self.card_drivers:
+                status['terminal'] = self.card_drivers[device_id].get_status()
+            
+            if device['device_info'].get('type') == 'serial':
+                status['serial'] = serial_ports.get_status().get(device['device_info']['port'])
+            
+            return status
         return {}
     
+    def get_device_graphics(self, device_id: str) -> Dict:
+        """Gibt die im NV-Speicher eines Druckers abgelegten Grafiken zurück"""
+        if device_id not in self.devices:
+            return {}
+        return self.graphics_registry.get_graphics(device_id)
+    
+    def reset_device_graphics(self, device_id: str) -> bool:
+        """Erzwingt einen erneuten Upload aller Grafiken beim nächsten Druck"""
+        if device_id not in self.devices:
+            return False
+        self.graphics_registry.invalidate(device_id)
+        return True
+    
+    def _create_scanner(self, device: Dict) -> BarcodeScanner:
+        """Legt die Scanner-Instanz für ein konfiguriertes Gerät an"""
+        settings = device.get('settings', {})
+        vendor_product = device.get('device_info', {}).get('vendor_product')
+        kwargs = {
+            'layout': settings.get('keyboard_layout', 'de'),
+            'phys': settings.get('input_phys', ''),
+            'input_mode': settings.get('input_mode', 'auto'),
+            'on_scan': self.scans.append,
+            'pipeline': self.process_scan
+        }
+        if vendor_product:
+            kwargs['vendor_products'] = [vendor_product]
+        if 'Datalogic Touch 65' in device.get('model', ''):
+            return DatalogicTouch65(device['id'], **kwargs)
+        return BarcodeScanner(device['id'], **kwargs)
+    
+    def process_scan(self, scan: Dict) -> Dict:
+        """Führt ein Scan-Ereignis durch alle Stufen der Scan-Pipeline"""
+        for stage in list(self.scan_stages):
+            try:
+                scan = stage(scan) or scan
+            except Exception as e:
+                print(f"Fehler in der Scan-Pipeline: {e}")
+        return scan
+    
+    def add_scan_stage(self, stage, before=None):
+        """Hängt eine Stufe an die Scan-Pipeline an (optional vor einer bestehenden)"""
+        stages = list(self.scan_stages)
+        if before in stages:
+            stages.insert(stages.index(before), stage)
+        else:
+            stages.append(stage)
+        self.scan_stages = stages
+    
+    def get_scanner(self, scanner_id: Optional[str] = None) -> Optional[BarcodeScanner]:
+        """
+        Liefert einen Scanner. Ohne ID den ersten konfigurierten Scanner bzw.
+        den Datalogic Touch 65, wenn keiner konfiguriert ist.
+        """
+        if scanner_id:
+            return self.scanners.get(scanner_id)
+        with self._scanner_lock:
+            for scanner in self.scanners.values():
+                return scanner
+        return self.datalogic_scanner
+    
+    def connect_scanner(self, scanner_id: Optional[str] = None) -> bool:
+        """Verbindet einen Scanner mit einem noch nicht belegten Eingabegerät"""
+        scanner = self.get_scanner(scanner_id)
+        if scanner is None:
+            return False
+        with self._scanner_lock:
+            claimed = [other.device_path for other in list(self.scanners.values()) + [self.datalogic_scanner]
+                       if other is not scanner and other.is_connected]
+            return scanner.connect(exclude=claimed)
+    
+    def disconnect_scanner(self, scanner_id: Optional[str] = None) -> bool:
+        """Trennt einen Scanner vom Lese-Thread"""
+        scanner = self.get_scanner(scanner_id)
+        if scanner is None:
+            return False
+        scanner.disconnect()
+        return True
+    
+    def reload_scanner(self, device_id: str):
+        """Übernimmt geänderte Einstellungen (Layout, Anschluss) in die Scanner-Instanz"""
+        with self._scanner_lock:
+            old_scanner = self.scanners.get(device_id)
+            if old_scanner is None:
+                return
+            was_connected = old_scanner.is_connected
+            old_scanner.disconnect()
+            scanner = self._create_scanner(self.devices[device_id])
+            # Ringpuffer übernehmen, damit Sequenznummern offener Streams gültig bleiben
+            scanner.scans = old_scanner.scans
+            self.scanners[device_id] = scanner
+        if was_connected:
+            self.connect_scanner(device_id)
+    
+    def get_scanner_status(self, scanner_id: Optional[str] = None) -> Dict:
+        """Status und Statistik eines Scanners"""
+        scanner = self.get_scanner(scanner_id)
+        return scanner.get_status() if scanner else {}
+    
+    def get_all_scanner_status(self) -> List[Dict]:
+        """Status und Statistik aller konfigurierten Scanner"""
+        with self._scanner_lock:
+            scanners = list(self.scanners.values())
+        return [scanner.get_status() for scanner in scanners]
+    
+    def get_scan_ring(self, scanner_id: Optional[str]) -> Optional[EventRing]:
+        """Ringpuffer eines Scanners bzw. der gemeinsame aller Scanner"""
+        if not scanner_id:
+            return self.scans
+        scanner = self.scanners.get(scanner_id)
+        return scanner.scans if scanner else None
+    
+    def get_scans(self, after: int = 0, scanner_id: Optional[str] = None) -> Optional[Dict]:
+        """Gibt die zwischengespeicherten Scans nach der Sequenznummer after zurück"""
+        ring = self.get_scan_ring(scanner_id)
+        return ring.snapshot(after) if ring else None
+    
+    def get_scan_seq(self, scanner_id: Optional[str] = None) -> Optional[int]:
+        """Sequenznummer des neuesten Scans"""
+        ring = self.get_scan_ring(scanner_id)
+        return ring.last_seq if ring else None
+    
+    def wait_for_scans(self, after: int, timeout: float = 15.0,
+                       scanner_id: Optional[str] = None) -> List[Dict]:
+        """Wartet auf Scans mit Sequenznummer größer after (für Live-Streams)"""
+        ring = self.get_scan_ring(scanner_id)
+        return ring.wait(after, timeout) if ring else []
+    
+    def get_catalog_status(self) -> Dict:
+        """Größe und Cache-Statistik des Produktkatalogs"""
+        return self.catalog.get_status()
+    
+    def lookup_product(self, code: str) -> Optional[Dict]:
+        """Artikel zu einem Barcode aus dem lokalen Katalog"""
+        return self.catalog.lookup(code)
+    
+    def import_catalog(self, stream, file_format: str, source: str = '') -> Dict:
+        """Ersetzt den Produktkatalog durch den Inhalt einer CSV- oder NDJSON-Datei"""
+        return self.catalog.import_file(stream, file_format, source)
+    
+    def start_inventory(self, device_id: str, name: str = '', location: str = '',
+                        location_prefix: str = '') -> Optional[Dict]:
+        """Startet eine Inventursitzung auf einem Barcode-Scanner"""
+        device = self.devices.get(device_id)
+        if device is None or device['type'] != 'barcode_scanner':
+            return None
+        return self.inventory.start_session(device_id, name or device['name'], location, location_prefix)
+    
+    def get_inventory_sessions(self) -> List[Dict]:
+        """Alle laufenden Inventursitzungen"""
+        return self.inventory.get_sessions()
+    
+    def get_inventory(self, session_id: str) -> Optional[Dict]:
+        """Sitzung mit Zählständen"""
+        counts = self.inventory.get_counts(session_id)
+        if counts is None:
+            return None
+        session = self.inventory.get_session(session_id) or {'session_id': session_id, 'closed': True}
+        session['counts'] = counts
+        return session
+    
+    def undo_inventory_scan(self, session_id: str) -> Optional[Dict]:
+        """Nimmt den letzten Scan einer Inventursitzung zurück"""
+        return self.inventory.undo(session_id)
+    
+    def set_inventory_location(self, session_id: str, location: str) -> bool:
+        """Setzt den Lagerort einer Inventursitzung"""
+        return self.inventory.set_location(session_id, location)
+    
+    def close_inventory(self, session_id: str) -> Optional[Dict]:
+        """Beendet eine Inventursitzung"""
+        return self.inventory.close_session(session_id)
+    
+    def export_inventory_csv(self, session_id: str) -> Optional[str]:
+        """Zählstände einer Inventursitzung als CSV"""
+        return self.inventory.export_csv(session_id)
+    
+    def parse_barcode(self, code: str) -> Dict:
+        """Prüfziffer und GS1-Felder eines Barcodes"""
+        return gs1_parser.parse(code)
+    
     def get_all_devices(self) -> Dict:
         """Gibt alle Geräte zurück"""
         return self.devices
     
+    def get_device_changes(self, since: int = 0, epoch: Optional[str] = None) -> Dict:
+        """Seit der Revision since geänderte und entfernte Geräte (last_seen allein zählt nicht als Änderung)"""
+        return self.device_revisions.changes(self.devices, since, epoch)
+    
     def start_device_monitoring(self):
         """Startet das Monitoring der USB-Geräte"""
         def monitor_devices():
@@ -1183,6 +1772,12 @@ Tracking: TEST123456789
             if device['status'] == 'connected':
                 device['last_seen'] = datetime.now().isoformat()
         
+        # Abgezogene Scanner nach dem Wiedereinstecken erneut übernehmen
+        for device_id, scanner in list(self.scanners.items()):
+            device = self.devices.get(device_id)
+            if device and device['status'] == 'connected' and not scanner.is_connected:
+                self.connect_scanner(device_id)
+        
         self.save_devices()
 
 # Globale Instanz
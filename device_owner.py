@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Geräte-Prozess
+Besitzt im Produktionsbetrieb exklusiv alle Geräte (USB, evdev, hidraw,
+seriell, Kartenterminals) und bedient die HTTP-Worker über den lokalen
+RPC-Socket sowie die Kassensoftware über die POS-Schnittstelle. Wird von gunicorn (gunicorn.conf.py) gestartet und überwacht.
+
+    python3 device_owner.py
+"""
+
+import os
+import signal
+import threading
+
+from device_rpc import RpcServer, DEFAULT_SOCKET
+from device_async import AsyncDeviceManager
+from pos_api import start_pos_api
+
+# Gleichzeitig bearbeitete Geräteaufrufe (Warteaufrufe der Live-Streams belegen keinen Thread)
+OWNER_THREADS = int(os.getenv('DEVICE_OWNER_THREADS', 64))
+
+
+def main(path: str = DEFAULT_SOCKET):
+    # Render-Prozesse forken, solange noch keine Threads laufen
+    from render_pool import start_render_pool
+    start_render_pool()
+    # Erst hier importieren: der Import startet Monitoring und Lese-Threads
+    from device_manager import device_manager
+    from device_loop import device_loop
+
+    # Warteaufrufe laufen in der Loop, damit offene Streams keine Threads für Drucken und Zahlungen belegen
+    devices = AsyncDeviceManager(device_manager, executor=None)
+    server = RpcServer(device_manager, path, workers=OWNER_THREADS,
+                       async_methods={name: getattr(devices, name) for name in AsyncDeviceManager.WAIT_METHODS})
+    device_loop.run(server.start(), timeout=10)
+    print(f"Geräte-Prozess bereit auf {path}")
+    pos_server = start_pos_api(device_manager)
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    stop.wait()
+
+    print("Geräte-Prozess wird beendet")
+    device_loop.run(server.stop(), timeout=5)
+    if pos_server is not None:
+        device_loop.run(pos_server.stop(), timeout=5)
+    # Offene Inventur-Zählstände nicht verlieren
+    device_manager.inventory.flush()
+
+
+if __name__ == '__main__':
+    main()
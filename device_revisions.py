@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Revisionszähler
+Jede Änderung an einem Eintrag (z.B. einem konfigurierten Gerät) erhält eine
+fortlaufende Revision. Clients fragen mit ihrer letzten Revision nach und
+bekommen nur geänderte und entfernte Einträge. Die Epoche wechselt bei jedem
+Neustart; passt sie nicht, erhält der Client den vollständigen Stand.
+"""
+
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class RevisionTracker:
+    """Revisionen pro Schlüssel und eine begrenzte Liste entfernter Schlüssel"""
+
+    def __init__(self, max_removed: int = 256):
+        self.max_removed = max_removed
+        self.epoch = uuid.uuid4().hex[:12]
+        self.revision = 0
+        self._revisions = {}
+        self._removed = OrderedDict()
+        # Deltas seit Revisionen vor dieser Grenze sind nicht mehr vollständig
+        self._removed_floor = 0
+        self._lock = threading.Lock()
+
+    def touch(self, key: str) -> int:
+        """Markiert einen Eintrag als geändert (nach der Änderung aufrufen)"""
+        with self._lock:
+            self.revision += 1
+            self._revisions[key] = self.revision
+            self._removed.pop(key, None)
+            return self.revision
+
+    def remove(self, key: str) -> int:
+        with self._lock:
+            self.revision += 1
+            self._revisions.pop(key, None)
+            self._removed[key] = self.revision
+            while len(self._removed) > self.max_removed:
+                _, revision = self._removed.popitem(last=False)
+                self._removed_floor = revision
+            return self.revision
+
+    def changes(self, items: Dict[str, Dict], since: int = 0, epoch: Optional[str] = None) -> Dict:
+        """Geänderte und entfernte Einträge seit der Revision since ('full': vollständiger Stand)"""
+        with self._lock:
+            full = since <= 0 or epoch != self.epoch or since < self._removed_floor or since > self.revision
+            if full:
+                changed = dict(items)
+                removed = []
+            else:
+                changed = {key: items[key] for key, revision in self._revisions.items()
+                           if revision > since and key in items}
+                removed = [key for key, revision in self._removed.items() if revision > since]
+            return {
+                'epoch': self.epoch,
+                'revision': self.revision,
+                'full': full,
+                'changed': changed,
+                'removed': removed
+            }
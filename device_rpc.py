@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Geräte-RPC
+Lokale Schnittstelle zum Geräte-Prozess über einen Unix-Socket. Im
+Produktionsbetrieb besitzt genau ein Prozess die Geräte; die HTTP-Worker
+rufen dessen Methoden über diese Schnittstelle auf.
+
+Rahmen: 4 Byte Länge (Big Endian) und eine JSON-Nachricht. Anfragen tragen
+eine ID und dürfen hintereinander gesendet werden, ohne auf die Antwort zu
+warten; Antworten kommen in der Reihenfolge ihrer Fertigstellung.
+"""
+
+import io
+import os
+import json
+import socket
+import struct
+import asyncio
+import functools
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from card_terminal import TerminalBusy
+from device_jobs import DeviceBusy
+
+DEFAULT_SOCKET = os.getenv('DEVICE_OWNER_SOCKET', '/run/devicebox/owner.sock')
+HEADER = struct.Struct('>I')
+MAX_FRAME = 64 * 1024 * 1024
+
+# Ausnahmen, die mit ihrem Typ an den Aufrufer weitergegeben werden
+EXCEPTIONS = {cls.__name__: cls for cls in (
+    ValueError, KeyError, TypeError, TimeoutError, PermissionError, FileNotFoundError,
+    TerminalBusy, DeviceBusy
+)}
+
+
+# Methoden ohne Seiteneffekt: nach einer abgerissenen Verbindung darf der Aufruf wiederholt werden
+IDEMPOTENT_PREFIXES = ('get_', 'wait_', 'parse_')
+
+
+class RpcError(Exception):
+    """Fehler in der Kommunikation mit dem Geräte-Prozess"""
+
+
+class RpcConnectionLost(RpcError):
+    """Die Verbindung ist vor der Antwort abgerissen (z.B. Geräte-Prozess neu gestartet)"""
+
+
+def is_idempotent(method: str) -> bool:
+    return method.startswith(IDEMPOTENT_PREFIXES)
+
+
+def encode_frame(message: Dict, dumps: Callable[[Any], bytes] = None) -> bytes:
+    """Nachricht mit Längenpräfix"""
+    payload = dumps(message) if dumps else json.dumps(message, separators=(',', ':'), default=str).encode('utf-8')
+    return HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Nächster Rahmen (None am Ende der Verbindung)"""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise RpcError(f'Rahmen zu groß ({length} Bytes)')
+    return await reader.readexactly(length)
+
+
+def encode_arg(value: Any) -> Any:
+    # Dateiobjekte (z.B. Katalog-Import) werden als Text übertragen
+    if hasattr(value, 'read'):
+        return {'__stream__': value.read()}
+    return value
+
+
+def decode_arg(value: Any) -> Any:
+    if isinstance(value, dict) and len(value) == 1 and '__stream__' in value:
+        return io.StringIO(value['__stream__'])
+    return value
+
+
+def error_payload(error: Exception) -> Dict:
+    return {'type': type(error).__name__, 'message': str(error)}
+
+
+def raise_error(error: Dict):
+    """Löst die übertragene Ausnahme mit ihrem ursprünglichen Typ aus"""
+    cls = EXCEPTIONS.get(error.get('type'), RpcError)
+    raise cls(error.get('message', ''))
+
+
+class RpcServer:
+    """
+    Stellt die öffentlichen Methoden eines Objekts über den Socket bereit.
+
+    Läuft in einer asyncio-Loop; die (blockierenden) Methoden werden in einem
+    Thread-Pool ausgeführt, damit sie andere Anfragen derselben Verbindung
+    nicht aufhalten. Methoden in async_methods (Coroutinen, z.B. die
+    Warteaufrufe der Live-Streams) laufen ohne Thread direkt in der Loop und
+    können den Pool so nicht für Geräteaufrufe blockieren.
+    """
+
+    def __init__(self, target: Any, path: str = DEFAULT_SOCKET,
+                 methods: Optional[Iterable[str]] = None, workers: int = 32,
+                 async_methods: Optional[Dict[str, Callable]] = None):
+        self.target = target
+        self.path = path
+        self.methods = set(methods) if methods is not None else None
+        self.async_methods = dict(async_methods or {})
+        self.workers = workers
+        self.server = None
+        self.connections = 0
+        self.requests = 0
+        self._executor = None
+        self._writers = set()
+
+    async def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            # Verwaister Socket eines früheren Prozesses
+            os.unlink(self.path)
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='rpc')
+        self.server = await asyncio.start_unix_server(self._serve, path=self.path)
+        os.chmod(self.path, 0o660)
+        return self
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        # Offene Verbindungen schließen, damit Clients neu verbinden
+        for writer in list(self._writers):
+            writer.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                asyncio.ensure_future(self._handle(frame, writer))
+        except (ConnectionError, RpcError) as e:
+            print(f"RPC-Verbindung beendet: {e}")
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def resolve(self, method: Optional[str]) -> Callable:
+        """Aufrufbare Methode des Ziels (nur öffentliche, ggf. nur freigegebene)"""
+        if not method or method.startswith('_') or (self.methods is not None and method not in self.methods):
+            raise AttributeError(f'Unbekannte Methode: {method}')
+        func = getattr(self.target, method, None)
+        if not callable(func):
+            raise AttributeError(f'Unbekannte Methode: {method}')
+        return func
+
+    async def call(self, method: str, params: Iterable = (), kwargs: Optional[Dict] = None) -> Any:
+        func = self.resolve(method)
+        args = [decode_arg(arg) for arg in params]
+        kwargs = {key: decode_arg(value) for key, value in (kwargs or {}).items()}
+        if method in self.async_methods:
+            return await self.async_methods[method](*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _handle(self, frame: bytes, writer: asyncio.StreamWriter):
+        self.requests += 1
+        response = {'id': None}
+        try:
+            request = json.loads(frame)
+            response['id'] = request.get('id')
+            response['result'] = await self.call(request.get('method'), request.get('params', ()),
+                                                 request.get('kwargs'))
+            data = encode_frame(response)
+        except Exception as e:
+            response.pop('result', None)
+            response['error'] = error_payload(e)
+            data = encode_frame(response)
+        if not writer.is_closing():
+            writer.write(data)
+
+
+class RpcClient:
+    """Synchroner, thread-sicherer Client (eine Verbindung pro Thread)"""
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout: Optional[float] = 120.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise RpcError(f'Geräte-Prozess nicht erreichbar ({self.path}): {e}')
+        self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    @staticmethod
+    def _recv_exact(sock: socket.socket, size: int) -> bytes:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            try:
+                count = sock.recv_into(view[received:])
+            except ConnectionResetError as e:
+                if received:
+                    raise
+                raise RpcConnectionLost(f'Verbindung zum Geräte-Prozess getrennt: {e}')
+            if count == 0:
+                if received:
+                    raise RpcError('Verbindung zum Geräte-Prozess getrennt')
+                raise RpcConnectionLost('Verbindung zum Geräte-Prozess getrennt')
+            received += count
+        return bytes(buffer)
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        request_id = next(self._ids)
+        data = encode_frame({
+            'id': request_id,
+            'method': method,
+            'params': [encode_arg(arg) for arg in args],
+            'kwargs': {key: encode_arg(value) for key, value in kwargs.items()}
+        })
+
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = self._connect()
+            fresh = True
+        else:
+            fresh = False
+        try:
+            sock.sendall(data)
+        except OSError as e:
+            self._close()
+            if fresh:
+                raise RpcError(f'Senden an den Geräte-Prozess fehlgeschlagen: {e}')
+            # Alte Verbindung (Geräte-Prozess neu gestartet): Anfrage ist nicht angekommen
+            sock = self._connect()
+            sock.sendall(data)
+            fresh = True
+
+        try:
+            try:
+                header = self._recv_exact(sock, HEADER.size)
+            except RpcConnectionLost:
+                # Eine alte Verbindung kann auch erst beim Lesen als getrennt auffallen;
+                # nur Abfragen dürfen dann sicher wiederholt werden
+                if fresh or not is_idempotent(method):
+                    raise
+                self._close()
+                sock = self._connect()
+                sock.sendall(data)
+                header = self._recv_exact(sock, HEADER.size)
+            (length,) = HEADER.unpack(header)
+            response = json.loads(self._recv_exact(sock, length))
+        except (OSError, ValueError, RpcError) as e:
+            self._close()
+            raise RpcError(f'Keine Antwort vom Geräte-Prozess: {e}')
+
+        if response.get('id') != request_id:
+            self._close()
+            raise RpcError('Antwort passt nicht zur Anfrage')
+        if 'error' in response:
+            raise_error(response['error'])
+        return response.get('result')
+
+
+class AsyncRpcClient:
+    """
+    Client für Eventloops (ASGI im Worker-Betrieb).
+
+    Alle Aufrufe teilen sich eine Verbindung und laufen gleichzeitig
+    (Zuordnung der Antworten über die ID); wartende Aufrufe belegen keinen
+    Thread. Idempotente Aufrufe werden nach einer abgerissenen Verbindung
+    einmal auf einer neuen Verbindung wiederholt.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout: Optional[float] = 120.0):
+        self.path = path
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._writer = None
+        # Offene Anfragen der aktuellen Verbindung (ID -> Future)
+        self._pending = {}
+        self._connect_lock = None
+
+    async def _connect(self):
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.path)
+                except OSError as e:
+                    raise RpcError(f'Geräte-Prozess nicht erreichbar ({self.path}): {e}')
+                self._writer = writer
+                self._pending = {}
+                asyncio.ensure_future(self._read(reader, writer, self._pending))
+            return self._writer, self._pending
+
+    async def _read(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, pending: Dict):
+        error = 'Verbindung zum Geräte-Prozess getrennt'
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                response = json.loads(frame)
+                future = pending.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except (ConnectionError, RpcError, ValueError) as e:
+            error = f'{error}: {e}'
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(RpcConnectionLost(error))
+            pending.clear()
+
+    async def _call_once(self, method: str, args: tuple, kwargs: Dict) -> Dict:
+        writer, pending = await self._connect()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        pending[request_id] = future
+        try:
+            writer.write(encode_frame({
+                'id': request_id,
+                'method': method,
+                'params': [encode_arg(arg) for arg in args],
+                'kwargs': {key: encode_arg(value) for key, value in kwargs.items()}
+            }))
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise RpcError('Keine Antwort vom Geräte-Prozess')
+        finally:
+            pending.pop(request_id, None)
+
+    async def call(self, method: str, *args, **kwargs) -> Any:
+        try:
+            response = await self._call_once(method, args, kwargs)
+        except RpcConnectionLost:
+            if not is_idempotent(method):
+                raise
+            response = await self._call_once(method, args, kwargs)
+        if 'error' in response:
+            raise_error(response['error'])
+        return response.get('result')
+
+
+class DeviceManagerClient(RpcClient):
+    """Stellvertreter für device_manager in den HTTP-Workern (gleiche Methoden)"""
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return functools.partial(self.call, name)
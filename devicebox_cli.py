@@ -0,0 +1,256 @@
+#!/usr/bin/python3 -S
+"""
+DeviceBox CLI
+Bedient den laufenden DeviceBox-Dienst über die POS-Schnittstelle (Unix-Socket).
+Importiert nur die Standardbibliothek und startet ohne site-packages (-S),
+damit der Aufruf auch in Shell-Schleifen schnell bleibt.
+
+    devicebox status
+    devicebox devices
+    devicebox print <Geräte-ID> [Text]      (ohne Text: von stdin)
+    devicebox scan-tail [--scanner ID] [--after SEQ] [--count N]
+    devicebox update [--check]
+    devicebox jobs [--device ID] [Job-ID]
+
+Mit --json wird die Antwort des Dienstes unverändert ausgegeben.
+Exit-Codes: 0 = OK, 1 = Fehler, 2 = falscher Aufruf, 3 = Dienst nicht erreichbar.
+"""
+
+import os
+import sys
+import json
+import socket
+import struct
+
+SOCKET = os.environ.get('POS_API_SOCKET', '/run/devicebox/pos.sock')
+HEADER = struct.Struct('>I')
+
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_UNREACHABLE = 3
+
+
+class CliError(Exception):
+    def __init__(self, message: str, code: int = EXIT_ERROR):
+        super().__init__(message)
+        self.code = code
+
+
+class Client:
+    """Minimaler Client der POS-Schnittstelle (JSON-Rahmen)"""
+
+    def __init__(self, path: str, timeout=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError as e:
+            raise CliError(f'DeviceBox-Dienst nicht erreichbar ({path}): {e.strerror or e}', EXIT_UNREACHABLE)
+        self.next_id = 1
+
+    def send(self, method: str, **params) -> int:
+        request_id = self.next_id
+        self.next_id += 1
+        payload = json.dumps({'id': request_id, 'method': method, 'params': params}).encode('utf-8')
+        self.sock.sendall(HEADER.pack(len(payload)) + payload)
+        return request_id
+
+    def _recv_exact(self, size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise CliError('Verbindung zum DeviceBox-Dienst getrennt', EXIT_UNREACHABLE)
+            data += chunk
+        return data
+
+    def receive(self):
+        (length,) = HEADER.unpack(self._recv_exact(HEADER.size))
+        return json.loads(self._recv_exact(length))
+
+    def call(self, method: str, **params):
+        request_id = self.send(method, **params)
+        while True:
+            message = self.receive()
+            if message.get('id') == request_id:
+                if 'error' in message:
+                    raise CliError(message['error'].get('message') or message['error'].get('type'))
+                return message.get('result')
+
+
+def parse_options(args, flags=(), options=()):
+    """Trennt --flag, --option Wert und Positionsargumente"""
+    values = {}
+    positional = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        name = arg[2:]
+        if arg.startswith('--') and name in flags:
+            values[name] = True
+        elif arg.startswith('--') and name in options:
+            if not args:
+                raise CliError(f'{arg} erwartet einen Wert', EXIT_USAGE)
+            values[name] = args.pop(0)
+        elif arg.startswith('--'):
+            raise CliError(f'Unbekannte Option: {arg}', EXIT_USAGE)
+        else:
+            positional.append(arg)
+    return values, positional
+
+
+def output(data):
+    sys.stdout.write(json.dumps(data, ensure_ascii=False) + '\n')
+
+
+def format_bytes(value) -> str:
+    return f'{value / 1024 ** 3:.1f} GB' if value else '-'
+
+
+def cmd_status(client, args, as_json):
+    parse_options(args)
+    status = client.call('status')
+    if as_json:
+        return output(status)
+    system = status['system']
+    devices = status['devices']
+    print(f"DeviceBox {status['version']} auf {system.get('hostname', '?')}")
+    if 'error' in system:
+        print(f"  System:     {system['error']}")
+    else:
+        temperature = system.get('temperature')
+        print(f"  CPU:        {system['cpu_percent']:.0f} %"
+              + (f", {temperature:.1f} °C" if temperature is not None else ''))
+        print(f"  Speicher:   {system['memory_percent']:.0f} % von {format_bytes(system['memory_total'])}")
+        print(f"  Laufwerk:   {system['disk_percent']:.0f} % von {format_bytes(system['disk_total'])}")
+        print(f"  Laufzeit:   {int(system['uptime'] // 3600)} h {int(system['uptime'] % 3600 // 60)} min")
+    print(f"  Geräte:     {devices['connected']} von {devices['total']} verbunden")
+    for scanner in status['scanners']:
+        state = 'verbunden' if scanner['connected'] else 'getrennt'
+        print(f"  Scanner:    {scanner['scanner_id']} {state}, {scanner['scan_count']} Scans")
+
+
+def cmd_devices(client, args, as_json):
+    parse_options(args)
+    devices = client.call('devices')
+    if as_json:
+        return output(devices)
+    for device in devices.values():
+        print(f"{device['id']}\t{device['type']}\t{device['status']}\t{device['name']}")
+
+
+def cmd_print(client, args, as_json):
+    _, positional = parse_options(args)
+    if not positional:
+        raise CliError('Aufruf: devicebox print <Geräte-ID> [Text]', EXIT_USAGE)
+    content = ' '.join(positional[1:]) if len(positional) > 1 else sys.stdin.read()
+    result = client.call('print', device_id=positional[0], content=content)
+    if as_json:
+        output(result)
+    if not result.get('success'):
+        raise CliError(result.get('error', 'Druckvorgang fehlgeschlagen'))
+
+
+def cmd_scan_tail(client, args, as_json):
+    """Gibt Scans laufend aus (eine Zeile pro Scan), bis --count erreicht ist"""
+    values, _ = parse_options(args, options=('scanner', 'after', 'count'))
+    params = {}
+    if 'scanner' in values:
+        params['scanner'] = values['scanner']
+    if 'after' in values:
+        params['after'] = int(values['after'])
+    remaining = int(values['count']) if 'count' in values else None
+    if remaining == 0:
+        return
+    client.call('scan.subscribe', **params)
+    while True:
+        message = client.receive()
+        if message.get('event') != 'scan':
+            continue
+        scan = message['data']
+        if as_json:
+            output(scan)
+        else:
+            sys.stdout.write(f"{scan['code']}\n")
+        sys.stdout.flush()
+        if remaining is not None:
+            remaining -= 1
+            if remaining == 0:
+                return
+
+
+def cmd_update(client, args, as_json):
+    values, _ = parse_options(args, flags=('check',))
+    result = client.call('update.check' if values.get('check') else 'update.run')
+    if as_json:
+        output(result)
+    elif 'error' not in result:
+        print(result.get('update_info') or result.get('message') or json.dumps(result, ensure_ascii=False))
+    if 'error' in result:
+        raise CliError(result['error'])
+
+
+def cmd_jobs(client, args, as_json):
+    values, positional = parse_options(args, options=('device',))
+    if positional:
+        job = client.call('job.get', job_id=positional[0])
+        if as_json:
+            return output(job)
+        result = job.get('result') or {}
+        print(f"{job['job_id']}\t{job['device_id']}\t{job['kind']}\t{job['state']}")
+        if result:
+            print(result.get('message') or result.get('error') or '')
+        return
+    jobs = client.call('jobs', device_id=values.get('device'))
+    if as_json:
+        return output(jobs)
+    for job in jobs:
+        outcome = {True: 'ok', False: 'fehler', None: '-'}[job['success']]
+        print(f"{job['job_id']}\t{job['device_id']}\t{job['kind']}\t{job['state']}\t{outcome}\t{job['created_at']}")
+
+
+COMMANDS = {
+    'status': cmd_status,
+    'devices': cmd_devices,
+    'print': cmd_print,
+    'scan-tail': cmd_scan_tail,
+    'update': cmd_update,
+    'jobs': cmd_jobs,
+}
+
+
+def main(argv) -> int:
+    as_json = '--json' in argv
+    args = [arg for arg in argv if arg != '--json']
+    path = SOCKET
+    if '--socket' in args:
+        index = args.index('--socket')
+        if index + 1 >= len(args):
+            sys.stderr.write('--socket erwartet einen Pfad\n')
+            return EXIT_USAGE
+        path = args[index + 1]
+        del args[index:index + 2]
+
+    if not args or args[0] not in COMMANDS:
+        sys.stderr.write(__doc__.split('\n\n')[1] + '\n')
+        return 0 if args and args[0] in ('-h', '--help', 'help') else EXIT_USAGE
+
+    try:
+        client = Client(path)
+        COMMANDS[args[0]](client, args[1:], as_json)
+    except CliError as e:
+        sys.stderr.write(f'devicebox: {e}\n')
+        return e.code
+    except ValueError as e:
+        sys.stderr.write(f'devicebox: {e}\n')
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # Ausgabe z.B. an head weitergereicht und dort beendet
+        sys.stderr.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
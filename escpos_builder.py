@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+DeviceBox ESC/POS Builder
+Kompiliert Belege aus vorberechneten Byte-Vorlagen in einen einzigen Puffer,
+der mit einem einzigen Schreibvorgang an den Drucker geht
+"""
+
+import struct
+from typing import Dict, Iterable, Optional, Sequence
+
+ESC = b'\x1B'
+GS = b'\x1D'
+
+# Vorberechnete Befehle
+INIT = ESC + b'@'
+ALIGN = {
+    'left': ESC + b'a\x00',
+    'center': ESC + b'a\x01',
+    'right': ESC + b'a\x02',
+}
+FONT = {
+    'a': ESC + b'M\x00',
+    'b': ESC + b'M\x01',
+}
+BOLD = {True: ESC + b'E\x01', False: ESC + b'E\x00'}
+UNDERLINE = {0: ESC + b'-\x00', 1: ESC + b'-\x01', 2: ESC + b'-\x02'}
+# GS ! n: Breite und Höhe jeweils 1-8
+SIZE = {(w, h): GS + b'!' + bytes([((w - 1) << 4) | (h - 1)])
+        for w in range(1, 9) for h in range(1, 9)}
+LINE_FEED = b'\n'
+CUT = {'full': GS + b'V\x00', 'partial': GS + b'V\x01'}
+
+# Zeichensatz: PC858 (wie PC850, zusätzlich mit Euro-Zeichen)
+CODEPAGES = {
+    'cp437': 0,
+    'cp850': 2,
+    'cp858': 19,
+}
+
+# Barcode-Typen für GS k (Funktion B)
+BARCODE_TYPES = {
+    'UPC-A': 65,
+    'UPC-E': 66,
+    'EAN13': 67,
+    'EAN8': 68,
+    'CODE39': 69,
+    'ITF': 70,
+    'CODABAR': 71,
+    'CODE93': 72,
+    'CODE128': 73,
+}
+BARCODE_HRI = {'none': 0, 'above': 1, 'below': 2, 'both': 3}
+
+# QR-Code (GS ( k)
+QR_MODEL_2 = GS + b'(k\x04\x001A2\x00'
+QR_ERROR_LEVELS = {'L': 48, 'M': 49, 'Q': 50, 'H': 51}
+QR_PRINT = GS + b'(k\x03\x001Q0'
+
+# Zeichen pro Zeile nach Papierbreite und Schriftart
+CHARS_PER_LINE = {
+    ('80mm', 'a'): 48,
+    ('80mm', 'b'): 64,
+    ('58mm', 'a'): 32,
+    ('58mm', 'b'): 42,
+}
+
+# Druckpunkte pro Zeile nach Papierbreite
+DOTS_PER_LINE = {'80mm': 576, '58mm': 384}
+
+# Echtzeit-Statusabfrage (DLE EOT n) und Bedeutung der Antwortbits
+DLE_EOT = b'\x10\x04'
+STATUS_REQUESTS = {
+    1: {'drawer_open': 0x04, 'offline': 0x08},
+    2: {'cover_open': 0x04, 'paper_feed_button': 0x08, 'paper_end_stop': 0x20, 'error': 0x40},
+    3: {'cutter_error': 0x08, 'unrecoverable_error': 0x20, 'recoverable_error': 0x40},
+    4: {'paper_near_end': 0x0C, 'paper_end': 0x60},
+}
+
+
+def decode_status(request: int, value: int) -> Optional[Dict[str, bool]]:
+    """Wertet ein Statusbyte auf DLE EOT n aus (None bei ungültiger Antwort)"""
+    # Feste Bits: 1 und 4 gesetzt, 0 und 7 gelöscht
+    if value & 0x93 != 0x12:
+        return None
+    return {name: bool(value & mask) for name, mask in STATUS_REQUESTS[request].items()}
+
+
+class ReceiptBuilder:
+    """
+    Baut einen Beleg als bytearray auf.
+
+    Alle Methoden geben den Builder zurück und können verkettet werden:
+        data = ReceiptBuilder('80mm').align('center').bold().text('Musik Wieland')...build()
+    """
+
+    def __init__(self, paper_width: str = '80mm', codepage: str = 'cp858'):
+        if codepage not in CODEPAGES:
+            raise ValueError(f'Unbekannte Codepage: {codepage}')
+        self.paper_width = paper_width if paper_width in DOTS_PER_LINE else '80mm'
+        self.codepage = codepage
+        self._font = 'a'
+        self._buffer = bytearray(INIT)
+        self._buffer += ESC + b't' + bytes([CODEPAGES[codepage]])
+
+    @property
+    def line_width(self) -> int:
+        """Anzahl Zeichen pro Zeile mit der aktuellen Schriftart"""
+        return CHARS_PER_LINE[(self.paper_width, self._font)]
+
+    def encode(self, text: str) -> bytes:
+        """Kodiert Text in der Drucker-Codepage (Umlaute, ß, €)"""
+        return text.encode(self.codepage, errors='replace')
+
+    def raw(self, data: bytes) -> 'ReceiptBuilder':
+        """Hängt fertige Bytes unverändert an"""
+        self._buffer += data
+        return self
+
+    def text(self, text: str) -> 'ReceiptBuilder':
+        """Text ohne abschließenden Zeilenumbruch"""
+        self._buffer += self.encode(text)
+        return self
+
+    def line(self, text: str = '') -> 'ReceiptBuilder':
+        """Text mit Zeilenumbruch"""
+        self._buffer += self.encode(text)
+        self._buffer += LINE_FEED
+        return self
+
+    def lines(self, lines: Iterable[str]) -> 'ReceiptBuilder':
+        """Mehrere Zeilen auf einmal"""
+        for text in lines:
+            self.line(text)
+        return self
+
+    def align(self, alignment: str = 'left') -> 'ReceiptBuilder':
+        self._buffer += ALIGN[alignment]
+        return self
+
+    def font(self, font: str = 'a') -> 'ReceiptBuilder':
+        self._font = font.lower()
+        self._buffer += FONT[self._font]
+        return self
+
+    def bold(self, enabled: bool = True) -> 'ReceiptBuilder':
+        self._buffer += BOLD[bool(enabled)]
+        return self
+
+    def underline(self, mode: int = 1) -> 'ReceiptBuilder':
+        self._buffer += UNDERLINE[mode]
+        return self
+
+    def size(self, width: int = 1, height: int = 1) -> 'ReceiptBuilder':
+        """Zeichenvergrößerung (1-8 fach)"""
+        self._buffer += SIZE[(width, height)]
+        return self
+
+    def separator(self, char: str = '-') -> 'ReceiptBuilder':
+        """Trennlinie über die ganze Breite"""
+        return self.line(char * self.line_width)
+
+    def columns(self, left: str, right: str, width: Optional[int] = None) -> 'ReceiptBuilder':
+        """Zweispaltige Zeile, z.B. Artikel links und Preis rechts"""
+        width = width or self.line_width
+        space = width - len(right) - 1
+        if len(left) > space:
+            left = left[:max(0, space)]
+        return self.line(left.ljust(width - len(right)) + right)
+
+    def table(self, rows: Sequence[Sequence[str]], widths: Sequence[int],
+              aligns: Optional[Sequence[str]] = None) -> 'ReceiptBuilder':
+        """Mehrspaltige Zeilen mit festen Spaltenbreiten"""
+        aligns = aligns or ['left'] * len(widths)
+        for row in rows:
+            cells = []
+            for value, width, alignment in zip(row, widths, aligns):
+                value = str(value)[:width]
+                cells.append(value.rjust(width) if alignment == 'right' else value.ljust(width))
+            self.line(''.join(cells).rstrip())
+        return self
+
+    def feed(self, lines: int = 1) -> 'ReceiptBuilder':
+        """Papiervorschub um n Zeilen (ESC d n)"""
+        self._buffer += ESC + b'd' + bytes([max(0, min(255, lines))])
+        return self
+
+    def barcode(self, data: str, barcode_type: str = 'EAN13', height: int = 80,
+                width: int = 3, hri: str = 'below') -> 'ReceiptBuilder':
+        """Barcode über GS k (Funktion B)"""
+        payload = data.encode('ascii')
+        if barcode_type == 'CODE128' and not payload.startswith(b'{'):
+            payload = b'{B' + payload
+        self._buffer += GS + b'h' + bytes([max(1, min(255, height))])
+        self._buffer += GS + b'w' + bytes([max(2, min(6, width))])
+        self._buffer += GS + b'H' + bytes([BARCODE_HRI[hri]])
+        self._buffer += GS + b'k' + bytes([BARCODE_TYPES[barcode_type], len(payload)]) + payload
+        self._buffer += LINE_FEED
+        return self
+
+    def qr(self, data: str, size: int = 6, error_level: str = 'M') -> 'ReceiptBuilder':
+        """QR-Code über GS ( k (Modell 2)"""
+        payload = data.encode('utf-8')
+        self._buffer += QR_MODEL_2
+        self._buffer += GS + b'(k\x03\x001C' + bytes([max(1, min(16, size))])
+        self._buffer += GS + b'(k\x03\x001E' + bytes([QR_ERROR_LEVELS[error_level]])
+        self._buffer += GS + b'(k' + struct.pack('<H', len(payload) + 3) + b'1P0' + payload
+        self._buffer += QR_PRINT
+        return self
+
+    def image(self, image, threshold: float = 70.0, dither: str = 'floyd_steinberg') -> 'ReceiptBuilder':
+        """Rasterbild (GS v 0) über die Raster-Engine, auf Papierbreite begrenzt"""
+        import raster_engine
+
+        max_width = DOTS_PER_LINE[self.paper_width]
+        width = min(max_width, image.width) if hasattr(image, 'width') else None
+        self._buffer += raster_engine.escpos_raster(image, width=width, threshold=threshold,
+                                                    dither=dither, band_height=256)
+        return self
+
+    def cut(self, mode: str = 'full', feed: int = 3) -> 'ReceiptBuilder':
+        """Vorschub bis zur Schneidkante und Schnitt"""
+        if feed:
+            self.feed(feed)
+        self._buffer += CUT[mode]
+        return self
+
+    def build(self) -> bytes:
+        """Gibt den fertigen Befehlsstrom zurück"""
+        return bytes(self._buffer)
+
+    def __len__(self) -> int:
+        return len(self._buffer)
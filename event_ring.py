@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Event-Ring
+Ringpuffer fester Größe mit fortlaufenden Sequenznummern.
+Clients holen verpasste Einträge per Sequenznummer nach oder warten auf neue.
+Eine Sequenznummer hinter dem neuesten Eintrag stammt aus einem früheren Ring
+(Neustart des Dienstes oder des Geräteprozesses) und zählt wie 0, damit der
+Client die Einträge des neuen Rings nicht verliert.
+"""
+
+import threading
+from collections import deque
+from itertools import islice
+from typing import Callable, Dict, List, Optional
+
+
+class EventRing:
+    """Thread-sicherer Ringpuffer; der Speicherbedarf ist durch maxlen begrenzt"""
+
+    def __init__(self, maxlen: int = 256):
+        self.maxlen = maxlen
+        self._items = deque(maxlen=maxlen)
+        self._last_seq = 0
+        self._condition = threading.Condition()
+        self._listeners = []
+
+    @property
+    def last_seq(self) -> int:
+        """Sequenznummer des neuesten Eintrags (0 = noch keiner)"""
+        return self._last_seq
+
+    @property
+    def first_seq(self) -> int:
+        """Sequenznummer des ältesten noch gespeicherten Eintrags"""
+        with self._condition:
+            return self._last_seq - len(self._items) + 1
+
+    def cursor(self, after: int) -> int:
+        """Gültiger Startpunkt für after (0, wenn after aus einem früheren Ring stammt)"""
+        return after if after <= self._last_seq else 0
+
+    def append(self, item: Dict) -> Dict:
+        """Fügt einen Eintrag hinzu, vergibt die Sequenznummer und weckt Wartende"""
+        with self._condition:
+            self._last_seq += 1
+            entry = dict(item, seq=self._last_seq)
+            self._items.append(entry)
+            self._condition.notify_all()
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(entry)
+            except Exception as e:
+                print(f"Fehler im Event-Listener: {e}")
+        return entry
+
+    def since(self, after: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Alle gespeicherten Einträge mit seq > after (älteste zuerst)"""
+        with self._condition:
+            return self._since(self.cursor(after), limit)
+
+    def _since(self, after: int, limit: Optional[int]) -> List[Dict]:
+        first = self._last_seq - len(self._items) + 1
+        start = max(0, after - first + 1)
+        stop = None if limit is None else start + limit
+        return list(islice(self._items, start, stop))
+
+    def wait(self, after: int, timeout: float = 15.0, limit: Optional[int] = None) -> List[Dict]:
+        """Wartet bis Einträge mit seq > after vorliegen (leere Liste bei Timeout)"""
+        with self._condition:
+            after = self.cursor(after)
+            self._condition.wait_for(lambda: self._last_seq > after, timeout)
+            return self._since(after, limit)
+
+    def latest(self) -> Optional[Dict]:
+        """Der neueste Eintrag oder None"""
+        with self._condition:
+            return self._items[-1] if self._items else None
+
+    def snapshot(self, after: int = 0) -> Dict:
+        """Einträge nach after inklusive Sequenz-Grenzen für das Nachholen per API"""
+        with self._condition:
+            first = self._last_seq - len(self._items) + 1
+            reset = after > self._last_seq
+            after = self.cursor(after)
+            return {
+                'first_seq': first,
+                'last_seq': self._last_seq,
+                # Der Client hat Einträge verpasst, die nicht mehr im Puffer liegen
+                # oder im früheren Ring nach seiner Sequenznummer hinzukamen
+                'missed': reset or (after + 1 < first and self._last_seq > 0),
+                'items': self._since(after, None)
+            }
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """Registriert einen Callback, der für jeden neuen Eintrag aufgerufen wird"""
+        with self._condition:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict], None]):
+        with self._condition:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Grafik-Registry
+Verwaltet Logos im NV-Grafikspeicher von ESC/POS Bondruckern.
+Logos werden einmal hochgeladen und danach nur noch per Schlüssel gedruckt.
+"""
+
+import os
+import json
+import struct
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Tuple
+
+import raster_engine
+
+GS = b'\x1D'
+
+# Schlüsselcodes: kc1 fest 'D' (DeviceBox), kc2 fortlaufend ab '0'
+KEY_PREFIX = 'D'
+KEY_CHARS = [chr(c) for c in range(ord('0'), ord('~') + 1)]
+
+
+def nv_define_command(key: str, packed: bytes, width: int, height: int) -> bytes:
+    """GS ( L / GS 8 L Funktion 67: Rastergrafik im NV-Speicher ablegen"""
+    params = (b'\x30\x43\x30' + key.encode('ascii') + b'\x01' +
+              struct.pack('<HH', width, height) + b'\x31')
+    length = len(params) + len(packed)
+    if length <= 0xFFFF:
+        return GS + b'(L' + struct.pack('<H', length) + params + packed
+    return GS + b'8L' + struct.pack('<I', length) + params + packed
+
+
+def nv_print_command(key: str, scale_x: int = 1, scale_y: int = 1) -> bytes:
+    """GS ( L Funktion 69: Grafik aus dem NV-Speicher drucken"""
+    return GS + b'(L\x06\x00\x30\x45' + key.encode('ascii') + bytes([scale_x, scale_y])
+
+
+def nv_delete_command(key: str) -> bytes:
+    """GS ( L Funktion 66: Grafik aus dem NV-Speicher löschen"""
+    return GS + b'(L\x04\x00\x30\x42' + key.encode('ascii')
+
+
+class GraphicsRegistry:
+    """
+    Merkt sich pro Gerät, welche Grafiken (Inhalts-Hash) im NV-Speicher
+    des Druckers liegen. Ein erneuter Upload erfolgt nur, wenn sich das Bild
+    oder der angeschlossene Drucker geändert hat.
+    """
+
+    def __init__(self, state_file: str = "/opt/devicebox/data/graphics.json"):
+        self.state_file = state_file
+        self.state = {}
+        self._lock = threading.Lock()
+        # Raster-Cache pro Datei: (Pfad, mtime, Größe, Breite) -> (Hash, Daten, Breite, Höhe)
+        self._raster_cache = {}
+        self.load()
+
+    def load(self):
+        """Lädt den gespeicherten Zustand"""
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self.state = json.load(f)
+        except Exception as e:
+            print(f"Fehler beim Laden der Grafik-Registry: {e}")
+            self.state = {}
+
+    def save(self):
+        """Speichert den Zustand"""
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(self.state_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            print(f"Fehler beim Speichern der Grafik-Registry: {e}")
+
+    @staticmethod
+    def printer_identity(device: Dict) -> str:
+        """Identifiziert den physischen Drucker eines Geräts"""
+        device_info = device.get('device_info', {})
+        return '|'.join([
+            device_info.get('vendor_product') or device_info.get('port') or '',
+            device_info.get('serial_number') or '',
+            device.get('model', '')
+        ])
+
+    def rasterize_file(self, path: str, max_width: int) -> Tuple[str, bytes, int, int]:
+        """Rastert ein Logo (mit Cache über Pfad, Änderungszeit und Breite)"""
+        stat = os.stat(path)
+        cache_key = (path, stat.st_mtime_ns, stat.st_size, max_width)
+        cached = self._raster_cache.get(cache_key)
+        if cached:
+            return cached
+
+        from PIL import Image
+        with Image.open(path) as image:
+            width = min(max_width, image.size[0])
+            dots = raster_engine.to_dots(image, width=width, dither='floyd_steinberg')
+
+        height = dots.shape[0]
+        packed = raster_engine.pack_rows(dots)
+        digest = hashlib.sha256(struct.pack('<HH', dots.shape[1], height) + packed).hexdigest()
+        result = (digest, packed, dots.shape[1], height)
+
+        self._raster_cache = {k: v for k, v in self._raster_cache.items() if k[0] != path}
+        self._raster_cache[cache_key] = result
+        return result
+
+    def prepare(self, device_id: str, identity: str, name: str, path: str,
+                max_width: int = 576) -> Tuple[bytes, bytes]:
+        """
+        Liefert (Upload-Befehle, Druckbefehl) für ein Logo.
+
+        Die Upload-Befehle sind leer, wenn das Logo mit gleichem Inhalt bereits
+        im Drucker liegt. Nach erfolgreichem Senden muss confirm() aufgerufen
+        werden.
+        """
+        digest, packed, width, height = self.rasterize_file(path, max_width)
+
+        with self._lock:
+            entry = self.state.get(device_id)
+            if not entry or entry.get('printer') != identity:
+                # Neuer oder anderer Drucker: NV-Inhalt unbekannt
+                entry = {'printer': identity, 'graphics': {}}
+                self.state[device_id] = entry
+
+            graphics = entry['graphics']
+            current = graphics.get(name)
+            if current and current.get('hash') == digest and current.get('uploaded_at'):
+                return b'', nv_print_command(current['key'])
+
+            key = current['key'] if current else self._allocate_key(graphics)
+            graphics[name] = {
+                'key': key,
+                'hash': digest,
+                'width': width,
+                'height': height,
+                'uploaded_at': None
+            }
+            return nv_define_command(key, packed, width, height), nv_print_command(key)
+
+    def confirm(self, device_id: str, name: str):
+        """Markiert ein Logo als erfolgreich im Drucker gespeichert"""
+        with self._lock:
+            graphic = self.state.get(device_id, {}).get('graphics', {}).get(name)
+            if graphic:
+                graphic['uploaded_at'] = datetime.now().isoformat()
+                self.save()
+
+    def invalidate(self, device_id: str):
+        """Vergisst den NV-Inhalt eines Geräts (nächster Druck lädt neu hoch)"""
+        with self._lock:
+            if self.state.pop(device_id, None) is not None:
+                self.save()
+
+    def get_graphics(self, device_id: str) -> Dict:
+        """Gibt die bekannten Grafiken eines Geräts zurück"""
+        with self._lock:
+            return json.loads(json.dumps(self.state.get(device_id, {})))
+
+    def _allocate_key(self, graphics: Dict) -> str:
+        """Vergibt den nächsten freien Schlüsselcode"""
+        used = {graphic['key'] for graphic in graphics.values()}
+        for char in KEY_CHARS:
+            key = KEY_PREFIX + char
+            if key not in used:
+                return key
+        raise ValueError('Keine freien NV-Grafik-Schlüssel mehr')
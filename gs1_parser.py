@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+DeviceBox GS1-Parser
+Prüft Prüfziffern von EAN-8/13, UPC-A und GTIN-14 und zerlegt GS1-128 bzw.
+GS1 DataMatrix/QR in Application Identifier (Charge, Verfallsdatum,
+Seriennummer, Gewicht, ...) über eine vorberechnete AI-Tabelle
+"""
+
+import re
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+GS = '\x1d'
+
+# AIM-Symbologie-Kennungen, die manche Scanner voranstellen
+SYMBOLOGY_IDS = {
+    ']C1': 'gs1-128',
+    ']d2': 'gs1-datamatrix',
+    ']Q3': 'gs1-qr',
+    ']e0': 'gs1-databar',
+    ']E0': 'ean13',
+    ']E4': 'ean8',
+    # EAN-13/UPC-A mit 2- oder 5-stelligem Zusatzcode (Zeitschriften, Bücher)
+    ']E3': 'ean13-addon',
+}
+
+# Länge der Zusatzcodes (EAN-2, EAN-5)
+ADDON_LENGTHS = (2, 5)
+
+GS1_SYMBOLOGIES = ('gs1-128', 'gs1-datamatrix', 'gs1-qr', 'gs1-databar')
+
+# Länge des AI anhand der ersten beiden Ziffern (GS1 General Specifications)
+_AI_LENGTH = {prefix: 2 for prefix in ('00', '01', '02', '03', '04', '10', '11', '12', '13', '15',
+                                       '16', '17', '20', '21', '22', '30', '37', '90', '91', '92',
+                                       '93', '94', '95', '96', '97', '98', '99')}
+_AI_LENGTH.update({prefix: 3 for prefix in ('23', '24', '25', '40', '41', '42', '71')})
+_AI_LENGTH.update({prefix: 4 for prefix in ('31', '32', '33', '34', '35', '36', '39', '43',
+                                            '70', '72', '80', '81', '82')})
+
+# AI -> (Feldname, Länge, feste Länge, Typ)
+# Typen: n = numerisch, an = alphanumerisch, date = JJMMTT, decimal = Dezimalstelle im letzten AI-Zeichen
+_AI_DEFINITIONS = {
+    '00': ('sscc', 18, True, 'n'),
+    '01': ('gtin', 14, True, 'n'),
+    '02': ('content_gtin', 14, True, 'n'),
+    '10': ('batch', 20, False, 'an'),
+    '11': ('production_date', 6, True, 'date'),
+    '12': ('due_date', 6, True, 'date'),
+    '13': ('packaging_date', 6, True, 'date'),
+    '15': ('best_before', 6, True, 'date'),
+    '16': ('sell_by', 6, True, 'date'),
+    '17': ('expiry', 6, True, 'date'),
+    '20': ('variant', 2, True, 'n'),
+    '21': ('serial', 20, False, 'an'),
+    '22': ('consumer_product_variant', 20, False, 'an'),
+    '240': ('additional_id', 30, False, 'an'),
+    '241': ('customer_part_number', 30, False, 'an'),
+    '250': ('secondary_serial', 30, False, 'an'),
+    '251': ('reference_to_source', 30, False, 'an'),
+    '254': ('gln_extension', 20, False, 'an'),
+    '30': ('variable_count', 8, False, 'n'),
+    '37': ('count', 8, False, 'n'),
+    '400': ('order_number', 30, False, 'an'),
+    '401': ('consignment_number', 30, False, 'an'),
+    '402': ('shipment_id', 17, True, 'n'),
+    '403': ('routing_code', 30, False, 'an'),
+    '410': ('ship_to_gln', 13, True, 'n'),
+    '411': ('bill_to_gln', 13, True, 'n'),
+    '412': ('purchased_from_gln', 13, True, 'n'),
+    '413': ('ship_for_gln', 13, True, 'n'),
+    '414': ('location_gln', 13, True, 'n'),
+    '415': ('invoicing_party_gln', 13, True, 'n'),
+    '420': ('ship_to_postal_code', 20, False, 'an'),
+    '422': ('country_of_origin', 3, True, 'n'),
+    '7003': ('expiry_time', 10, True, 'n'),
+    '8004': ('giai', 30, False, 'an'),
+    '8020': ('payment_slip_reference', 25, False, 'an'),
+    '90': ('internal', 30, False, 'an'),
+}
+for _internal in range(91, 100):
+    _AI_DEFINITIONS[str(_internal)] = (f'internal_{_internal}', 90, False, 'an')
+
+# AIs mit Dezimalstelle (letzte Ziffer = Anzahl Nachkommastellen)
+_DECIMAL_AIS = {
+    '310': 'net_weight_kg',
+    '311': 'length_m',
+    '312': 'width_m',
+    '313': 'height_m',
+    '314': 'area_m2',
+    '315': 'net_volume_l',
+    '316': 'net_volume_m3',
+    '320': 'net_weight_lb',
+    '330': 'gross_weight_kg',
+    '331': 'logistic_length_m',
+    '335': 'logistic_volume_l',
+    '390': 'amount',
+    '392': 'price',
+}
+for _prefix, _name in _DECIMAL_AIS.items():
+    _length, _fixed = (15, False) if _prefix.startswith('39') else (6, True)
+    for _decimals in range(10):
+        _AI_DEFINITIONS[f'{_prefix}{_decimals}'] = (_name, _length, _fixed, 'decimal')
+
+_HRI_PATTERN = re.compile(r'\((\d{2,4})\)([^(]*)')
+
+
+def gtin_check_digit(digits: str) -> int:
+    """Prüfziffer (Modulo 10, Gewichte 3/1 von rechts) für die Ziffern ohne Prüfziffer"""
+    total = 0
+    weight = 3
+    for char in reversed(digits):
+        total += (ord(char) - 48) * weight
+        weight = 4 - weight
+    return (10 - total % 10) % 10
+
+
+def validate_gtin(code: str) -> bool:
+    """Prüft EAN-8, UPC-A (12), EAN-13 und GTIN-14 inklusive Prüfziffer"""
+    if len(code) not in (8, 12, 13, 14) or not code.isdigit():
+        return False
+    return gtin_check_digit(code[:-1]) == ord(code[-1]) - 48
+
+
+def _parse_date(value: str) -> Optional[str]:
+    """JJMMTT -> ISO-Datum (TT = 00 bedeutet Monatsende)"""
+    if len(value) != 6 or not value.isdigit():
+        return None
+    year, month, day = int(value[:2]), int(value[2:4]), int(value[4:])
+    # Jahrhundert nach GS1-Regel (Fenster von -49 bis +50 Jahren)
+    current = date.today().year
+    century = current // 100 * 100
+    difference = year - current % 100
+    if difference >= 51:
+        century -= 100
+    elif difference <= -50:
+        century += 100
+    year += century
+    if not 1 <= month <= 12:
+        return None
+    if day == 0:
+        next_month = date(year + month // 12, month % 12 + 1, 1)
+        return date.fromordinal(next_month.toordinal() - 1).isoformat()
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _convert(ai: str, value: str, value_type: str):
+    if value_type == 'date':
+        return _parse_date(value)
+    if value_type == 'decimal':
+        if not value.isdigit():
+            return None
+        decimals = int(ai[-1])
+        return int(value) / (10 ** decimals) if decimals else int(value)
+    return value
+
+
+def parse_element_string(data: str) -> Tuple[Dict[str, str], list]:
+    """Zerlegt einen GS1-Elementstring (FNC1 als GS) in {AI: Wert}"""
+    ais = {}
+    errors = []
+    position = 0
+    length = len(data)
+    while position < length:
+        if data[position] == GS:
+            position += 1
+            continue
+        ai_length = _AI_LENGTH.get(data[position:position + 2])
+        ai = data[position:position + ai_length] if ai_length else None
+        definition = _AI_DEFINITIONS.get(ai) if ai else None
+        if definition is None:
+            errors.append(f'Unbekannter Application Identifier an Position {position}')
+            break
+        _, max_length, fixed, _ = definition
+        start = position + len(ai)
+        if fixed:
+            end = start + max_length
+            if end > length:
+                errors.append(f'AI ({ai}) zu kurz')
+                end = length
+        else:
+            separator = data.find(GS, start)
+            end = length if separator < 0 else separator
+            if end - start > max_length:
+                errors.append(f'AI ({ai}) länger als {max_length} Zeichen')
+        ais[ai] = data[start:end]
+        position = end
+    return ais, errors
+
+
+def _parse_hri(data: str) -> Tuple[Dict[str, str], list]:
+    """Zerlegt die Klarschrift-Form '(01)...(10)...'"""
+    ais = {}
+    errors = []
+    for ai, value in _HRI_PATTERN.findall(data):
+        if ai not in _AI_DEFINITIONS:
+            errors.append(f'Unbekannter Application Identifier ({ai})')
+        ais[ai] = value.strip()
+    return ais, errors
+
+
+def parse(code: str) -> Dict:
+    """
+    Analysiert einen gescannten Code.
+
+    Gibt symbology, valid, gtin (14-stellig, falls vorhanden), fields
+    (benannte und umgewandelte Werte), ais (Rohwerte) und errors zurück.
+    """
+    raw = code
+    symbology = None
+    prefix = code[:3]
+    if prefix in SYMBOLOGY_IDS:
+        symbology = SYMBOLOGY_IDS[prefix]
+        code = code[3:]
+
+    result = {'raw': raw, 'symbology': symbology or 'unknown', 'valid': False,
+              'gtin': None, 'fields': {}, 'ais': {}, 'errors': []}
+
+    # EAN-13/UPC-A mit Zusatzcode: nur den Hauptcode prüfen (13 bzw. 12 Ziffern)
+    if symbology == 'ean13-addon':
+        body_lengths = [len(code) - addon for addon in ADDON_LENGTHS if len(code) - addon in (12, 13)]
+        if not code.isdigit() or not body_lengths:
+            result['symbology'] = 'ean13'
+            result['errors'].append('EAN mit Zusatzcode hat eine ungültige Länge')
+            return result
+        body, addon = code[:body_lengths[0]], code[body_lengths[0]:]
+        result['symbology'] = 'ean13' if len(body) == 13 else 'upc-a'
+        result['valid'] = validate_gtin(body)
+        if result['valid']:
+            result['gtin'] = body.zfill(14)
+            result['fields'] = {'gtin': result['gtin'], 'addon': addon}
+        else:
+            result['errors'].append('Ungültige Prüfziffer')
+        return result
+
+    # Reine EAN/UPC/GTIN-Codes
+    if code.isdigit() and len(code) in (8, 12, 13, 14) and symbology in (None, 'ean13', 'ean8'):
+        result['symbology'] = symbology or {8: 'ean8', 12: 'upc-a', 13: 'ean13', 14: 'gtin-14'}[len(code)]
+        result['valid'] = validate_gtin(code)
+        if result['valid']:
+            result['gtin'] = code.zfill(14)
+            result['fields'] = {'gtin': result['gtin']}
+        else:
+            result['errors'].append('Ungültige Prüfziffer')
+        return result
+
+    if code.startswith('('):
+        ais, errors = _parse_hri(code)
+        symbology = symbology or 'gs1'
+    elif (symbology in GS1_SYMBOLOGIES or GS in code or
+          # Scanner ohne Symbologie-Kennung: Elementstring beginnt mit SSCC/GTIN
+          (len(code) > 14 and code[:2] in ('00', '01', '02'))):
+        ais, errors = parse_element_string(code.lstrip(GS))
+        symbology = symbology or 'gs1'
+    else:
+        if symbology in ('ean13', 'ean8'):
+            result['errors'].append('EAN hat eine ungültige Länge')
+        return result
+
+    fields = {}
+    for ai, value in ais.items():
+        definition = _AI_DEFINITIONS.get(ai)
+        if definition is None:
+            continue
+        name, _, _, value_type = definition
+        converted = _convert(ai, value, value_type)
+        if converted is None:
+            errors.append(f'Ungültiger Wert für AI ({ai})')
+            continue
+        fields[name] = converted
+
+    gtin = ais.get('01') or ais.get('02')
+    if gtin and not validate_gtin(gtin):
+        errors.append('Ungültige GTIN-Prüfziffer')
+        gtin = None
+    if 'sscc' in fields and not (len(fields['sscc']) == 18 and fields['sscc'].isdigit() and
+                                 gtin_check_digit(fields['sscc'][:-1]) == int(fields['sscc'][-1])):
+        errors.append('Ungültige SSCC-Prüfziffer')
+
+    result.update({
+        'symbology': symbology,
+        'valid': bool(ais) and not errors,
+        'gtin': gtin,
+        'fields': fields,
+        'ais': ais,
+        'errors': errors
+    })
+    return result
+
+
+def scan_stage(scan: Dict) -> Dict:
+    """Stufe der Scan-Pipeline: strukturierte GS1-Daten und normalisierte GTIN"""
+    code = scan['code']
+    # AIM-Kennung aus dem HID-POS-Report (z.B. ]d2 für GS1 DataMatrix)
+    if scan.get('symbology_id') in SYMBOLOGY_IDS and not code.startswith(']'):
+        code = scan['symbology_id'] + code
+    parsed = parse(code)
+    scan['gs1'] = parsed
+    if parsed['gtin']:
+        scan['gtin'] = parsed['gtin']
+    return scan
@@ -0,0 +1,81 @@
+"""
+DeviceBox gunicorn-Konfiguration (Produktionsbetrieb)
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Der Master startet vor den Workern den Geräte-Prozess (device_owner.py) und
+startet ihn neu, falls er beendet wird. Die HTTP-Worker sind zustandslos und
+sprechen die Geräte ausschließlich über dessen lokalen Socket an; so hat
+jedes Gerät genau einen Besitzer, während Anfragen auf alle Kerne verteilt werden.
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+import multiprocessing
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count()))
+# Threads pro Worker (Live-Streams belegen je einen Thread)
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 16))
+timeout = 60
+graceful_timeout = 15
+accesslog = None
+errorlog = '-'
+
+# Worker verwenden den RPC-Stellvertreter statt eigener Geräte
+raw_env = ['DEVICEBOX_ROLE=worker']
+
+OWNER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'device_owner.py')
+OWNER_SOCKET = os.getenv('DEVICE_OWNER_SOCKET', '/run/devicebox/owner.sock')
+
+_owner = None
+_stopping = threading.Event()
+
+
+def _start_owner(server):
+    global _owner
+    env = dict(os.environ)
+    env.pop('DEVICEBOX_ROLE', None)
+    _owner = subprocess.Popen([sys.executable, OWNER_SCRIPT], env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline and _owner.poll() is None:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(OWNER_SOCKET)
+            server.log.info("Geräte-Prozess %s bereit", _owner.pid)
+            return
+        except OSError:
+            time.sleep(0.2)
+        finally:
+            probe.close()
+    server.log.warning("Geräte-Prozess antwortet nicht auf %s", OWNER_SOCKET)
+
+
+def _watch_owner(server):
+    while not _stopping.is_set():
+        code = _owner.wait()
+        if _stopping.is_set():
+            return
+        server.log.error("Geräte-Prozess beendet (Code %s), Neustart", code)
+        time.sleep(2)
+        _start_owner(server)
+
+
+def on_starting(server):
+    _start_owner(server)
+    threading.Thread(target=_watch_owner, args=(server,), name='owner-watch', daemon=True).start()
+
+
+def on_exit(server):
+    _stopping.set()
+    if _owner is not None and _owner.poll() is None:
+        _owner.terminate()
+        try:
+            _owner.wait(10)
+        except subprocess.TimeoutExpired:
+            _owner.kill()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+DeviceBox HID POS
+Liest Barcode-Scanner im USB HID POS Modus (Usage Page 0x8C) direkt über
+hidraw: ein Barcode kommt vollständig in einem Report, ohne Tastatur-Layout.
+
+Aufzeichnen und Abspielen von Reports (z.B. für Tests):
+    python3 hidpos_reader.py --record /dev/hidraw0 scans.bin
+    python3 hidpos_reader.py scans.bin
+"""
+
+import os
+import sys
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# HID Usage Page "Bar Code Scanner" (HID POS Usage Tables)
+USAGE_PAGE_BARCODE_SCANNER = 0x8C
+
+
+class HidPosLayout:
+    """
+    Aufbau eines HID POS Eingabe-Reports.
+
+    Standard (Honeywell, Datalogic, Zebra im HID-POS-Modus): 64 Bytes mit
+    Report-ID, Datenlänge, drei Bytes AIM-Kennung, 56 Bytes Daten und einem
+    Flag "weitere Daten folgen" im letzten Byte.
+    """
+
+    __slots__ = ('report_id', 'report_size', 'length_offset', 'aim_offset',
+                 'data_offset', 'data_size', 'continue_offset', 'continue_mask')
+
+    def __init__(self, report_id: Optional[int] = 0x02, report_size: int = 64,
+                 length_offset: int = 1, aim_offset: Optional[int] = 2, data_offset: int = 5,
+                 data_size: int = 56, continue_offset: Optional[int] = 63, continue_mask: int = 0x01):
+        self.report_id = report_id
+        self.report_size = report_size
+        self.length_offset = length_offset
+        self.aim_offset = aim_offset
+        self.data_offset = data_offset
+        self.data_size = data_size
+        self.continue_offset = continue_offset
+        self.continue_mask = continue_mask
+
+
+DEFAULT_LAYOUT = HidPosLayout()
+
+
+class HidPosDecoder:
+    """Setzt Barcodes aus HID POS Reports zusammen (auch über mehrere Reports)"""
+
+    __slots__ = ('layout', 'encoding', '_chunks', '_symbology')
+
+    def __init__(self, layout: HidPosLayout = DEFAULT_LAYOUT, encoding: str = 'latin-1'):
+        self.layout = layout
+        self.encoding = encoding
+        self._chunks = []
+        self._symbology = None
+
+    def reset(self):
+        self._chunks = []
+        self._symbology = None
+
+    def feed(self, report: bytes) -> Optional[Tuple[str, Optional[str]]]:
+        """Verarbeitet einen Report, gibt (Barcode, AIM-Kennung) zurück, sobald er vollständig ist"""
+        layout = self.layout
+        if layout.report_id is not None and (not report or report[0] != layout.report_id):
+            return None
+        if len(report) <= layout.length_offset:
+            return None
+
+        length = min(report[layout.length_offset], layout.data_size)
+        start = layout.data_offset
+        self._chunks.append(report[start:start + length])
+        if self._symbology is None and layout.aim_offset is not None:
+            aim = report[layout.aim_offset:layout.aim_offset + 3]
+            if aim[:1] == b']':
+                self._symbology = aim.decode('ascii', errors='replace')
+
+        if (layout.continue_offset is not None and len(report) > layout.continue_offset and
+                report[layout.continue_offset] & layout.continue_mask):
+            return None
+
+        barcode = b''.join(self._chunks).rstrip(b'\r\n\x00').decode(self.encoding, errors='replace')
+        symbology = self._symbology
+        self.reset()
+        if not barcode:
+            return None
+        return barcode, symbology
+
+
+def iter_report_file(path: str, report_size: int = 64) -> Iterator[bytes]:
+    """Liest aufgezeichnete Reports (Binärdatei mit Reports fester Größe)"""
+    with open(path, 'rb') as f:
+        while True:
+            report = f.read(report_size)
+            if not report:
+                return
+            yield report
+
+
+def decode_report_file(path: str, layout: HidPosLayout = DEFAULT_LAYOUT) -> List[Tuple[str, Optional[str]]]:
+    """Dekodiert alle Barcodes einer Aufzeichnung"""
+    decoder = HidPosDecoder(layout)
+    results = []
+    for report in iter_report_file(path, layout.report_size):
+        result = decoder.feed(report)
+        if result:
+            results.append(result)
+    return results
+
+
+def _read_sysfs(path: str) -> str:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def has_barcode_usage_page(descriptor: bytes) -> bool:
+    """Prüft einen HID Report-Deskriptor auf die Usage Page 0x8C (Bar Code Scanner)"""
+    position = 0
+    length = len(descriptor)
+    while position < length:
+        prefix = descriptor[position]
+        if prefix == 0xFE:
+            # Long Item
+            if position + 1 >= length:
+                break
+            position += 3 + descriptor[position + 1]
+            continue
+        size = (0, 1, 2, 4)[prefix & 0x03]
+        value = int.from_bytes(descriptor[position + 1:position + 1 + size], 'little')
+        # Global Item "Usage Page" (Tag 0, Typ 1)
+        if prefix & 0xFC == 0x04 and value == USAGE_PAGE_BARCODE_SCANNER:
+            return True
+        position += 1 + size
+    return False
+
+
+class HidrawNode:
+    """Metadaten eines hidraw-Knotens aus sysfs"""
+
+    __slots__ = ('path', 'name', 'phys', 'vendor_product', 'hid_pos')
+
+    def __init__(self, path: str, name: str, phys: str, vendor_product: str, hid_pos: bool):
+        self.path = path
+        self.name = name
+        self.phys = phys
+        self.vendor_product = vendor_product
+        self.hid_pos = hid_pos
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class HidrawIndex:
+    """
+    Zuordnung der hidraw-Knoten zu VID:PID, Anschluss und HID-POS-Fähigkeit
+    über sysfs (zwischengespeichert, neu gelesen bei Hotplug)
+    """
+
+    def __init__(self, sysfs_root: str = '/sys/class/hidraw', dev_root: str = '/dev'):
+        self.sysfs_root = sysfs_root
+        self.dev_root = dev_root
+        self._lock = threading.Lock()
+        self._generation = None
+        self._nodes = []
+
+    def invalidate(self):
+        with self._lock:
+            self._generation = None
+
+    def nodes(self) -> List[HidrawNode]:
+        try:
+            generation = tuple(sorted(os.listdir(self.sysfs_root)))
+        except OSError:
+            generation = ()
+        with self._lock:
+            if generation != self._generation:
+                self._nodes = [self._read_node(name) for name in generation]
+                self._generation = generation
+            return list(self._nodes)
+
+    def _read_node(self, name: str) -> HidrawNode:
+        device = os.path.join(self.sysfs_root, name, 'device')
+        uevent = dict(line.split('=', 1) for line in _read_sysfs(os.path.join(device, 'uevent')).splitlines()
+                      if '=' in line)
+        # HID_ID=0003:000005F9:00002214 (Bus:Vendor:Product)
+        parts = uevent.get('HID_ID', '').split(':')
+        vendor_product = f"{parts[1][-4:]}:{parts[2][-4:]}".lower() if len(parts) == 3 else ''
+        try:
+            with open(os.path.join(device, 'report_descriptor'), 'rb') as f:
+                hid_pos = has_barcode_usage_page(f.read())
+        except OSError:
+            hid_pos = False
+        return HidrawNode(
+            path=os.path.join(self.dev_root, name),
+            name=uevent.get('HID_NAME', ''),
+            phys=uevent.get('HID_PHYS', ''),
+            vendor_product=vendor_product,
+            hid_pos=hid_pos
+        )
+
+    def find(self, match, exclude=()) -> Optional[HidrawNode]:
+        """Erster passender HID-POS-Knoten, der nicht in exclude (Pfade) liegt"""
+        for node in self.nodes():
+            if node.hid_pos and node.path not in exclude and match(node):
+                return node
+        return None
+
+
+def open_hidraw(path: str) -> int:
+    """Öffnet einen hidraw-Knoten nicht-blockierend zum Lesen"""
+    return os.open(path, os.O_RDONLY | os.O_NONBLOCK | os.O_CLOEXEC)
+
+
+def record(path: str, output: str, report_size: int = 64):
+    """Zeichnet Reports eines hidraw-Knotens bis Strg+C in eine Datei auf"""
+    fd = os.open(path, os.O_RDONLY)
+    count = 0
+    try:
+        with open(output, 'wb') as f:
+            while True:
+                report = os.read(fd, report_size)
+                f.write(report.ljust(report_size, b'\x00'))
+                f.flush()
+                count += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.close(fd)
+    print(f"{count} Reports aufgezeichnet")
+
+
+# Globale Instanz
+hidraw_index = HidrawIndex()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--record':
+        record(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) == 2:
+        for barcode, symbology in decode_report_file(sys.argv[1]):
+            print(f"{symbology or '---'} {barcode}")
+    else:
+        print(__doc__)
+        sys.exit(1)
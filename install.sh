@@ -276,6 +276,10 @@ download_app() {
 sudo chmod +x "$INSTALL_DIR/app.py"
 sudo chmod +x "$INSTALL_DIR/update_system.py"
 sudo chmod +x "$INSTALL_DIR/device_manager.py"
+sudo chmod +x "$INSTALL_DIR/devicebox_cli.py"
+    
+    # Kommandozeilen-Werkzeug
+    sudo ln -sf "$INSTALL_DIR/devicebox_cli.py" /usr/local/bin/devicebox
     
     # Aufräumen
     cd /
@@ -363,7 +367,9 @@ Environment=DATA_DIR=$INSTALL_DIR/data
 Environment=PORT=$PORT
 Environment=HOST=$HOST
 Environment=DEBUG=False
-ExecStart=$INSTALL_DIR/venv/bin/python $INSTALL_DIR/app.py
+# Produktionsbetrieb: gunicorn-Worker plus ein Geräte-Prozess (siehe gunicorn.conf.py)
+RuntimeDirectory=devicebox
+ExecStart=$INSTALL_DIR/venv/bin/gunicorn -c $INSTALL_DIR/gunicorn.conf.py --chdir $INSTALL_DIR app:app
 Restart=always
 RestartSec=10
 StandardOutput=journal
@@ -538,6 +544,8 @@ main() {
         log "  sudo systemctl restart devicebox    # Service neu starten"
         log "  sudo journalctl -u devicebox -f     # Logs anzeigen"
         log ""
+        log "  devicebox status                    # Status des Dienstes"
+        log ""
         log "Update-Befehle:"
         log "  python3 $INSTALL_DIR/update_system.py check # Update-Check"
         log "  python3 $INSTALL_DIR/update_system.py update # Update durchführen"
@@ -565,6 +573,8 @@ main() {
         log "  sudo systemctl restart devicebox    # Service neu starten"
         log "  sudo journalctl -u devicebox -f     # Logs anzeigen"
         log ""
+        log "  devicebox status                    # Status des Dienstes"
+        log ""
         log "Update-Befehle:"
         log "  python3 $INSTALL_DIR/update_system.py check # Update-Check"
         log "  python3 $INSTALL_DIR/update_system.py update # Update durchführen"
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Inventur
+Zählsitzungen für Barcode-Scanner: Scans werden im Speicher zu Mengen je
+(Code, Lagerort) zusammengefasst und gesammelt in SQLite geschrieben
+(alle N Scans oder alle T Sekunden), unabhängig von der Scanrate.
+"""
+
+import io
+import os
+import csv
+import uuid
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    scanner_id TEXT,
+    name TEXT,
+    location TEXT,
+    location_prefix TEXT,
+    started_at TEXT,
+    closed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS counts (
+    session_id TEXT NOT NULL,
+    code TEXT NOT NULL,
+    location TEXT NOT NULL,
+    qty INTEGER NOT NULL,
+    name TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (session_id, code, location)
+) WITHOUT ROWID;
+"""
+
+# Anzahl der Scans, die pro Sitzung rückgängig gemacht werden können
+UNDO_DEPTH = 1000
+
+
+class InventorySession:
+    """Zählstand einer Inventursitzung im Speicher"""
+
+    def __init__(self, session_id: str, scanner_id: Optional[str], name: str = '',
+                 location: str = '', location_prefix: str = '', started_at: Optional[str] = None):
+        self.session_id = session_id
+        self.scanner_id = scanner_id
+        self.name = name
+        self.location = location
+        self.location_prefix = location_prefix
+        self.started_at = started_at or datetime.now().isoformat()
+        # (Code, Lagerort) -> Menge
+        self.counts = {}
+        # Code -> Artikelbezeichnung
+        self.names = {}
+        # Noch nicht geschriebene Änderungen: (Code, Lagerort) -> Delta
+        self.pending = {}
+        self.history = deque(maxlen=UNDO_DEPTH)
+        self.scan_count = 0
+
+    def _apply(self, key: Tuple[str, str], delta: int) -> int:
+        qty = self.counts.get(key, 0) + delta
+        if qty > 0:
+            self.counts[key] = qty
+        else:
+            self.counts.pop(key, None)
+        self.pending[key] = self.pending.get(key, 0) + delta
+        return max(qty, 0)
+
+    def record(self, code: str, name: Optional[str] = None) -> Dict:
+        """Zählt einen Scan am aktuellen Lagerort"""
+        key = (code, self.location)
+        qty = self._apply(key, 1)
+        if name:
+            self.names[code] = name
+        self.history.append(key)
+        self.scan_count += 1
+        return {'session_id': self.session_id, 'code': code, 'location': self.location, 'qty': qty}
+
+    def undo(self) -> Optional[Dict]:
+        """Nimmt den letzten Scan zurück"""
+        if not self.history:
+            return None
+        code, location = key = self.history.pop()
+        qty = self._apply(key, -1)
+        self.scan_count = max(0, self.scan_count - 1)
+        return {'session_id': self.session_id, 'code': code, 'location': location, 'qty': qty}
+
+    def take_pending(self) -> Dict[Tuple[str, str], int]:
+        """Übernimmt die ungeschriebenen Änderungen für einen Flush"""
+        pending = {key: delta for key, delta in self.pending.items() if delta}
+        self.pending = {}
+        return pending
+
+    def to_dict(self) -> Dict:
+        return {
+            'session_id': self.session_id,
+            'scanner_id': self.scanner_id,
+            'name': self.name,
+            'location': self.location,
+            'location_prefix': self.location_prefix,
+            'started_at': self.started_at,
+            'scan_count': self.scan_count,
+            'items': len(self.counts),
+            'total_qty': sum(self.counts.values()),
+            'pending': len(self.pending),
+            'can_undo': bool(self.history)
+        }
+
+
+class InventoryManager:
+    """
+    Verwaltet die Inventursitzungen und schreibt Zählstände gesammelt.
+
+    Ein einzelner Flush-Thread schreibt spätestens alle flush_seconds Sekunden
+    oder sobald flush_scans Scans seit dem letzten Schreiben anliegen.
+    """
+
+    def __init__(self, db_file: str = "/opt/devicebox/data/inventory.sqlite",
+                 flush_scans: int = 50, flush_seconds: float = 5.0):
+        self.db_file = db_file
+        self.flush_scans = max(1, flush_scans)
+        self.flush_seconds = flush_seconds
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._unflushed_scans = 0
+        self._thread = None
+        self.flushes = 0
+        self.load()
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        connection = sqlite3.connect(self.db_file)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(SCHEMA)
+        return connection
+
+    def load(self):
+        """Lädt offene Sitzungen samt Zählständen (z.B. nach einem Neustart)"""
+        if not os.path.exists(self.db_file):
+            return
+        try:
+            connection = self._connect()
+            try:
+                rows = connection.execute(
+                    'SELECT id, scanner_id, name, location, location_prefix, started_at '
+                    'FROM sessions WHERE closed_at IS NULL').fetchall()
+                for session_id, scanner_id, name, location, prefix, started_at in rows:
+                    session = InventorySession(session_id, scanner_id, name or '', location or '',
+                                               prefix or '', started_at)
+                    for code, loc, qty, item_name in connection.execute(
+                            'SELECT code, location, qty, name FROM counts WHERE session_id = ?',
+                            (session_id,)):
+                        if qty > 0:
+                            session.counts[(code, loc)] = qty
+                        if item_name:
+                            session.names[code] = item_name
+                    session.scan_count = sum(session.counts.values())
+                    self.sessions[session_id] = session
+            finally:
+                connection.close()
+        except Exception as e:
+            print(f"Fehler beim Laden der Inventursitzungen: {e}")
+        if self.sessions:
+            self._start_flusher()
+
+    def _start_flusher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._flush_loop, name='inventory-flush', daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                self._wakeup.wait_for(lambda: self._unflushed_scans >= self.flush_scans,
+                                      self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Fehler beim Schreiben der Inventur: {e}")
+
+    @staticmethod
+    def _write_counts(connection: sqlite3.Connection,
+                      batches: List[Tuple[str, Dict[Tuple[str, str], int], Dict[str, str]]]):
+        """Addiert ausstehende Zählstände (ohne eigene Transaktion)"""
+        now = datetime.now().isoformat()
+        rows = [(session_id, code, location, delta, names.get(code), now)
+                for session_id, pending, names in batches
+                for (code, location), delta in pending.items()]
+        if not rows:
+            return
+        connection.executemany(
+            'INSERT INTO counts (session_id, code, location, qty, name, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (session_id, code, location) DO UPDATE SET '
+            'qty = qty + excluded.qty, '
+            'name = COALESCE(excluded.name, name), '
+            'updated_at = excluded.updated_at', rows)
+        connection.execute('DELETE FROM counts WHERE qty <= 0')
+
+    def flush(self):
+        """Schreibt alle ausstehenden Zählstände in einer Transaktion"""
+        with self._flush_lock:
+            with self._lock:
+                batches = [(session.session_id, session.take_pending(), dict(session.names))
+                           for session in self.sessions.values() if session.pending]
+                locations = [(session.location, session.session_id) for session in self.sessions.values()]
+                self._unflushed_scans = 0
+            if not batches:
+                return
+
+            connection = self._connect()
+            try:
+                with connection:
+                    self._write_counts(connection, batches)
+                    connection.executemany('UPDATE sessions SET location = ? WHERE id = ?', locations)
+            except Exception:
+                # Änderungen für den nächsten Versuch zurücklegen
+                with self._lock:
+                    for session_id, pending, _ in batches:
+                        session = self.sessions.get(session_id)
+                        if session is None:
+                            continue
+                        for key, delta in pending.items():
+                            session.pending[key] = session.pending.get(key, 0) + delta
+                raise
+            finally:
+                connection.close()
+            self.flushes += 1
+
+    def start_session(self, scanner_id: Optional[str], name: str = '', location: str = '',
+                      location_prefix: str = '') -> Dict:
+        """Startet eine Inventursitzung für einen Scanner (None = alle Scanner)"""
+        with self._lock:
+            for session in self.sessions.values():
+                if session.scanner_id == scanner_id:
+                    raise ValueError('Für diesen Scanner läuft bereits eine Inventur')
+            session = InventorySession(uuid.uuid4().hex[:12], scanner_id, name, location, location_prefix)
+
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    'INSERT INTO sessions (id, scanner_id, name, location, location_prefix, started_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (session.session_id, scanner_id, name, location, location_prefix, session.started_at))
+        finally:
+            connection.close()
+
+        with self._lock:
+            self.sessions[session.session_id] = session
+        self._start_flusher()
+        return session.to_dict()
+
+    def close_session(self, session_id: str) -> Optional[Dict]:
+        """Beendet eine Sitzung und schreibt den letzten Stand"""
+        with self._flush_lock:
+            # Erst austragen, dann schreiben: spätere Scans landen nicht mehr in der Sitzung
+            with self._lock:
+                session = self.sessions.pop(session_id, None)
+                if session is None:
+                    return None
+                pending = session.take_pending()
+            connection = self._connect()
+            try:
+                with connection:
+                    self._write_counts(connection, [(session_id, pending, dict(session.names))])
+                    connection.execute('UPDATE sessions SET location = ?, closed_at = ? WHERE id = ?',
+                                       (session.location, datetime.now().isoformat(), session_id))
+            except Exception:
+                # Sitzung bleibt offen, die Zählstände gehen nicht verloren
+                with self._lock:
+                    for key, delta in pending.items():
+                        session.pending[key] = session.pending.get(key, 0) + delta
+                    self.sessions[session_id] = session
+                raise
+            finally:
+                connection.close()
+        return session.to_dict()
+
+    def _session_for(self, scanner_id: Optional[str]) -> Optional[InventorySession]:
+        fallback = None
+        for session in self.sessions.values():
+            if session.scanner_id == scanner_id:
+                return session
+            if session.scanner_id is None:
+                fallback = session
+        return fallback
+
+    def scan_stage(self, scan: Dict) -> Dict:
+        """Stufe der Scan-Pipeline: zählt Scans in die laufende Sitzung des Scanners"""
+        if not self.sessions:
+            return scan
+        with self._lock:
+            session = self._session_for(scan.get('scanner_id'))
+            if session is None:
+                return scan
+            code = scan['code']
+            if session.location_prefix and code.startswith(session.location_prefix):
+                session.location = code[len(session.location_prefix):]
+                scan['inventory'] = {'session_id': session.session_id, 'location': session.location}
+                return scan
+            if scan.get('gtin') and scan.get('gs1', {}).get('ais'):
+                # GS1-Codes (Charge, Seriennummer) werden je GTIN gezählt
+                code = scan['gtin']
+            product = scan.get('product') or {}
+            scan['inventory'] = session.record(code, product.get('name') or product.get('Name'))
+            self._unflushed_scans += 1
+            if self._unflushed_scans >= self.flush_scans:
+                self._wakeup.notify()
+        return scan
+
+    def undo(self, session_id: str) -> Optional[Dict]:
+        """Nimmt den letzten Scan einer Sitzung zurück"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            return session.undo()
+
+    def set_location(self, session_id: str, location: str) -> bool:
+        """Setzt den Lagerort für die folgenden Scans"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return False
+            session.location = location
+            return True
+
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            session = self.sessions.get(session_id)
+            return session.to_dict() if session else None
+
+    def get_sessions(self) -> List[Dict]:
+        with self._lock:
+            return [session.to_dict() for session in self.sessions.values()]
+
+    def get_counts(self, session_id: str) -> Optional[List[Dict]]:
+        """Zählstände einer Sitzung (aus der Datenbank, nach einem Flush; None = unbekannt)"""
+        self.flush()
+        connection = self._connect()
+        try:
+            if connection.execute('SELECT 1 FROM sessions WHERE id = ?', (session_id,)).fetchone() is None:
+                return None
+            rows = connection.execute(
+                'SELECT code, location, qty, name FROM counts WHERE session_id = ? '
+                'ORDER BY location, code', (session_id,)).fetchall()
+        finally:
+            connection.close()
+        return [{'code': code, 'location': location, 'qty': qty, 'name': name or ''}
+                for code, location, qty, name in rows]
+
+    def export_csv(self, session_id: str) -> Optional[str]:
+        """Exportiert die Zählstände einer Sitzung als CSV (Semikolon-getrennt)"""
+        counts = self.get_counts(session_id)
+        if counts is None:
+            return None
+        output = io.StringIO()
+        writer = csv.writer(output, delimiter=';')
+        writer.writerow(['code', 'location', 'qty', 'name'])
+        for row in counts:
+            writer.writerow([row['code'], row['location'], row['qty'], row['name']])
+        return output.getvalue()
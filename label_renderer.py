@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Label-Renderer
+Erzeugt Etiketten-Bilder und Brother QL Befehlsströme.
+Alle Funktionen sind zustandslos und laufen im Render-Pool.
+"""
+
+from typing import List
+
+import raster_engine
+from raster_engine import NUMPY_AVAILABLE
+
+LABEL_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+def render_text_label_image(content: str, width: int = 696, height: int = 271):
+    """Setzt den Text zeilenweise auf ein weißes Etiketten-Bild"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    img = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(img)
+
+    # Verwende Standard-Schriftart
+    try:
+        font = ImageFont.truetype(LABEL_FONT, 24)
+    except Exception:
+        font = ImageFont.load_default()
+
+    # Teile den Text in Zeilen auf
+    y_offset = 20
+    for line in content.split('\n'):
+        if line.strip():
+            draw.text((20, y_offset), line.strip(), fill='black', font=font)
+            y_offset += 30
+
+    return img
+
+
+def build_ql_instructions(rows: List[bytes], model: str = 'QL-700',
+                          label_width_mm: int = 62, cut: bool = True,
+                          compress: bool = False) -> bytes:
+    """Erzeugt den Brother QL Befehlsstrom für fertige Rasterzeilen (Endlos-Etikett)"""
+    from brother_ql.raster import BrotherQLRaster
+    from brother_ql.exceptions import BrotherQLUnsupportedCmd
+
+    qlr = BrotherQLRaster(model)
+    qlr.exception_on_warning = True
+
+    # Gleiche Befehlsfolge wie brother_ql.conversion.convert
+    try:
+        qlr.add_switch_mode()
+    except BrotherQLUnsupportedCmd:
+        pass
+    qlr.add_invalidate()
+    qlr.add_initialize()
+    try:
+        qlr.add_switch_mode()
+    except BrotherQLUnsupportedCmd:
+        pass
+    qlr.add_status_information()
+
+    qlr.mtype = 0x0A  # Endlos-Etikett
+    qlr.mwidth = label_width_mm
+    qlr.mlength = 0
+    qlr.pquality = 1
+    qlr.add_media_and_quality(len(rows))
+
+    try:
+        if cut:
+            qlr.add_autocut(True)
+            qlr.add_cut_every(1)
+    except BrotherQLUnsupportedCmd:
+        pass
+    try:
+        qlr.dpi_600 = False
+        qlr.cut_at_end = cut
+        qlr.two_color_printing = False
+        qlr.add_expanded_mode()
+    except BrotherQLUnsupportedCmd:
+        pass
+    qlr.add_margins(35)
+    try:
+        if compress:
+            qlr.add_compression(True)
+    except BrotherQLUnsupportedCmd:
+        compress = False
+
+    # Rasterzeilen direkt anhängen (bereits gepackt und gespiegelt)
+    qlr.data += raster_engine.ql_raster_commands(rows, compress=compress)
+    qlr.add_print()
+    return bytes(qlr.data)
+
+
+def render_ql_label(content: str, model: str = 'QL-700', label_width_mm: int = 62,
+                    threshold: float = 70.0, dither: str = 'none',
+                    compress: bool = False) -> bytes:
+    """Rendert ein Text-Etikett komplett bis zum sendefertigen QL-Befehlsstrom"""
+    img = render_text_label_image(content)
+
+    if NUMPY_AVAILABLE:
+        # Schnelle Rasterung mit NumPy
+        rows = raster_engine.ql_raster_rows(img, label_width_mm=label_width_mm,
+                                            threshold=threshold, dither=dither)
+        return build_ql_instructions(rows, model=model, label_width_mm=label_width_mm,
+                                     compress=compress)
+
+    from brother_ql.conversion import convert
+    from brother_ql.raster import BrotherQLRaster
+
+    qlr = BrotherQLRaster(model)
+    qlr.exception_on_warning = True
+    return bytes(convert(
+        qlr=qlr,
+        images=[img],
+        label=str(label_width_mm),
+        rotate='auto',
+        threshold=threshold,
+        dither=dither != 'none',
+        compress=compress,
+        red=False,
+        dpi_600=False,
+        hq=True,
+    ))
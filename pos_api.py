@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+DeviceBox POS-Schnittstelle
+Lokale API für Kassensoftware auf demselben Gerät über einen Unix-Socket,
+ohne HTTP-Overhead.
+
+Rahmen: 4 Byte Länge (Big Endian) und eine Nachricht als JSON oder msgpack.
+Das Format wird pro Rahmen am ersten Byte erkannt, die Antwort kommt im
+selben Format. Anfragen dürfen hintereinander gesendet werden, ohne auf die
+Antwort zu warten (Zuordnung über die ID):
+
+    -> {"id": 1, "method": "print", "params": {"device_id": "...", "content": "..."}}
+    <- {"id": 1, "result": {"success": true}}
+
+Abonnements (scan.subscribe, card.subscribe) liefern danach Ereignisse ohne ID:
+
+    <- {"event": "scan", "subscription": "s1", "data": {...}}
+"""
+
+import os
+import json
+import asyncio
+import functools
+import itertools
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+from device_rpc import RpcServer, RpcError, encode_frame, read_frame, error_payload
+from event_ring import EventRing
+from system_status import devicebox
+
+POS_API_SOCKET = os.getenv('POS_API_SOCKET', '/run/devicebox/pos.sock')
+POS_API_THREADS = int(os.getenv('POS_API_THREADS', 16))
+# Abonnenten, die nicht mehr lesen, werden ab dieser Puffergröße getrennt
+MAX_WRITE_BUFFER = 4 * 1024 * 1024
+
+
+def _json_dumps(message: Dict) -> bytes:
+    return json.dumps(message, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _codec(frame: bytes):
+    """(loads, dumps) passend zum ersten Byte des Rahmens"""
+    if frame[:1] == b'{':
+        return json.loads, _json_dumps
+    if not MSGPACK_AVAILABLE:
+        raise RpcError('msgpack ist nicht installiert, bitte JSON senden')
+    return functools.partial(msgpack.unpackb, raw=False), functools.partial(msgpack.packb, default=str)
+
+
+class Subscription:
+    """Leitet neue Einträge eines EventRings an eine Verbindung weiter"""
+
+    def __init__(self, connection: 'PosConnection', subscription_id: str, event: str,
+                 ring: EventRing, dumps: Callable, match: Optional[Callable[[Dict], bool]] = None,
+                 until: Optional[Callable[[Dict], bool]] = None, after: Optional[int] = None):
+        self.connection = connection
+        self.subscription_id = subscription_id
+        self.event = event
+        self.ring = ring
+        self.dumps = dumps
+        self.match = match
+        self.until = until
+        self.last_seq = ring.last_seq if after is None else after
+        self.active = True
+        ring.add_listener(self._on_entry)
+        # Mit after: gepufferte und neue Einträge bis release() zurückhalten (in Reihenfolge)
+        self._held = None if after is None else ring.since(after)
+
+    def _on_entry(self, entry: Dict):
+        # Wird im Thread des Erzeugers aufgerufen
+        self.connection.loop.call_soon_threadsafe(self.deliver, entry)
+
+    def deliver(self, entry: Dict):
+        if self._held is not None:
+            self._held.append(entry)
+            return
+        if not self.active or entry['seq'] <= self.last_seq:
+            return
+        self.last_seq = entry['seq']
+        if self.match is not None and not self.match(entry):
+            return
+        self.connection.send({'event': self.event, 'subscription': self.subscription_id, 'data': entry},
+                             self.dumps)
+        if self.until is not None and self.until(entry):
+            self.connection.unsubscribe(self.subscription_id)
+
+    def release(self):
+        """Liefert die zurückgehaltenen Einträge und schaltet auf direkte Zustellung um"""
+        held, self._held = self._held or [], None
+        for entry in held:
+            self.deliver(entry)
+
+    def close(self):
+        self.active = False
+        self.ring.remove_listener(self._on_entry)
+
+
+class PosConnection:
+    """Eine Verbindung der Kassensoftware mit ihren Abonnements"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.subscriptions = {}
+        self._ids = itertools.count(1)
+
+    def send(self, message: Dict, dumps: Callable):
+        if self.writer.is_closing():
+            return
+        self.writer.write(encode_frame(message, dumps))
+        if self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            print("POS-Verbindung getrennt: Client liest keine Ereignisse")
+            self.close()
+
+    def subscribe(self, event: str, ring: EventRing, dumps: Callable, **filters) -> Subscription:
+        subscription = Subscription(self, f's{next(self._ids)}', event, ring, dumps, **filters)
+        self.subscriptions[subscription.subscription_id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscription_id: str) -> bool:
+        subscription = self.subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return False
+        subscription.close()
+        return True
+
+    def close(self):
+        for subscription_id in list(self.subscriptions):
+            self.unsubscribe(subscription_id)
+        self.writer.close()
+
+
+class PosApiServer(RpcServer):
+    """
+    POS-Schnittstelle für den Prozess, dem die Geräte gehören.
+
+    Reine Speicherabfragen werden direkt in der Loop beantwortet, Druck- und
+    Terminal-Aufrufe im Thread-Pool.
+    """
+
+    def __init__(self, manager, path: str = POS_API_SOCKET, workers: int = POS_API_THREADS):
+        super().__init__(manager, path, workers=workers)
+        self.manager = manager
+        # Methode -> (Funktion, direkt in der Loop ausführen)
+        self.handlers = {
+            'ping': (self.ping, True),
+            'status': (self.status, False),
+            'devices': (self.devices, True),
+            'device.status': (self.device_status, False),
+            'print': (self.print, False),
+            'scans': (self.scans, True),
+            'scan.subscribe': (self.scan_subscribe, True),
+            'scan.unsubscribe': (self.unsubscribe, True),
+            'card.start': (self.card_start, False),
+            'card.get': (self.card_get, True),
+            'card.cancel': (self.card_cancel, False),
+            'card.subscribe': (self.card_subscribe, True),
+            'card.unsubscribe': (self.unsubscribe, True),
+            'jobs': (self.jobs, True),
+            'job.get': (self.job_get, True),
+            'update.check': (self.update_check, False),
+            'update.run': (self.update_run, False),
+        }
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        connection = PosConnection(writer)
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                asyncio.ensure_future(self._dispatch(frame, connection))
+        except (ConnectionError, RpcError) as e:
+            print(f"POS-Verbindung beendet: {e}")
+        finally:
+            connection.close()
+
+    async def _dispatch(self, frame: bytes, connection: PosConnection):
+        self.requests += 1
+        dumps = _json_dumps
+        response = {'id': None}
+        try:
+            loads, dumps = _codec(frame)
+            request = loads(frame)
+            response['id'] = request.get('id')
+            method = request.get('method')
+            if method not in self.handlers:
+                raise AttributeError(f'Unbekannte Methode: {method}')
+            func, inline = self.handlers[method]
+            params = request.get('params') or {}
+            args, kwargs = (params, {}) if isinstance(params, list) else ((), params)
+            if inline:
+                response['result'] = func(connection, dumps, *args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                response['result'] = await loop.run_in_executor(
+                    self._executor, functools.partial(func, connection, dumps, *args, **kwargs))
+        except Exception as e:
+            response.pop('result', None)
+            response['error'] = error_payload(e)
+        connection.send(response, dumps)
+
+    # --- Methoden (connection und dumps werden vom Server übergeben) ------
+
+    def ping(self, connection, dumps) -> str:
+        return 'pong'
+
+    def status(self, connection, dumps) -> Dict:
+        devices = self.manager.get_all_devices()
+        return {
+            'version': devicebox.version,
+            # CPU-Last seit der letzten Abfrage, ohne eine Sekunde zu messen
+            'system': devicebox.get_system_info(cpu_interval=None),
+            'devices': {
+                'total': len(devices),
+                'connected': sum(1 for device in devices.values() if device['status'] == 'connected')
+            },
+            'scanners': self.manager.get_all_scanner_status()
+        }
+
+    def devices(self, connection, dumps) -> Any:
+        return self.manager.get_all_devices()
+
+    def device_status(self, connection, dumps, device_id: str) -> Dict:
+        status = self.manager.get_device_status(device_id)
+        if not status:
+            raise ValueError('Gerät nicht gefunden')
+        return status
+
+    def print(self, connection, dumps, device_id: str, content: str) -> Dict:
+        return self.manager.print_content(device_id, content)
+
+    def scans(self, connection, dumps, after: int = 0, scanner: Optional[str] = None) -> Dict:
+        scans = self.manager.get_scans(after, scanner)
+        if scans is None:
+            raise ValueError('Scanner nicht gefunden')
+        return scans
+
+    def scan_subscribe(self, connection, dumps, scanner: Optional[str] = None,
+                       after: Optional[int] = None) -> Dict:
+        """Neue Scans als Ereignisse; mit after werden gepufferte Scans nachgeliefert"""
+        ring = self.manager.get_scan_ring(scanner)
+        if ring is None:
+            raise ValueError('Scanner nicht gefunden')
+        if after is None:
+            subscription = connection.subscribe('scan', ring, dumps)
+        else:
+            subscription = connection.subscribe('scan', ring, dumps, after=ring.cursor(int(after)))
+            # Nach der Antwort senden, damit der Client die Abo-ID schon kennt
+            connection.loop.call_soon(subscription.release)
+        return {'subscription': subscription.subscription_id, 'last_seq': ring.last_seq}
+
+    def unsubscribe(self, connection, dumps, subscription: str) -> bool:
+        return connection.unsubscribe(subscription)
+
+    def card_start(self, connection, dumps, device_id: str, amount: float,
+                   currency: Optional[str] = None) -> Dict:
+        return self.manager.start_card_transaction(device_id, amount, currency)
+
+    def card_get(self, connection, dumps, transaction_id: str) -> Dict:
+        transaction = self.manager.get_card_transaction(transaction_id)
+        if transaction is None:
+            raise ValueError('Transaktion nicht gefunden')
+        return transaction
+
+    def card_cancel(self, connection, dumps, transaction_id: str) -> bool:
+        return self.manager.cancel_card_transaction(transaction_id)
+
+    def card_subscribe(self, connection, dumps, transaction_id: str) -> Dict:
+        """Fortschritt einer Kartenzahlung als Ereignisse bis zum Abschluss"""
+        subscription = connection.subscribe(
+            'card', self.manager.card_engine.events, dumps,
+            match=lambda entry: entry['transaction_id'] == transaction_id,
+            until=lambda entry: entry['event'] == 'done')
+        # Zustand erst nach dem Abonnieren lesen, damit kein Ereignis verloren geht
+        transaction = self.manager.get_card_transaction(transaction_id)
+        if transaction is None or transaction['state'] == 'done':
+            connection.unsubscribe(subscription.subscription_id)
+            if transaction is None:
+                raise ValueError('Transaktion nicht gefunden')
+            return {'subscription': None, 'transaction': transaction}
+        return {'subscription': subscription.subscription_id, 'transaction': transaction}
+
+    def jobs(self, connection, dumps, device_id: Optional[str] = None) -> Any:
+        return self.manager.get_device_jobs(device_id)
+
+    def job_get(self, connection, dumps, job_id: str) -> Dict:
+        job = self.manager.get_device_job(job_id)
+        if job is None:
+            raise ValueError('Job nicht gefunden')
+        return job
+
+    def update_check(self, connection, dumps) -> Dict:
+        return devicebox.check_for_updates()
+
+    def update_run(self, connection, dumps) -> Dict:
+        return devicebox.perform_update()
+
+
+def start_pos_api(manager, path: str = POS_API_SOCKET) -> Optional[PosApiServer]:
+    """Startet die POS-Schnittstelle in der Device-Loop (leerer Pfad = abgeschaltet)"""
+    if not path:
+        return None
+    from device_loop import device_loop
+    server = PosApiServer(manager, path)
+    try:
+        device_loop.run(server.start(), timeout=10)
+    except OSError as e:
+        print(f"POS-Schnittstelle nicht verfügbar ({path}): {e}")
+        return None
+    print(f"POS-Schnittstelle bereit auf {path}")
+    return server
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Produktkatalog
+Lokaler Index der Artikel nach EAN/GTIN in SQLite mit LRU-Cache für
+häufig gescannte Artikel. Wird per Massenimport aus CSV oder NDJSON befüllt.
+"""
+
+import os
+import io
+import csv
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Spaltennamen, die als Barcode-Spalte erkannt werden
+CODE_COLUMNS = ('gtin', 'ean', 'barcode', 'code', 'upc')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    gtin TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def normalize_code(code: str) -> str:
+    """
+    Einheitlicher Schlüssel: numerische EAN-8/UPC-A/EAN-13/GTIN-14 werden
+    auf 14 Stellen aufgefüllt, damit z.B. UPC-A und EAN-13 übereinstimmen.
+    """
+    code = code.strip()
+    if code.isdigit() and len(code) in (8, 12, 13, 14):
+        return code.zfill(14)
+    return code
+
+
+def _find_code_column(fields: Iterable[str]) -> Optional[str]:
+    lowered = {field.lower().strip(): field for field in fields if field}
+    for name in CODE_COLUMNS:
+        if name in lowered:
+            return lowered[name]
+    return None
+
+
+def iter_csv_records(stream: io.TextIOBase) -> Iterator[Tuple[str, Dict]]:
+    """Liest (Code, Datensatz) aus CSV (Trennzeichen wird erkannt)"""
+    sample = stream.read(4096)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(stream, dialect=dialect)
+    code_column = _find_code_column(reader.fieldnames or [])
+    if code_column is None:
+        raise ValueError(f'Keine Barcode-Spalte gefunden (erwartet: {", ".join(CODE_COLUMNS)})')
+    for row in reader:
+        code = (row.get(code_column) or '').strip()
+        if code:
+            yield code, {key: value for key, value in row.items() if key}
+
+
+def iter_ndjson_records(stream: io.TextIOBase) -> Iterator[Tuple[str, Dict]]:
+    """Liest (Code, Datensatz) aus NDJSON (ein JSON-Objekt pro Zeile)"""
+    code_column = None
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f'Ungültiges JSON in Zeile {line_number}: {e}')
+        if code_column is None or code_column not in record:
+            code_column = _find_code_column(record.keys())
+            if code_column is None:
+                raise ValueError(f'Kein Barcode-Feld in Zeile {line_number}')
+        code = str(record.get(code_column) or '').strip()
+        if code:
+            yield code, record
+
+
+class ProductCatalog:
+    """
+    Thread-sicherer Artikelindex.
+
+    Lesezugriffe nutzen eine SQLite-Verbindung pro Thread; ein Import baut
+    eine neue Datenbankdatei auf und ersetzt die alte atomar.
+    """
+
+    def __init__(self, db_file: str = "/opt/devicebox/data/catalog.sqlite", cache_size: int = 4096):
+        self.db_file = db_file
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+        # Wird bei jedem Import erhöht, damit Threads ihre Verbindung erneuern
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """SQLite-Verbindung des aktuellen Threads (nur lesend)"""
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation:
+            if getattr(local, 'connection', None) is not None:
+                local.connection.close()
+            local.connection = None
+            local.generation = self._generation
+            if os.path.exists(self.db_file):
+                local.connection = sqlite3.connect(f'file:{self.db_file}?mode=ro', uri=True,
+                                                   check_same_thread=False)
+        return local.connection
+
+    def lookup(self, code: str) -> Optional[Dict]:
+        """Artikel zu einem Barcode (None, wenn unbekannt)"""
+        key = normalize_code(code)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+
+        connection = self._connection()
+        product = None
+        if connection is not None:
+            row = connection.execute('SELECT data FROM products WHERE gtin = ?', (key,)).fetchone()
+            if row:
+                product = json.loads(row[0])
+
+        with self._cache_lock:
+            self.misses += 1
+            # Auch "nicht gefunden" merken, damit unbekannte Codes nicht jedes Mal abgefragt werden
+            self._cache[key] = product
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return product
+
+    def import_records(self, records: Iterable[Tuple[str, Dict]], source: str = '') -> Dict:
+        """Baut den Index aus (Code, Datensatz)-Paaren neu auf"""
+        started = time.time()
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        # Eigene Datei je Import (gleiches Verzeichnis, damit os.replace atomar bleibt)
+        fd, temp_file = tempfile.mkstemp(prefix=os.path.basename(self.db_file) + '.',
+                                         suffix='.import', dir=os.path.dirname(self.db_file))
+        os.close(fd)
+
+        count = 0
+
+        def rows():
+            nonlocal count
+            for code, record in records:
+                count += 1
+                yield normalize_code(code), json.dumps(record, ensure_ascii=False)
+
+        connection = sqlite3.connect(temp_file)
+        try:
+            connection.execute('PRAGMA journal_mode=OFF')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.executescript(SCHEMA)
+            with connection:
+                connection.executemany('INSERT OR REPLACE INTO products (gtin, data) VALUES (?, ?)', rows())
+                connection.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', [
+                    ('imported_at', datetime.now().isoformat()),
+                    ('source', source),
+                ])
+            connection.execute('PRAGMA optimize')
+        except Exception:
+            connection.close()
+            os.remove(temp_file)
+            raise
+        connection.close()
+
+        os.replace(temp_file, self.db_file)
+        with self._cache_lock:
+            self._generation += 1
+            self._cache.clear()
+
+        return {
+            'records': count,
+            'products': self.count(),
+            'duration': round(time.time() - started, 3),
+            'source': source
+        }
+
+    def import_file(self, stream: io.TextIOBase, file_format: str, source: str = '') -> Dict:
+        """Importiert CSV oder NDJSON aus einem Text-Stream"""
+        if file_format == 'csv':
+            return self.import_records(iter_csv_records(stream), source)
+        if file_format in ('ndjson', 'jsonl'):
+            return self.import_records(iter_ndjson_records(stream), source)
+        raise ValueError(f'Unbekanntes Importformat: {file_format}')
+
+    def count(self) -> int:
+        """Anzahl der Artikel im Index"""
+        connection = self._connection()
+        if connection is None:
+            return 0
+        return connection.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+
+    def get_status(self) -> Dict:
+        """Größe, Importzeitpunkt und Cache-Statistik"""
+        connection = self._connection()
+        meta = {}
+        if connection is not None:
+            meta = dict(connection.execute('SELECT key, value FROM meta').fetchall())
+        with self._cache_lock:
+            cached = len(self._cache)
+        return {
+            'products': self.count(),
+            'imported_at': meta.get('imported_at'),
+            'source': meta.get('source'),
+            'cache_size': self.cache_size,
+            'cached': cached,
+            'cache_hits': self.hits,
+            'cache_misses': self.misses
+        }
+
+    def scan_stage(self, scan: Dict) -> Dict:
+        """Stufe der Scan-Pipeline: hängt den Artikel an das Scan-Ereignis an"""
+        scan['product'] = self.lookup(scan.get('gtin') or scan['code'])
+        return scan
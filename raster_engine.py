@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Raster-Engine
+Wandelt Bilder mit NumPy in druckerfertige 1-Bit-Rasterdaten um
+(Brother QL Rasterzeilen und ESC/POS GS v 0)
+"""
+
+import struct
+from typing import List, Optional, Union
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Unterstützte Dither-Verfahren
+DITHER_MODES = ('none', 'ordered', 'floyd_steinberg')
+
+# Brother QL-700/800: 720 Druckpunkte pro Zeile = 90 Bytes
+QL_PINS = 720
+QL_ROW_BYTES = QL_PINS // 8
+
+# Rechter Rand (in Punkten) für Endlos-Etiketten nach Breite in mm
+QL_RIGHT_MARGIN_DOTS = {
+    12: 29, 29: 6, 38: 12, 50: 12, 54: 0, 62: 12, 102: 12,
+}
+
+# Druckbare Breite (in Punkten) für Endlos-Etiketten nach Breite in mm
+QL_PRINTABLE_DOTS = {
+    12: 106, 29: 306, 38: 413, 50: 554, 54: 590, 62: 696, 102: 1164,
+}
+
+
+def _bayer_matrix(size: int):
+    """Erzeugt eine normierte Bayer-Matrix (Werte 0..1) der Größe 2^n"""
+    matrix = np.zeros((1, 1), dtype=np.float32)
+    while matrix.shape[0] < size:
+        matrix = np.block([
+            [4 * matrix + 0, 4 * matrix + 2],
+            [4 * matrix + 3, 4 * matrix + 1],
+        ])
+    return (matrix + 0.5) / matrix.size
+
+
+if NUMPY_AVAILABLE:
+    # Vorberechnete Schwellwert-Matrizen für Ordered Dither
+    BAYER_4 = _bayer_matrix(4) * 255.0
+    BAYER_8 = _bayer_matrix(8) * 255.0
+
+
+def threshold_level(threshold: float = 70.0) -> int:
+    """
+    Rechnet den Schwellwert in Prozent (Semantik wie brother_ql) in einen
+    Grauwert um: Pixel mit Grauwert kleiner als das Ergebnis werden gedruckt.
+    """
+    inverted = min(255, max(0, int((100.0 - threshold) / 100.0 * 255)))
+    return 256 - inverted
+
+
+def to_grayscale(image, width: Optional[int] = None):
+    """
+    Konvertiert ein PIL-Bild oder NumPy-Array in ein uint8-Graustufen-Array.
+    Ist width angegeben, wird das Bild proportional auf diese Breite skaliert.
+    """
+    if PIL_AVAILABLE and isinstance(image, Image.Image):
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            # Transparenz auf weißen Hintergrund legen
+            background = Image.new('RGBA', image.size, (255, 255, 255, 255))
+            background.alpha_composite(image.convert('RGBA'))
+            image = background
+        image = image.convert('L')
+        if width and image.size[0] != width:
+            height = max(1, int(round(image.size[1] * width / image.size[0])))
+            image = image.resize((width, height), Image.LANCZOS)
+        return np.asarray(image, dtype=np.uint8)
+
+    gray = np.asarray(image)
+    if gray.ndim == 3:
+        # Luminanz nach ITU-R 601 (wie PIL convert('L'))
+        gray = gray[..., :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        gray = np.clip(gray + 0.5, 0, 255).astype(np.uint8)
+    if width and gray.shape[1] != width:
+        raise ValueError(f'Bildbreite {gray.shape[1]} passt nicht zur Zielbreite {width}')
+    return gray.astype(np.uint8, copy=False)
+
+
+def threshold_dots(gray, level: int = 128):
+    """Einfacher Schwellwert: True = Druckpunkt (schwarz)"""
+    return gray < level
+
+
+def ordered_dots(gray, matrix_size: int = 4):
+    """Ordered Dither mit Bayer-Matrix (4x4 oder 8x8), vollständig vektorisiert"""
+    matrix = BAYER_8 if matrix_size == 8 else BAYER_4
+    height, width = gray.shape
+    reps = (-(-height // matrix.shape[0]), -(-width // matrix.shape[1]))
+    tiled = np.tile(matrix, reps)[:height, :width]
+    return gray < tiled
+
+
+def floyd_steinberg_dots(gray, level: int = 128):
+    """
+    Floyd-Steinberg Error-Diffusion.
+
+    Pixel (y, x) hängt nur von (y, x-1) und der Vorzeile (x-1..x+1) ab. Alle
+    Pixel mit gleichem t = x + 2y sind daher unabhängig und werden als
+    Wellenfront in einem NumPy-Schritt verarbeitet (W + 2H statt W * H
+    Python-Iterationen).
+    """
+    height, width = gray.shape
+    values = gray.astype(np.float32)
+    # Fehlerpuffer mit einer Spalte Rand links/rechts und einer Zeile unten
+    error = np.zeros((height + 1, width + 2), dtype=np.float32)
+    dots = np.zeros((height, width), dtype=np.bool_)
+    ys_all = np.arange(height)
+
+    for t in range(width + 2 * (height - 1)):
+        y_min = max(0, (t - width + 2) // 2)
+        y_max = min(height - 1, t // 2)
+        if y_min > y_max:
+            continue
+        ys = ys_all[y_min:y_max + 1]
+        xs = t - 2 * ys
+
+        value = values[ys, xs] + error[ys, xs + 1]
+        black = value < level
+        dots[ys, xs] = black
+        err = value - np.where(black, 0.0, 255.0)
+
+        error[ys, xs + 2] += err * (7.0 / 16.0)
+        error[ys + 1, xs] += err * (3.0 / 16.0)
+        error[ys + 1, xs + 1] += err * (5.0 / 16.0)
+        error[ys + 1, xs + 2] += err * (1.0 / 16.0)
+
+    return dots
+
+
+def to_dots(image, width: Optional[int] = None, threshold: float = 70.0,
+            dither: str = 'none'):
+    """
+    Wandelt ein Bild in eine boolesche Punktmatrix (True = Druckpunkt) um.
+
+    threshold: Schwellwert in Prozent wie bei brother_ql (Standard 70.0)
+    dither: 'none', 'ordered' oder 'floyd_steinberg'
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError('NumPy nicht verfügbar. Installieren Sie: pip install numpy')
+    if dither not in DITHER_MODES:
+        raise ValueError(f'Unbekanntes Dither-Verfahren: {dither}')
+
+    gray = to_grayscale(image, width)
+    if dither == 'ordered':
+        return ordered_dots(gray)
+    if dither == 'floyd_steinberg':
+        if PIL_AVAILABLE:
+            # PIL bringt eine native Implementierung mit (schneller als NumPy)
+            dithered = Image.fromarray(gray).convert('1', dither=Image.FLOYDSTEINBERG)
+            return ~np.asarray(dithered, dtype=np.bool_)
+        return floyd_steinberg_dots(gray)
+    return threshold_dots(gray, threshold_level(threshold))
+
+
+def pack_rows(dots) -> bytes:
+    """Packt die Punktmatrix zeilenweise MSB-first in Bytes (auf 8 Bit aufgefüllt)"""
+    return np.packbits(dots, axis=1).tobytes()
+
+
+def escpos_raster(image: Union['Image.Image', 'np.ndarray'], width: Optional[int] = None,
+                  threshold: float = 70.0, dither: str = 'none', band_height: int = 0,
+                  mode: int = 0) -> bytes:
+    """
+    Erzeugt ESC/POS Rasterbefehle (GS v 0) für ein Bild.
+
+    band_height > 0 teilt große Bilder in mehrere Befehle mit maximal
+    band_height Zeilen auf (für Drucker mit kleinem Empfangspuffer).
+    """
+    dots = image if _is_dot_matrix(image) else to_dots(image, width, threshold, dither)
+    packed = np.packbits(dots, axis=1)
+    height, row_bytes = packed.shape
+    band_height = band_height or height
+
+    commands = bytearray()
+    for start in range(0, height, band_height):
+        band = packed[start:start + band_height]
+        commands += b'\x1D\x76\x30' + bytes([mode])
+        commands += struct.pack('<HH', row_bytes, band.shape[0])
+        commands += band.tobytes()
+    return bytes(commands)
+
+
+def ql_raster_rows(image, label_width_mm: int = 62, threshold: float = 70.0,
+                   dither: str = 'none') -> List[bytes]:
+    """
+    Erzeugt die 90-Byte Rasterzeilen für Brother QL-700/800 (Endlos-Etiketten).
+
+    Das Bild wird auf die druckbare Breite skaliert, mit dem Rand des
+    Etiketts auf 720 Druckpunkte ausgerichtet und horizontal gespiegelt,
+    wie es der Druckkopf erwartet.
+    """
+    printable = QL_PRINTABLE_DOTS.get(label_width_mm)
+    if printable is None or printable > QL_PINS:
+        raise ValueError(f'Etikettenbreite {label_width_mm} mm wird nicht unterstützt')
+    right_margin = QL_RIGHT_MARGIN_DOTS[label_width_mm]
+
+    dots = image if _is_dot_matrix(image) else to_dots(image, printable, threshold, dither)
+    height = dots.shape[0]
+
+    full = np.zeros((height, QL_PINS), dtype=np.bool_)
+    left = QL_PINS - printable - right_margin
+    used = min(printable, dots.shape[1])
+    full[:, left:left + used] = dots[:, :used]
+    packed = np.packbits(full[:, ::-1], axis=1)
+    return [row.tobytes() for row in packed]
+
+
+def ql_raster_commands(rows: List[bytes], compress: bool = False) -> bytes:
+    """Verpackt Rasterzeilen in QL-Rasterbefehle ('g' + Länge + Daten)"""
+    commands = bytearray()
+    for row in rows:
+        if compress:
+            row = packbits_encode(row)
+        commands += b'\x67\x00' + bytes([len(row)]) + row
+    return bytes(commands)
+
+
+def packbits_encode(data: bytes) -> bytes:
+    """TIFF PackBits-Kompression einer Rasterzeile (für Drucker mit Kompression)"""
+    if not data:
+        return b''
+    if data.count(data[0]) == len(data):
+        # Häufigster Fall: komplett leere oder volle Zeile
+        result = bytearray()
+        remaining = len(data)
+        while remaining:
+            run = min(128, remaining)
+            result += bytes([257 - run if run > 1 else 0, data[0]])
+            remaining -= run
+        return bytes(result)
+
+    result = bytearray()
+    literal = bytearray()
+    i = 0
+    length = len(data)
+    while i < length:
+        run = 1
+        while i + run < length and run < 128 and data[i + run] == data[i]:
+            run += 1
+        if run > 2:
+            if literal:
+                result += bytes([len(literal) - 1]) + literal
+                literal = bytearray()
+            result += bytes([257 - run, data[i]])
+            i += run
+        else:
+            literal.append(data[i])
+            i += 1
+            if len(literal) == 128:
+                result += bytes([127]) + literal
+                literal = bytearray()
+    if literal:
+        result += bytes([len(literal) - 1]) + literal
+    return bytes(result)
+
+
+def _is_dot_matrix(image) -> bool:
+    """Prüft ob bereits eine boolesche Punktmatrix übergeben wurde"""
+    return NUMPY_AVAILABLE and isinstance(image, np.ndarray) and image.dtype == np.bool_
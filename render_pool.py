@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Render-Pool
+Begrenzter Prozess-Pool für CPU-intensive Druckaufbereitung
+(Bildkomposition, Rasterung, Kompression) außerhalb des Flask-Prozesses
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+
+class RenderPoolBusy(Exception):
+    """Wird ausgelöst, wenn der Render-Pool ausgelastet ist"""
+
+
+class RenderPoolNotStarted(RuntimeError):
+    """Wird ausgelöst, wenn ein Auftrag vor start() eingereicht wird"""
+
+
+class RenderPool:
+    """
+    Prozess-Pool mit Rückstau-Begrenzung.
+
+    Es werden höchstens size + queue_size Aufträge gleichzeitig angenommen;
+    weitere Aufträge warten bis zu wait_timeout Sekunden auf einen freien
+    Platz und werden sonst mit RenderPoolBusy abgewiesen.
+    Mit size = 0 laufen die Aufträge direkt im aufrufenden Thread.
+    """
+
+    def __init__(self, size: int, queue_size: int, wait_timeout: float = 5.0):
+        self.size = max(0, size)
+        self.queue_size = max(0, queue_size)
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max(1, self.size + self.queue_size))
+        self._executor = None
+        # Nach dem Absturz eines Workers wird im aufrufenden Thread gerendert
+        self._broken = False
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def start(self):
+        """
+        Startet die Worker-Prozesse sofort.
+
+        Der Pool verwendet 'fork', damit die Worker die Anwendung nicht erneut
+        importieren (bei 'spawn' und 'forkserver' importiert jeder Worker das
+        Hauptmodul und würde einen eigenen Device-Manager anlegen). Deshalb
+        muss start() in jedem Einstiegspunkt vor dem Import von device_manager
+        aufgerufen werden, solange noch keine Hintergrund-Threads laufen.
+        Später wird nie geforkt: ohne gestarteten Pool schlägt submit() fehl.
+        """
+        if self.size == 0:
+            return
+        with self._lock:
+            if self._executor is None and not self._broken:
+                context = multiprocessing.get_context('fork')
+                self._executor = ProcessPoolExecutor(max_workers=self.size, mp_context=context)
+                # Bei 'fork' werden alle Worker mit dem ersten Auftrag gestartet
+                self._executor.submit(os.getpid).result()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Reicht einen Auftrag ein (fn muss auf Modulebene definiert sein)"""
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            with self._lock:
+                self._rejected += 1
+            raise RenderPoolBusy(
+                f'Render-Pool ausgelastet ({self.size} Prozesse, {self.queue_size} Warteplätze)'
+            )
+
+        with self._lock:
+            self._in_flight += 1
+
+        try:
+            if self.size == 0:
+                future = self._submit_inline(fn, *args, **kwargs)
+            else:
+                future = self._submit_to_pool(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    def _submit_to_pool(self, fn: Callable, *args, **kwargs) -> Future:
+        executor = self._executor
+        if executor is None:
+            if self._broken:
+                return self._submit_inline(fn, *args, **kwargs)
+            raise RenderPoolNotStarted('Render-Pool wurde nicht gestartet (start_render_pool() im Einstiegspunkt fehlt)')
+        try:
+            return executor.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            # Ein Worker ist zuvor abgestürzt: ohne neuen Fork im aufrufenden Thread rendern
+            self._discard(executor)
+            return self._submit_inline(fn, *args, **kwargs)
+
+    @staticmethod
+    def _submit_inline(fn: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """
+        Verwirft einen defekten Pool (z.B. nach OOM-Kill oder Absturz in PIL).
+
+        Ein neuer Pool müsste aus dem laufenden, mehrfädigen Prozess geforkt
+        werden; bis zum Neustart des Dienstes wird deshalb im aufrufenden
+        Thread gerendert.
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self._broken = True
+        print("Render-Pool defekt (Worker-Prozess beendet), rendere bis zum Neustart im Dienst")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn: Callable, *args, timeout: Optional[float] = 60, **kwargs) -> Any:
+        """Führt einen Auftrag im Pool aus und wartet auf das Ergebnis"""
+        executor = self._executor
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except BrokenProcessPool:
+            # Der Worker ist während des Auftrags abgestürzt: einmal ohne Pool wiederholen
+            if executor is not None:
+                self._discard(executor)
+            return self.submit(fn, *args, **kwargs).result(timeout=timeout)
+
+    def _release(self, future: Optional[Future]):
+        """Gibt einen Platz im Pool wieder frei"""
+        with self._lock:
+            self._in_flight -= 1
+            if future is not None:
+                self._completed += 1
+        self._slots.release()
+
+    def get_status(self) -> dict:
+        """Gibt den aktuellen Zustand des Pools zurück"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'queue_size': self.queue_size,
+                'running': self._executor is not None,
+                'broken': self._broken,
+                'in_flight': self._in_flight,
+                'completed': self._completed,
+                'rejected': self._rejected
+            }
+
+    def shutdown(self):
+        """Beendet die Worker-Prozesse"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+def start_render_pool():
+    """Startet die Render-Prozesse im Einstiegspunkt, bevor device_manager importiert wird"""
+    try:
+        render_pool.start()
+    except Exception as e:
+        # Ohne Pool im aufrufenden Thread rendern statt jeden Druck abzulehnen
+        render_pool._broken = True
+        print(f"Render-Pool konnte nicht gestartet werden, rendere im Dienst: {e}")
+
+
+def _default_pool_size() -> int:
+    """Standard: alle Kerne bis auf einen (Flask, USB), höchstens 3"""
+    return max(1, min(3, (os.cpu_count() or 2) - 1))
+
+
+# Globale Instanz (Konfiguration über Umgebungsvariablen)
+_pool_size = int(os.getenv('RENDER_POOL_SIZE', _default_pool_size()))
+render_pool = RenderPool(
+    size=_pool_size,
+    queue_size=int(os.getenv('RENDER_POOL_QUEUE', _pool_size * 2)),
+    wait_timeout=float(os.getenv('RENDER_POOL_WAIT', 5))
+)
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Scanner-Eingabe
+Liest Barcode-Scanner im Tastatur-Modus direkt über evdev und dekodiert
+Tastencodes über vorberechnete Tabellen (deutsches und US-Layout)
+"""
+
+import os
+import time
+import selectors
+import threading
+from typing import Callable, Dict, List, Optional
+
+# Linux Input-Event-Codes (linux/input-event-codes.h)
+EV_KEY = 0x01
+KEY_UP = 0
+KEY_DOWN = 1
+KEY_TAB = 15
+KEY_ENTER = 28
+KEY_LEFTCTRL = 29
+KEY_LEFTSHIFT = 42
+KEY_RIGHTSHIFT = 54
+KEY_LEFTALT = 56
+KEY_KPENTER = 96
+KEY_RIGHTCTRL = 97
+KEY_RIGHTALT = 100
+
+SHIFT_KEYS = (KEY_LEFTSHIFT, KEY_RIGHTSHIFT)
+CTRL_KEYS = (KEY_LEFTCTRL, KEY_RIGHTCTRL)
+ENTER_KEYS = (KEY_ENTER, KEY_KPENTER)
+
+# Tastencode -> (normal, Shift, AltGr) für das deutsche Layout (QWERTZ)
+_LAYOUT_DE = {
+    2: ('1', '!', ''), 3: ('2', '"', '²'), 4: ('3', '§', '³'), 5: ('4', '$', ''),
+    6: ('5', '%', ''), 7: ('6', '&', ''), 8: ('7', '/', '{'), 9: ('8', '(', '['),
+    10: ('9', ')', ']'), 11: ('0', '=', '}'), 12: ('ß', '?', '\\'), 13: ('´', '`', ''),
+    16: ('q', 'Q', '@'), 17: ('w', 'W', ''), 18: ('e', 'E', '€'), 19: ('r', 'R', ''),
+    20: ('t', 'T', ''), 21: ('z', 'Z', ''), 22: ('u', 'U', ''), 23: ('i', 'I', ''),
+    24: ('o', 'O', ''), 25: ('p', 'P', ''), 26: ('ü', 'Ü', ''), 27: ('+', '*', '~'),
+    30: ('a', 'A', ''), 31: ('s', 'S', ''), 32: ('d', 'D', ''), 33: ('f', 'F', ''),
+    34: ('g', 'G', ''), 35: ('h', 'H', ''), 36: ('j', 'J', ''), 37: ('k', 'K', ''),
+    38: ('l', 'L', ''), 39: ('ö', 'Ö', ''), 40: ('ä', 'Ä', ''), 41: ('^', '°', ''),
+    43: ('#', "'", ''), 44: ('y', 'Y', ''), 45: ('x', 'X', ''), 46: ('c', 'C', ''),
+    47: ('v', 'V', ''), 48: ('b', 'B', ''), 49: ('n', 'N', ''), 50: ('m', 'M', 'µ'),
+    51: (',', ';', ''), 52: ('.', ':', ''), 53: ('-', '_', ''), 57: (' ', ' ', ''),
+    86: ('<', '>', '|'),
+    # Ziffernblock
+    55: ('*', '*', ''), 71: ('7', '7', ''), 72: ('8', '8', ''), 73: ('9', '9', ''),
+    74: ('-', '-', ''), 75: ('4', '4', ''), 76: ('5', '5', ''), 77: ('6', '6', ''),
+    78: ('+', '+', ''), 79: ('1', '1', ''), 80: ('2', '2', ''), 81: ('3', '3', ''),
+    82: ('0', '0', ''), 83: (',', ',', ''), 98: ('/', '/', ''),
+}
+
+# Tastencode -> (normal, Shift, AltGr) für das US-Layout
+_LAYOUT_US = dict(_LAYOUT_DE)
+_LAYOUT_US.update({
+    3: ('2', '@', ''), 4: ('3', '#', ''), 7: ('6', '^', ''), 8: ('7', '&', ''),
+    9: ('8', '*', ''), 10: ('9', '(', ''), 11: ('0', ')', ''), 12: ('-', '_', ''),
+    13: ('=', '+', ''), 16: ('q', 'Q', ''), 18: ('e', 'E', ''), 21: ('y', 'Y', ''),
+    26: ('[', '{', ''), 27: (']', '}', ''), 39: (';', ':', ''), 40: ("'", '"', ''),
+    41: ('`', '~', ''), 43: ('\\', '|', ''), 44: ('z', 'Z', ''), 50: ('m', 'M', ''),
+    51: (',', '<', ''), 52: ('.', '>', ''), 53: ('/', '?', ''), 86: ('\\', '|', ''),
+    83: ('.', '.', ''),
+})
+
+# Positionsabhängige Steuerzeichen (Strg + Taste), z.B. GS als Strg+] für GS1
+_CTRL_POSITIONAL = {26: '\x1b', 43: '\x1c', 27: '\x1d'}
+
+
+class KeyTable:
+    """Vorberechnete Nachschlagetabellen (Index = Tastencode)"""
+
+    __slots__ = ('normal', 'shift', 'altgr', 'ctrl')
+
+    def __init__(self, layout: Dict[int, tuple]):
+        self.normal = [''] * 256
+        self.shift = [''] * 256
+        self.altgr = [''] * 256
+        self.ctrl = [''] * 256
+        for code, (normal, shifted, altgr) in layout.items():
+            self.normal[code] = normal
+            self.shift[code] = shifted
+            self.altgr[code] = altgr
+            if len(normal) == 1 and 'a' <= normal <= 'z':
+                self.ctrl[code] = chr(ord(normal) - ord('a') + 1)
+        for code, char in _CTRL_POSITIONAL.items():
+            self.ctrl[code] = char
+
+
+KEY_TABLES = {
+    'de': KeyTable(_LAYOUT_DE),
+    'us': KeyTable(_LAYOUT_US),
+}
+
+
+class ScanDecoder:
+    """
+    Setzt Tastendrücke eines Scanners zu Barcodes zusammen.
+    Ein Barcode ist mit Enter abgeschlossen.
+    """
+
+    __slots__ = ('table', 'chars', 'shift', 'altgr', 'ctrl', 'tab_as_separator')
+
+    def __init__(self, layout: str = 'de', tab_as_separator: bool = True):
+        self.table = KEY_TABLES.get(layout, KEY_TABLES['de'])
+        self.chars = []
+        self.shift = 0
+        self.altgr = False
+        self.ctrl = 0
+        self.tab_as_separator = tab_as_separator
+
+    @property
+    def pending(self) -> str:
+        """Bisher empfangene Zeichen des laufenden Scans"""
+        return ''.join(self.chars)
+
+    def reset(self):
+        """Verwirft einen unvollständigen Scan"""
+        self.chars = []
+        self.shift = 0
+        self.altgr = False
+        self.ctrl = 0
+
+    def feed(self, code: int, value: int) -> Optional[str]:
+        """Verarbeitet ein Tasten-Event, gibt bei Enter den fertigen Barcode zurück"""
+        if code in SHIFT_KEYS:
+            self.shift += 1 if value == KEY_DOWN else (-1 if value == KEY_UP else 0)
+            self.shift = max(0, self.shift)
+            return None
+        if code in CTRL_KEYS:
+            self.ctrl += 1 if value == KEY_DOWN else (-1 if value == KEY_UP else 0)
+            self.ctrl = max(0, self.ctrl)
+            return None
+        if code == KEY_RIGHTALT:
+            if value != 2:
+                self.altgr = value == KEY_DOWN
+            return None
+        if value != KEY_DOWN:
+            return None
+
+        if code in ENTER_KEYS:
+            barcode = ''.join(self.chars)
+            self.chars = []
+            return barcode
+        if code == KEY_TAB:
+            if self.tab_as_separator:
+                self.chars.append('\t')
+            return None
+        if code > 255:
+            return None
+
+        table = self.table
+        if self.ctrl:
+            char = table.ctrl[code]
+        elif self.altgr:
+            char = table.altgr[code]
+        elif self.shift:
+            char = table.shift[code]
+        else:
+            char = table.normal[code]
+        if char:
+            self.chars.append(char)
+        return None
+
+
+class ScanReader:
+    """
+    Ein Lese-Thread für alle Scanner: wartet per selectors (epoll) auf
+    Eingaben und liest verfügbare Events gesammelt.
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._thread = None
+        # Weckpipe, damit Registrierungen sofort wirksam werden
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    def start(self):
+        """Startet den Lese-Thread (falls noch nicht gestartet)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='scan-reader', daemon=True)
+                self._thread.start()
+
+    def register(self, input_device, decoder: ScanDecoder,
+                 on_scan: Callable[[str, float], None],
+                 on_error: Optional[Callable[[Exception], None]] = None,
+                 on_keys: Optional[Callable[[], None]] = None):
+        """Meldet ein geöffnetes evdev.InputDevice beim Lese-Thread an"""
+        self._register(input_device.fd, (self._read_device, input_device, decoder,
+                                         on_scan, on_error, on_keys))
+
+    def register_hidraw(self, fd: int, decoder, on_scan: Callable[[str, float, Optional[str]], None],
+                        on_error: Optional[Callable[[Exception], None]] = None,
+                        report_size: int = 64):
+        """Meldet einen nicht-blockierend geöffneten hidraw-Knoten (HID POS) an"""
+        self._register(fd, (self._read_hidraw, fd, decoder, on_scan, on_error, report_size))
+
+    def _register(self, fd: int, data: tuple):
+        with self._lock:
+            self._selector.register(fd, selectors.EVENT_READ, data)
+        self.start()
+        self._wake()
+
+    def unregister(self, device):
+        """Meldet ein Gerät ab (evdev.InputDevice oder Dateideskriptor)"""
+        fd = device if isinstance(device, int) else device.fd
+        with self._lock:
+            try:
+                self._selector.unregister(fd)
+            except (KeyError, ValueError):
+                pass
+        self._wake()
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, b'\x00')
+        except BlockingIOError:
+            pass
+
+    def _run(self):
+        while True:
+            try:
+                ready = self._selector.select(timeout=5)
+            except Exception as e:
+                print(f"Fehler im Scanner-Lese-Thread: {e}")
+                time.sleep(1)
+                continue
+
+            for key, _ in ready:
+                if key.data is None:
+                    try:
+                        os.read(self._wake_r, 512)
+                    except BlockingIOError:
+                        pass
+                    continue
+                handler = key.data[0]
+                handler(*key.data[1:])
+
+    def _read_device(self, input_device, decoder, on_scan, on_error, on_keys):
+        """Liest alle anstehenden Events eines Geräts"""
+        try:
+            events = input_device.read()
+            for event in events:
+                if event.type != EV_KEY:
+                    continue
+                barcode = decoder.feed(event.code, event.value)
+                if barcode:
+                    on_scan(barcode, event.sec + event.usec / 1000000.0)
+            if on_keys:
+                on_keys()
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            # Gerät wurde entfernt (ENODEV) oder ist nicht mehr lesbar
+            self.unregister(input_device)
+            if on_error:
+                on_error(e)
+
+    def _read_hidraw(self, fd, decoder, on_scan, on_error, report_size):
+        """Liest alle anstehenden HID-Reports; ein Barcode kommt meist in einem Report"""
+        try:
+            while True:
+                report = os.read(fd, report_size)
+                if not report:
+                    raise OSError('hidraw: Gerät geschlossen')
+                result = decoder.feed(report)
+                if result:
+                    barcode, symbology = result
+                    on_scan(barcode, time.time(), symbology)
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            self.unregister(fd)
+            if on_error:
+                on_error(e)
+
+
+class InputNode:
+    """Metadaten eines Event-Knotens aus sysfs (ohne das Gerät zu öffnen)"""
+
+    __slots__ = ('path', 'name', 'phys', 'vendor_product', 'has_enter')
+
+    def __init__(self, path: str, name: str, phys: str, vendor_product: str, has_enter: bool):
+        self.path = path
+        self.name = name
+        self.phys = phys
+        self.vendor_product = vendor_product
+        self.has_enter = has_enter
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def _read_sysfs(path: str) -> str:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def _bitmap_has(bitmap: str, bit: int, word_bits: int) -> bool:
+    """Prüft ein Bit in einer sysfs-Bitmap (hex-Wörter, höchstwertiges zuerst)"""
+    words = bitmap.split()
+    index = bit // word_bits
+    if index >= len(words):
+        return False
+    return bool(int(words[-1 - index], 16) >> (bit % word_bits) & 1)
+
+
+class InputDeviceIndex:
+    """
+    Zuordnung der Event-Knoten zu VID:PID, Name und Anschluss über sysfs.
+
+    Die Zuordnung wird zwischengespeichert und neu gelesen, sobald sich die
+    Knoten unter /dev/input ändern (Hotplug) oder invalidate() aufgerufen wird.
+    Kein Eingabegerät wird dafür geöffnet.
+    """
+
+    def __init__(self, sysfs_root: str = '/sys/class/input', dev_root: str = '/dev/input'):
+        self.sysfs_root = sysfs_root
+        self.dev_root = dev_root
+        self._lock = threading.Lock()
+        self._generation = None
+        self._nodes = []
+        # Wortbreite der Kernel-Bitmaps (unsigned long)
+        self._word_bits = 64 if os.uname().machine.endswith('64') else 32
+
+    def _current_generation(self):
+        try:
+            names = tuple(sorted(name for name in os.listdir(self.sysfs_root)
+                                 if name.startswith('event')))
+        except OSError:
+            names = ()
+        try:
+            mtime = os.stat(self.dev_root).st_mtime_ns
+        except OSError:
+            mtime = 0
+        return names, mtime
+
+    def invalidate(self):
+        """Verwirft die zwischengespeicherte Zuordnung"""
+        with self._lock:
+            self._generation = None
+
+    def nodes(self) -> List[InputNode]:
+        """Alle Event-Knoten (bei Änderungen neu aus sysfs gelesen)"""
+        generation = self._current_generation()
+        with self._lock:
+            if generation != self._generation:
+                self._nodes = [self._read_node(name) for name in generation[0]]
+                self._generation = generation
+            return list(self._nodes)
+
+    def _read_node(self, name: str) -> InputNode:
+        device = os.path.join(self.sysfs_root, name, 'device')
+        vendor = _read_sysfs(os.path.join(device, 'id', 'vendor')) or '0000'
+        product = _read_sysfs(os.path.join(device, 'id', 'product')) or '0000'
+        keys = _read_sysfs(os.path.join(device, 'capabilities', 'key'))
+        return InputNode(
+            path=os.path.join(self.dev_root, name),
+            name=_read_sysfs(os.path.join(device, 'name')),
+            phys=_read_sysfs(os.path.join(device, 'phys')),
+            vendor_product=f"{vendor}:{product}".lower(),
+            has_enter=(_bitmap_has(keys, KEY_ENTER, self._word_bits) or
+                       _bitmap_has(keys, KEY_KPENTER, self._word_bits))
+        )
+
+    def find(self, match: Callable[[InputNode], bool], exclude=()) -> Optional[InputNode]:
+        """Erster passender Knoten, der nicht in exclude (Pfade) liegt"""
+        for node in self.nodes():
+            if node.path not in exclude and match(node):
+                return node
+        return None
+
+
+# Globale Instanzen
+scan_reader = ScanReader()
+input_index = InputDeviceIndex()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Serielle Schnittstelle
+Asynchroner Transport für serielle Geräte (ESC/POS-Drucker, EC-Terminals).
+Alle Ports laufen nicht-blockierend in der Device-Loop; Schreibaufrufe einer
+Loop-Runde werden zu einem Schreibvorgang zusammengefasst. Hardware- (RTS/CTS)
+und Software-Flusskontrolle (XON/XOFF) übernimmt der Kernel-Treiber, ein
+angehaltener Datenfluss wird erkannt und gemeldet.
+"""
+
+import os
+import time
+import asyncio
+from typing import Dict, Optional
+
+try:
+    import serial
+    SERIAL_AVAILABLE = True
+except ImportError:
+    SERIAL_AVAILABLE = False
+
+from escpos_builder import DLE_EOT, STATUS_REQUESTS, decode_status
+
+FLOW_CONTROL = ('none', 'rtscts', 'xonxoff')
+READ_CHUNK = 4096
+
+
+class SerialTransportError(Exception):
+    """Fehler beim Zugriff auf eine serielle Schnittstelle"""
+
+
+class SerialSettings:
+    """Leitungsparameter eines Ports (aus den Geräte-Einstellungen)"""
+
+    __slots__ = ('baudrate', 'bytesize', 'parity', 'stopbits', 'flow_control')
+
+    def __init__(self, baudrate: int = 9600, bytesize: int = 8, parity: str = 'N',
+                 stopbits: float = 1, flow_control: str = 'none'):
+        if parity not in ('N', 'E', 'O', 'M', 'S'):
+            raise ValueError(f'Ungültige Parität: {parity}')
+        if flow_control not in FLOW_CONTROL:
+            raise ValueError(f'Ungültige Flusskontrolle: {flow_control}')
+        self.baudrate = int(baudrate)
+        self.bytesize = int(bytesize)
+        self.parity = parity
+        self.stopbits = stopbits
+        self.flow_control = flow_control
+
+    @classmethod
+    def from_settings(cls, settings: Dict, **defaults) -> 'SerialSettings':
+        """Liest baudrate, bytesize, parity, stopbits und flow_control aus einem Einstellungs-Dict"""
+        values = dict(defaults)
+        values.update({key: settings[key] for key in cls.__slots__ if settings.get(key) not in (None, '')})
+        values['parity'] = str(values.get('parity', 'N'))[:1].upper()
+        stopbits = float(values.get('stopbits', 1))
+        values['stopbits'] = int(stopbits) if stopbits.is_integer() else stopbits
+        return cls(**values)
+
+    def key(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class SerialTransport:
+    """Ein geöffneter Port; alle Methoden werden in der Device-Loop aufgerufen"""
+
+    def __init__(self, port: str, config: SerialSettings):
+        self.port = port
+        self.config = config
+        self.serial = None
+        self.fd = None
+        self._loop = None
+        self._tx = bytearray()
+        self._rx = bytearray()
+        self._flush_scheduled = False
+        self._writer_registered = False
+        self._drain_waiters = []
+        self._read_waiter = None
+        self.error = None
+        self.opened_at = None
+        self.stalled_since = None
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.writes = 0
+        # Antwortet das Gerät auf Statusabfragen (wird beim ersten Ausbleiben abgeschaltet)
+        self.status_supported = True
+
+    @property
+    def is_open(self) -> bool:
+        return self.fd is not None and self.error is None
+
+    async def open(self):
+        if not SERIAL_AVAILABLE:
+            raise SerialTransportError('pyserial ist nicht installiert')
+        config = self.config
+        try:
+            # timeout=0: pyserial öffnet den Port nicht-blockierend
+            self.serial = serial.Serial(
+                self.port, baudrate=config.baudrate, bytesize=config.bytesize,
+                parity=config.parity, stopbits=config.stopbits,
+                rtscts=config.flow_control == 'rtscts',
+                xonxoff=config.flow_control == 'xonxoff',
+                timeout=0, write_timeout=0, exclusive=True)
+        except (serial.SerialException, ValueError) as e:
+            raise SerialTransportError(f'{self.port} kann nicht geöffnet werden: {e}')
+        self.fd = self.serial.fileno()
+        os.set_blocking(self.fd, False)
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.fd, self._on_readable)
+        self.error = None
+        self.opened_at = time.time()
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, READ_CHUNK)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(e)
+            return
+        if not data:
+            return
+        self._rx += data
+        self.bytes_read += len(data)
+        if self._read_waiter is not None and not self._read_waiter.done():
+            self._read_waiter.set_result(None)
+
+    def write(self, data: bytes):
+        """Puffert Daten; alle Aufrufe derselben Loop-Runde gehen in einem Schreibvorgang raus"""
+        if not self.is_open:
+            raise SerialTransportError(self.error or f'{self.port} ist nicht geöffnet')
+        self._tx += data
+        if not self._flush_scheduled and not self._writer_registered:
+            self._flush_scheduled = True
+            self._loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if self.fd is None:
+            return
+        try:
+            written = os.write(self.fd, self._tx) if self._tx else 0
+        except BlockingIOError:
+            written = 0
+        except OSError as e:
+            self._fail(e)
+            return
+        if written:
+            del self._tx[:written]
+            self.bytes_written += written
+            self.writes += 1
+            self.stalled_since = None
+        if self._tx:
+            # Kernel-Puffer voll, z.B. CTS inaktiv oder XOFF empfangen
+            if self.stalled_since is None:
+                self.stalled_since = time.time()
+            if not self._writer_registered:
+                self._loop.add_writer(self.fd, self._flush)
+                self._writer_registered = True
+            return
+        if self._writer_registered:
+            self._loop.remove_writer(self.fd)
+            self._writer_registered = False
+        self._wake_drain_waiters()
+
+    def _wake_drain_waiters(self, error: Optional[Exception] = None):
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                if error is None:
+                    waiter.set_result(None)
+                else:
+                    waiter.set_exception(error)
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Wartet, bis alle gepufferten Daten an den Treiber übergeben sind"""
+        if self.error:
+            # Nach einem Schreibfehler wird nichts mehr übertragen
+            raise SerialTransportError(self.error)
+        if not self._tx and not self._flush_scheduled:
+            return
+        waiter = self._loop.create_future()
+        self._drain_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            raise SerialTransportError(
+                f'{self.port} nimmt keine Daten an ({len(self._tx)} Bytes ausstehend, '
+                f'Flusskontrolle: {self.config.flow_control})')
+
+    async def _wait_data(self, timeout: Optional[float]):
+        self._read_waiter = self._loop.create_future()
+        try:
+            await asyncio.wait_for(self._read_waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._read_waiter = None
+
+    async def read(self, size: int = 1, timeout: float = 1.0) -> bytes:
+        """Liest genau size Bytes (SerialTransportError bei Zeitüberschreitung)"""
+        deadline = self._loop.time() + timeout
+        while len(self._rx) < size:
+            if not self.is_open:
+                raise SerialTransportError(self.error or f'{self.port} ist nicht geöffnet')
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                raise SerialTransportError(f'Keine Antwort von {self.port}')
+            await self._wait_data(remaining)
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    async def read_some(self) -> bytes:
+        """Liest alle vorhandenen Bytes, wartet auf mindestens eines"""
+        while not self._rx:
+            if not self.is_open:
+                raise SerialTransportError(self.error or f'{self.port} ist nicht geöffnet')
+            await self._wait_data(None)
+        data = bytes(self._rx)
+        self._rx.clear()
+        return data
+
+    def reset_input(self):
+        self._rx.clear()
+
+    def _fail(self, error: Exception):
+        self.error = str(error) or 'Verbindung unterbrochen'
+        print(f"Serieller Fehler an {self.port}: {self.error}")
+        self._wake_drain_waiters(SerialTransportError(self.error))
+        if self._read_waiter is not None and not self._read_waiter.done():
+            self._read_waiter.set_result(None)
+        self._release()
+
+    def _release(self):
+        if self.fd is not None and self._loop is not None:
+            self._loop.remove_reader(self.fd)
+            if self._writer_registered:
+                self._loop.remove_writer(self.fd)
+                self._writer_registered = False
+        if self.serial is not None:
+            try:
+                self.serial.close()
+            except Exception:
+                pass
+        self.fd = None
+
+    async def close(self, timeout: float = 2.0):
+        if self.fd is None:
+            return
+        try:
+            await self.drain(timeout)
+        except SerialTransportError:
+            pass
+        self._release()
+        self._wake_drain_waiters(SerialTransportError('Port geschlossen'))
+
+    def get_status(self) -> Dict:
+        status = {
+            'port': self.port,
+            'settings': self.config.to_dict(),
+            'open': self.is_open,
+            'error': self.error,
+            'pending_bytes': len(self._tx),
+            'bytes_written': self.bytes_written,
+            'bytes_read': self.bytes_read,
+            'writes': self.writes,
+            'flow_stopped_for': round(time.time() - self.stalled_since, 1) if self.stalled_since else 0
+        }
+        if self.is_open and self.config.flow_control == 'rtscts':
+            try:
+                status['cts'] = self.serial.cts
+            except Exception:
+                pass
+        return status
+
+
+async def query_escpos_status(transport: SerialTransport, timeout: float = 0.5) -> Optional[Dict]:
+    """
+    Fragt den Druckerstatus per DLE EOT 1-4 ab (Antwort je ein Byte).
+    None, wenn der Drucker nicht antwortet (z.B. Kabel ohne Rückkanal)
+    """
+    if not transport.status_supported:
+        return None
+    transport.reset_input()
+    status = {}
+    for request in STATUS_REQUESTS:
+        transport.write(DLE_EOT + bytes([request]))
+        try:
+            value = (await transport.read(1, timeout))[0]
+        except SerialTransportError:
+            if not transport.is_open:
+                raise
+            transport.status_supported = False
+            return None
+        flags = decode_status(request, value)
+        if flags is None:
+            raise SerialTransportError(f'Ungültige Statusantwort 0x{value:02X}')
+        status.update(flags)
+    status['ready'] = not (status['offline'] or status['paper_end'] or status['cover_open']
+                           or status['unrecoverable_error'])
+    return status
+
+
+class SerialPortPool:
+    """Offene Ports aller seriellen Geräte (ein Transport pro Port)"""
+
+    def __init__(self):
+        self._ports = {}
+        self._lock = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def get(self, port: str, config: SerialSettings) -> SerialTransport:
+        """Offener Transport für den Port (wird bei geänderten Einstellungen neu geöffnet)"""
+        async with self._get_lock():
+            transport = self._ports.get(port)
+            if transport is not None and transport.is_open and transport.config.key() == config.key():
+                return transport
+            if transport is not None:
+                await transport.close()
+            transport = SerialTransport(port, config)
+            await transport.open()
+            self._ports[port] = transport
+            return transport
+
+    async def close(self, port: str):
+        async with self._get_lock():
+            transport = self._ports.pop(port, None)
+            if transport is not None:
+                await transport.close()
+
+    def get_status(self) -> Dict:
+        return {port: transport.get_status() for port, transport in self._ports.items()}
+
+
+# Globale Instanz
+serial_ports = SerialPortPool()
@@ -2,19 +2,162 @@
  * DeviceBox - Minimalistisches USB Manager Interface
  */
 
+/**
+ * Liste mit Schlüssel pro Eintrag: nur geänderte Einträge werden neu gerendert,
+ * alle Änderungen eines Frames werden in requestAnimationFrame gesammelt.
+ */
+class KeyedList {
+    constructor(container, { key, render, empty }) {
+        this.container = container;
+        this.key = key;
+        this.render = render;
+        this.empty = empty;
+        this.items = new Map();
+        this.nodes = new Map();
+        this.html = new Map();
+        this.dirty = new Set();
+        this.removed = new Set();
+        this.frame = null;
+    }
+    
+    set(items) {
+        // Vollständiger Stand: fehlende Schlüssel entfallen
+        const keys = new Set();
+        items.forEach(item => {
+            const key = this.key(item);
+            keys.add(key);
+            this.items.set(key, item);
+            this.dirty.add(key);
+        });
+        this.items.forEach((item, key) => {
+            if (!keys.has(key)) this.remove(key);
+        });
+        this.schedule();
+    }
+    
+    update(changed, removedKeys) {
+        changed.forEach(item => {
+            const key = this.key(item);
+            this.items.set(key, item);
+            this.removed.delete(key);
+            this.dirty.add(key);
+        });
+        removedKeys.forEach(key => this.remove(key));
+        this.schedule();
+    }
+    
+    remove(key) {
+        this.items.delete(key);
+        this.dirty.delete(key);
+        this.removed.add(key);
+    }
+    
+    message(html) {
+        // Fehler- oder Ladeanzeige ersetzt die Liste; der nächste Stand rendert alles neu
+        if (this.frame) {
+            cancelAnimationFrame(this.frame);
+            this.frame = null;
+        }
+        this.items.clear();
+        this.nodes.clear();
+        this.html.clear();
+        this.dirty.clear();
+        this.removed.clear();
+        this.container.innerHTML = html;
+    }
+    
+    schedule() {
+        if (!this.frame) {
+            this.frame = requestAnimationFrame(() => this.flush());
+        }
+    }
+    
+    flush() {
+        this.frame = null;
+        
+        this.removed.forEach(key => {
+            const node = this.nodes.get(key);
+            if (node) node.remove();
+            this.nodes.delete(key);
+            this.html.delete(key);
+        });
+        this.removed.clear();
+        
+        if (this.items.size === 0) {
+            this.container.innerHTML = this.empty;
+            return;
+        }
+        // Platzhalter (leer, Laden, Fehler) entfernen
+        Array.from(this.container.children).forEach(child => {
+            if (!child.dataset.key) child.remove();
+        });
+        
+        const template = document.createElement('template');
+        this.dirty.forEach(key => {
+            const html = this.render(this.items.get(key)).trim();
+            if (this.html.get(key) === html) return;
+            template.innerHTML = html;
+            const node = template.content.firstElementChild;
+            node.dataset.key = key;
+            const previous = this.nodes.get(key);
+            if (previous) previous.replaceWith(node);
+            this.nodes.set(key, node);
+            this.html.set(key, html);
+        });
+        this.dirty.clear();
+        
+        // Reihenfolge der Einträge herstellen, ohne unveränderte Knoten anzufassen
+        let expected = this.container.firstElementChild;
+        this.items.forEach((item, key) => {
+            const node = this.nodes.get(key);
+            if (node === expected) {
+                expected = node.nextElementSibling;
+            } else {
+                this.container.insertBefore(node, expected);
+            }
+        });
+    }
+}
+
 class DeviceBoxApp {
     constructor() {
         this.refreshInterval = null;
         this.isUpdating = false;
         this.currentDevice = null;
+        this.deviceRevision = 0;
+        this.deviceEpoch = '';
+        this.availableList = this.createList('available-devices', {
+            key: device => device.type === 'usb'
+                ? `usb:${device.vendor_product}:${device.bus}:${device.device_id}`
+                : `serial:${device.port}`,
+            render: device => this.renderAvailableDevice(device),
+            empty: `
+                <div class="loading-state">
+                    <i class="fas fa-usb"></i>
+                    <span>Keine USB-Geräte gefunden</span>
+                </div>
+            `
+        });
+        this.configuredList = this.createList('configured-devices', {
+            key: device => device.id,
+            render: device => this.renderDeviceCard(device),
+            empty: `
+                <div class="loading-state">
+                    <i class="fas fa-cog"></i>
+                    <span>Keine konfigurierten Geräte</span>
+                </div>
+            `
+        });
         
         this.init();
     }
     
     init() {
         this.bindEvents();
+        this.hydrate();
         this.loadInitialData();
         this.startAutoRefresh();
+        this.startScanStream();
     }
     
     bindEvents() {
@@ -115,18 +258,78 @@ class DeviceBoxApp {
         });
     }
     
+    createList(containerId, options) {
+        const container = document.getElementById(containerId);
+        return container ? new KeyedList(container, options) : null;
+    }
+    
+    hydrate() {
+        // Vom Server eingebetteter Startzustand: sofort anzeigen, aktuelle Daten folgen
+        this.hydratedSections = [];
+        const element = document.getElementById('initial-state');
+        if (!element) return;
+        
+        try {
+            const state = JSON.parse(element.textContent);
+            this.applyDashboard(state.sections);
+            // Ältere Zwischenstände werden beim ersten Laden aufgefrischt
+            if (state.age <= 2) {
+                this.hydratedSections = Object.keys(state.sections);
+            }
+        } catch (error) {
+            console.error('Error reading initial state:', error);
+        }
+    }
+    
     async loadInitialData() {
+        // Ein Aufruf für alle Bereiche; zu langsame Bereiche werden einzeln nachgeladen
+        const loaders = {
+            status: () => this.loadSystemStatus(),
+            updates: () => this.loadUpdateInfo(),
+            available_devices: () => this.loadAvailableDevices(),
+            devices: () => this.loadConfiguredDevices(),
+            scanner: () => this.updateScannerStatus()
+        };
+        
+        const names = Object.keys(loaders).filter(name => !this.hydratedSections.includes(name));
+        if (names.length === 0) return;
+        
         try {
-            await Promise.all([
-                this.loadSystemStatus(),
-                this.loadUpdateInfo(),
-                this.loadAvailableDevices(),
-                this.loadConfiguredDevices(),
-                this.updateScannerStatus()
-            ]);
+            const response = await fetch(`/api/dashboard?sections=${names.join(',')}`);
+            const data = await response.json();
+            
+            if (data.error) {
+                throw new Error(data.error);
+            }
+            
+            this.applyDashboard(data.sections);
+            await Promise.all(Object.keys(data.errors).map(name => loaders[name] && loaders[name]()));
         } catch (error) {
-            this.showToast('Fehler beim Laden der Daten', 'error');
-            console.error('Error loading initial data:', error);
+            console.error('Error loading dashboard:', error);
+            try {
+                await Promise.all(names.map(name => loaders[name]()));
+            } catch (error) {
+                this.showToast('Fehler beim Laden der Daten', 'error');
+                console.error('Error loading initial data:', error);
+            }
+        }
+    }
+    
+    applyDashboard(sections) {
+        if (sections.status) {
+            sections.status.error ? this.showSystemStatusError(sections.status.error) : this.updateSystemStatus(sections.status);
+        }
+        if (sections.updates) {
+            sections.updates.error ? this.showUpdateError(sections.updates.error) : this.updateUpdateInfo(sections.updates);
+        }
+        if (sections.available_devices) {
+            this.updateAvailableDevices(sections.available_devices);
+        }
+        if (sections.devices) {
+            this.applyDeviceChanges(sections.devices);
+        }
+        if (sections.scanner) {
+            this.renderScannerStatus(sections.scanner);
         }
     }
     
@@ -303,20 +506,13 @@ class DeviceBoxApp {
     }
     
     updateAvailableDevices(devices) {
-        const container = document.getElementById('available-devices');
-        if (!container) return;
-        
-        if (devices.length === 0) {
-            container.innerHTML = `
-                <div class="loading-state">
-                    <i class="fas fa-usb"></i>
-                    <span>Keine USB-Geräte gefunden</span>
-                </div>
-            `;
-            return;
+        if (this.availableList) {
+            this.availableList.set(devices);
         }
-        
-        container.innerHTML = devices.map(device => `
+    }
+    
+    renderAvailableDevice(device) {
+        return `
             <div class="device-item">
                 <div class="device-info">
                     <div class="device-name">${device.description && device.description !== 'n/a' ? device.description : 'Unbekanntes Gerät'}</div>
@@ -335,54 +531,53 @@ class DeviceBoxApp {
                     </button>
                 </div>
             </div>
-        `).join('');
+        `;
     }
     
     showAvailableDevicesError(message) {
-        const container = document.getElementById('available-devices');
-        if (!container) return;
+        if (!this.availableList) return;
         
-        container.innerHTML = `
+        this.availableList.message(`
             <div class="error-state">
                 <i class="fas fa-exclamation-triangle"></i>
                 <span>Fehler beim Laden: ${message}</span>
             </div>
-        `;
+        `);
     }
     
     async loadConfiguredDevices() {
         try {
-            const response = await fetch('/api/devices');
+            // Nur Änderungen seit dem zuletzt angezeigten Stand
+            const response = await fetch(`/api/devices/changes?since=${this.deviceRevision}&epoch=${this.deviceEpoch}`);
             const data = await response.json();
             
             if (data.error) {
                 throw new Error(data.error);
             }
             
-            this.updateConfiguredDevices(data);
+            this.applyDeviceChanges(data);
             
         } catch (error) {
             this.showConfiguredDevicesError(error.message);
         }
     }
     
-    updateConfiguredDevices(devices) {
-        const container = document.getElementById('configured-devices');
-        if (!container) return;
-        
-        const deviceList = Object.values(devices);
+    applyDeviceChanges(delta) {
+        // Antwort von /api/devices/changes: vollständig oder nur geänderte Geräte
+        if (!this.configuredList) return;
         
-        if (deviceList.length === 0) {
-            container.innerHTML = `
-                <div class="loading-state">
-                    <i class="fas fa-cog"></i>
-                    <span>Keine konfigurierten Geräte</span>
-                </div>
-            `;
-            return;
+        const changed = Object.values(delta.changed);
+        if (delta.full) {
+            this.configuredList.set(changed);
+        } else {
+            this.configuredList.update(changed, delta.removed);
         }
-        
-        container.innerHTML = deviceList.map(device => `
+        this.deviceRevision = delta.revision;
+        this.deviceEpoch = delta.epoch;
+    }
+    
+    renderDeviceCard(device) {
+        return `
             <div class="configured-device-card">
                 <div class="device-header">
                     <div class="device-icon-small">
@@ -414,19 +609,20 @@ class DeviceBoxApp {
                     </button>
                 </div>
             </div>
-        `).join('');
+        `;
     }
     
     showConfiguredDevicesError(message) {
-        const container = document.getElementById('configured-devices');
-        if (!container) return;
+        if (!this.configuredList) return;
         
-        container.innerHTML = `
+        // Nach dem Fehler wieder mit dem vollständigen Stand beginnen
+        this.deviceRevision = 0;
+        this.configuredList.message(`
             <div class="error-state">
                 <i class="fas fa-exclamation-triangle"></i>
                 <span>Fehler beim Laden: ${message}</span>
             </div>
-        `;
+        `);
     }
     
     configureDevice(deviceInfoStr) {
@@ -539,15 +735,7 @@ class DeviceBoxApp {
             testResults.style.display = 'block';
             
             try {
-                const response = await fetch(`/api/devices/${this.currentDevice.id}/test`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ test_type: testType })
-                });
-                
-                const result = await response.json();
+                const result = await this.startDeviceTest(this.currentDevice.id, testType);
                 
                 if (result.success) {
                     resultContent.innerHTML = `
@@ -659,45 +847,66 @@ class DeviceBoxApp {
     async updateScannerStatus() {
         try {
             const response = await fetch('/api/scanner/status');
-            const status = await response.json();
-            
-            const statusText = document.getElementById('scanner-status-text');
-            const scannerIndicator = document.querySelector('.scanner-indicator');
-            const scannerDetails = document.getElementById('scanner-details');
-            const connectBtn = document.getElementById('connect-scanner-btn');
-            const disconnectBtn = document.getElementById('disconnect-scanner-btn');
-            const testBtn = document.getElementById('test-scanner-btn');
-            
-            if (status.connected) {
-                statusText.textContent = 'Scanner verbunden';
-                scannerIndicator.className = 'fas fa-circle scanner-indicator connected';
-                
-                // Zeige Details
-                document.getElementById('scanner-path').textContent = status.device_path || '--';
-                document.getElementById('scanner-name').textContent = status.device_name || '--';
-                document.getElementById('scanner-count').textContent = status.scan_count || '0';
-                document.getElementById('scanner-last-scan').textContent = status.last_scan || '--';
-                scannerDetails.style.display = 'block';
-                
-                // Zeige/Verstecke Buttons
-                connectBtn.style.display = 'none';
-                disconnectBtn.style.display = 'inline-block';
-                testBtn.style.display = 'inline-block';
-            } else {
-                statusText.textContent = 'Scanner nicht verbunden';
-                scannerIndicator.className = 'fas fa-circle scanner-indicator disconnected';
-                scannerDetails.style.display = 'none';
-                
-                // Zeige/Verstecke Buttons
-                connectBtn.style.display = 'inline-block';
-                disconnectBtn.style.display = 'none';
-                testBtn.style.display = 'none';
-            }
+            this.renderScannerStatus(await response.json());
         } catch (error) {
             console.error('Fehler beim Aktualisieren des Scanner-Status:', error);
         }
     }
     
+    renderScannerStatus(status) {
+        const statusText = document.getElementById('scanner-status-text');
+        const scannerIndicator = document.querySelector('.scanner-indicator');
+        const scannerDetails = document.getElementById('scanner-details');
+        const connectBtn = document.getElementById('connect-scanner-btn');
+        const disconnectBtn = document.getElementById('disconnect-scanner-btn');
+        const testBtn = document.getElementById('test-scanner-btn');
+        
+        if (status.connected) {
+            statusText.textContent = 'Scanner verbunden';
+            scannerIndicator.className = 'fas fa-circle scanner-indicator connected';
+            
+            // Zeige Details
+            document.getElementById('scanner-path').textContent = status.device_path || '--';
+            document.getElementById('scanner-name').textContent = status.device_name || '--';
+            document.getElementById('scanner-count').textContent = status.scan_count || '0';
+            document.getElementById('scanner-last-scan').textContent = status.last_scan || '--';
+            scannerDetails.style.display = 'block';
+            
+            // Zeige/Verstecke Buttons
+            connectBtn.style.display = 'none';
+            disconnectBtn.style.display = 'inline-block';
+            testBtn.style.display = 'inline-block';
+        } else {
+            statusText.textContent = 'Scanner nicht verbunden';
+            scannerIndicator.className = 'fas fa-circle scanner-indicator disconnected';
+            scannerDetails.style.display = 'none';
+            
+            // Zeige/Verstecke Buttons
+            connectBtn.style.display = 'inline-block';
+            disconnectBtn.style.display = 'none';
+            testBtn.style.display = 'none';
+        }
+    }
+    
+    startScanStream() {
+        if (!window.EventSource || this.scanStream) return;
+        
+        // Live-Scans per Server-Sent Events
+        this.scanStream = new EventSource('/api/scanner/stream');
+        this.scanStream.addEventListener('scan', (event) => {
+            const scan = JSON.parse(event.data);
+            const countElement = document.getElementById('scanner-count');
+            const lastScanElement = document.getElementById('scanner-last-scan');
+            
+            if (countElement) {
+                countElement.textContent = (parseInt(countElement.textContent, 10) || 0) + 1;
+            }
+            if (lastScanElement) {
+                lastScanElement.textContent = scan.code;
+            }
+        });
+    }
+    
     async saveDeviceConfig() {
         if (!this.currentDevice) {
             this.showToast('Kein Gerät ausgewählt', 'error');
@@ -771,28 +980,65 @@ class DeviceBoxApp {
         }
     }
     
-    async testDevice(deviceId) {
-        try {
-            const response = await fetch(`/api/devices/${deviceId}/test`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    test_type: 'test_print'
-                })
-            });
+    async startDeviceTest(deviceId, testType) {
+        // Test läuft als Job im Hintergrund, die Anfrage kehrt sofort zurück
+        const response = await fetch(`/api/devices/${deviceId}/test`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ test_type: testType })
+        });
+        
+        const data = await response.json();
+        
+        if (!response.ok || data.error) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+        
+        return this.waitForJob(data.job_id);
+    }
+    
+    waitForJob(jobId) {
+        // Ergebnis per Live-Stream, ohne EventSource bzw. bei Abbruch per Abfrage
+        if (!window.EventSource) {
+            return this.pollJob(jobId);
+        }
+        
+        return new Promise((resolve, reject) => {
+            const stream = new EventSource(`/api/jobs/${jobId}/stream`);
+            const finish = (job) => {
+                stream.close();
+                resolve(job.result || {});
+            };
             
-            const data = await response.json();
+            stream.addEventListener('state', (event) => {
+                const job = JSON.parse(event.data);
+                if (job.state === 'done') {
+                    finish(job);
+                }
+            });
+            stream.addEventListener('done', (event) => finish(JSON.parse(event.data)));
+            stream.onerror = () => {
+                stream.close();
+                this.pollJob(jobId).then(resolve, reject);
+            };
+        });
+    }
+    
+    async pollJob(jobId) {
+        while (true) {
+            const response = await fetch(`/api/jobs/${jobId}`);
+            const job = await response.json();
             
-            if (data.error) {
-                throw new Error(data.error);
+            if (job.error) {
+                throw new Error(job.error);
+            }
+            if (job.state === 'done') {
+                return job.result || {};
             }
             
-            this.showToast(data.message, data.success ? 'success' : 'error');
-            
-        } catch (error) {
-            this.showToast(`Fehler beim Testen: ${error.message}`, 'error');
+            await new Promise((resolve) => setTimeout(resolve, 500));
         }
     }
     
@@ -833,6 +1079,7 @@ class DeviceBoxApp {
         // Refresh system status every 30 seconds
         this.refreshInterval = setInterval(() => {
             this.loadSystemStatus();
+            this.loadConfiguredDevices();
         }, 30000);
     }
     
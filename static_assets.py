@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+DeviceBox Statische Dateien
+Beim Start erhält jede Datei unter static/ eine URL mit Inhalts-Hash
+(js/app.3f2a9c1b7d4e.js) und Textdateien werden einmalig mit gzip und
+brotli vorkomprimiert (app.js.gz, app.js.br neben dem Original).
+Gehashte URLs werden als unveränderlich ausgeliefert; die Tablets laden
+sie erst nach einer Änderung neu. Die Kodierung richtet sich nach
+Accept-Encoding des Browsers.
+"""
+
+import os
+import gzip
+import hashlib
+import mimetypes
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, abort, request, send_file
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Dateitypen, für die sich Vorkomprimieren lohnt
+COMPRESSIBLE = ('.js', '.css', '.svg', '.json', '.map', '.txt', '.html')
+MIN_COMPRESS_SIZE = 256
+HASH_LENGTH = 12
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Kodierung -> Dateiendung der vorkomprimierten Variante (bevorzugte zuerst)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    # mtime=0: gleicher Inhalt ergibt die gleiche Datei
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _write_atomic(path: str, data: bytes):
+    # Mehrere Worker bauen gleichzeitig: erst vollständig schreiben, dann umbenennen
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Kodierungen aus Accept-Encoding mit ihrem q-Wert"""
+    encodings = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+class StaticAssets:
+    """Gehashte URLs, Vorkomprimierung und Auslieferung für den static-Ordner einer Flask-App"""
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.static_folder = None
+        # Pfad relativ zu static -> gehashter Pfad und umgekehrt
+        self.fingerprints = {}
+        self.originals = {}
+        # Pfad relativ zu static -> verfügbare Kodierungen
+        self.variants = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        self.static_folder = app.static_folder
+        self.build()
+        app.view_functions['static'] = self.serve
+
+        @app.url_defaults
+        def fingerprint_static(endpoint, values):
+            if endpoint == 'static' and 'filename' in values:
+                values['filename'] = self.fingerprints.get(values['filename'], values['filename'])
+
+    def build(self):
+        """Hasht alle Dateien und legt fehlende oder veraltete komprimierte Varianten an"""
+        can_write = True
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                if name.endswith(('.gz', '.br', '.tmp')):
+                    continue
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    data = f.read()
+
+                digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+                stem, ext = os.path.splitext(filename)
+                fingerprinted = f"{stem}.{digest}{ext}"
+                self.fingerprints[filename] = fingerprinted
+                self.originals[fingerprinted] = filename
+
+                if can_write and ext in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE:
+                    try:
+                        self.variants[filename] = self._precompress(path, data)
+                    except OSError as e:
+                        print(f"Statische Dateien können nicht vorkomprimiert werden: {e}")
+                        can_write = False
+
+    @staticmethod
+    def _precompress(path: str, data: bytes) -> Tuple[str, ...]:
+        available = []
+        mtime = os.path.getmtime(path)
+        for encoding, suffix in ENCODINGS:
+            if encoding == 'br' and not BROTLI_AVAILABLE:
+                continue
+            variant = path + suffix
+            if not os.path.exists(variant) or os.path.getmtime(variant) < mtime:
+                compressed = _compress(data, encoding)
+                if len(compressed) >= len(data):
+                    continue
+                _write_atomic(variant, compressed)
+            available.append(encoding)
+        return tuple(available)
+
+    def choose_encoding(self, filename: str, header: str) -> Optional[str]:
+        """Beste vorhandene Variante, die der Browser akzeptiert"""
+        available = self.variants.get(filename)
+        if not available or not header:
+            return None
+        accepted = accepted_encodings(header)
+        for encoding, _ in ENCODINGS:
+            if encoding in available and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return encoding
+        return None
+
+    def serve(self, filename: str):
+        """Ersetzt die static-Route von Flask"""
+        original = self.originals.get(filename)
+        immutable = original is not None
+        filename = original or filename
+
+        path = os.path.realpath(os.path.join(self.static_folder, filename))
+        if not path.startswith(os.path.realpath(self.static_folder) + os.sep) or not os.path.isfile(path):
+            abort(404)
+
+        encoding = self.choose_encoding(filename, request.headers.get('Accept-Encoding', ''))
+        if encoding:
+            suffix = dict(ENCODINGS)[encoding]
+            # Typ der Originaldatei, nicht application/gzip
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_file(path + suffix, mimetype=mimetype, conditional=True)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_file(path, conditional=True)
+
+        if self.variants.get(filename):
+            response.headers['Vary'] = 'Accept-Encoding'
+        # Ungehashte URLs bei jedem Laden per ETag prüfen
+        response.headers['Cache-Control'] = IMMUTABLE if immutable else 'no-cache'
+        return response
+
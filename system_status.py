@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+DeviceBox System
+Systeminformationen und Update-Mechanismus, gemeinsam genutzt von der
+Weboberfläche, dem Geräte-Prozess (POS-Schnittstelle) und dem CLI.
+"""
+
+import os
+import sys
+import subprocess
+import platform
+import psutil
+from datetime import datetime
+from typing import Optional
+
+class DeviceBoxApp:
+    def __init__(self):
+        self.version = "1.0.0"
+        self.github_repo = os.getenv('GITHUB_REPO', 'Musik-Wieland/DeviceBox')
+        self.app_name = os.getenv('APP_NAME', 'devicebox')
+        self.update_in_progress = False
+        # Referenzwert, damit cpu_interval=None sofort eine echte Last liefert
+        psutil.cpu_percent(interval=None)
+        
+    def get_system_info(self, cpu_interval: Optional[float] = 1):
+        """Sammelt Systeminformationen (cpu_interval=None: CPU-Last seit dem letzten Aufruf, ohne zu warten)"""
+        try:
+            cpu_percent = psutil.cpu_percent(interval=cpu_interval)
+            memory = psutil.virtual_memory()
+            disk = psutil.disk_usage('/')
+            
+            # Raspberry Pi spezifische Informationen
+            try:
+                with open('/proc/cpuinfo', 'r') as f:
+                    cpuinfo = f.read()
+                    model = [line for line in cpuinfo.split('\n') if 'Model' in line][0].split(':')[1].strip()
+            except:
+                model = "Raspberry Pi"
+            
+            return {
+                'hostname': platform.node(),
+                'platform': platform.platform(),
+                'cpu_model': model,
+                'cpu_percent': cpu_percent,
+                'memory_total': memory.total,
+                'memory_used': memory.used,
+                'memory_percent': memory.percent,
+                'disk_total': disk.total,
+                'disk_used': disk.used,
+                'disk_percent': (disk.used / disk.total) * 100,
+                'uptime': self.get_uptime(),
+                'temperature': self.get_cpu_temperature(),
+                'timestamp': datetime.now().isoformat()
+            }
+        except Exception as e:
+            return {'error': str(e)}
+    
+    def get_uptime(self):
+        """Gibt die Uptime des Systems zurück"""
+        try:
+            with open('/proc/uptime', 'r') as f:
+                uptime_seconds = float(f.read().split()[0])
+                return uptime_seconds
+        except:
+            return 0
+    
+    def get_cpu_temperature(self):
+        """Gibt die CPU-Temperatur zurück (Raspberry Pi)"""
+        try:
+            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
+                temp = int(f.read()) / 1000.0
+                return temp
+        except:
+            return None
+    
+    def check_for_updates(self):
+        """Prüft auf verfügbare Updates mit professionellem Update-System"""
+        try:
+            # Verwende das neue professionelle Update-System
+            import subprocess
+            result = subprocess.run([
+                sys.executable, 
+                os.path.join(os.path.dirname(__file__), 'update_system.py'), 
+                'check'
+            ], capture_output=True, text=True, timeout=30)
+            
+            if result.returncode == 0:
+                try:
+                    import json
+                    update_info = json.loads(result.stdout)
+                    return update_info
+                except json.JSONDecodeError as e:
+                    return {'error': f'JSON-Parse-Fehler: {e}'}
+            else:
+                return {'error': f'Update-Check fehlgeschlagen: {result.stderr}'}
+        except Exception as e:
+            return {'error': str(e)}
+    
+    def perform_update(self):
+        """Führt das Update mit professionellem Update-System durch"""
+        if self.update_in_progress:
+            return {'error': 'Update bereits in Bearbeitung'}
+        
+        self.update_in_progress = True
+        
+        try:
+            # Verwende das neue professionelle Update-System
+            update_script = os.path.join(os.path.dirname(__file__), 'update_system.py')
+            
+            if not os.path.exists(update_script):
+                return {'error': 'Update-Skript nicht gefunden'}
+            
+            # Prüfe ob wir bereits als root laufen
+            if os.geteuid() == 0:
+                # Als root: Direkt ausführen
+                cmd = [sys.executable, update_script, 'update']
+                print(f"Führe Update aus als root: {' '.join(cmd)}")
+            else:
+                # Nicht als root: Mit sudo ausführen
+                # Finde sudo-Pfad
+                sudo_paths = ['/usr/bin/sudo', '/bin/sudo', '/sbin/sudo']
+                sudo_path = None
+                
+                for path in sudo_paths:
+                    if os.path.exists(path):
+                        sudo_path = path
+                        break
+                
+                if sudo_path:
+                    cmd = [sudo_path, sys.executable, update_script, 'update']
+                    print(f"Führe Update aus mit sudo: {' '.join(cmd)}")
+                else:
+                    # Fallback: Versuche sudo über PATH zu finden
+                    cmd = ['sudo', sys.executable, update_script, 'update']
+                    print(f"Führe Update aus mit sudo (PATH): {' '.join(cmd)}")
+            
+            # Führe das Update aus
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            
+            # Logge die Ausgabe für Debugging
+            print(f"Update-Skript Return Code: {result.returncode}")
+            print(f"Update-Skript Ausgabe: {result.stdout}")
+            if result.stderr:
+                print(f"Update-Skript Fehler: {result.stderr}")
+            
+            if result.returncode == 0:
+                # Prüfe ob wirklich ein Update durchgeführt wurde
+                if "System ist bereits aktuell" in result.stdout:
+                    return {'success': True, 'message': 'System ist bereits aktuell'}
+                elif "Update erfolgreich" in result.stdout or "Installation abgeschlossen" in result.stdout:
+                    return {'success': True, 'message': 'Update erfolgreich abgeschlossen'}
+                else:
+                    return {'success': True, 'message': 'Update durchgeführt - siehe Logs für Details'}
+            else:
+                # Detaillierte Fehleranalyse
+                error_msg = result.stderr if result.stderr else result.stdout
+                
+                if "Permission denied" in error_msg:
+                    return {'error': 'Berechtigungsfehler: Update benötigt Root-Rechte. Bitte führen Sie das Update manuell mit "sudo python3 update_system.py update" aus.'}
+                elif "No such file or directory" in error_msg:
+                    return {'error': 'Datei nicht gefunden: Update-Skript oder Abhängigkeiten fehlen.'}
+                elif "Timeout" in error_msg:
+                    return {'error': 'Update-Timeout: Das Update dauerte zu lange.'}
+                else:
+                    return {'error': f'Update fehlgeschlagen: {error_msg}'}
+                    
+        except subprocess.TimeoutExpired:
+            return {'error': 'Update-Timeout: Das Update dauerte zu lange (über 5 Minuten)'}
+        except FileNotFoundError as e:
+            return {'error': f'Datei nicht gefunden: {str(e)}'}
+        except PermissionError as e:
+            return {'error': f'Berechtigungsfehler: {str(e)}'}
+        except Exception as e:
+            return {'error': f'Unerwarteter Fehler: {str(e)}'}
+        finally:
+            self.update_in_progress = False
+
+# Globale App-Instanz
+devicebox = DeviceBoxApp()
@@ -0,0 +1,610 @@
+#!/usr/bin/env python3
+"""
+DeviceBox ZVT
+ZVT-Protokoll (Kassen-Terminal-Schnittstelle) für EC-Terminals wie Ingenico,
+Verifone und PAX. Die Verbindung zum Terminal bleibt bestehen; eingehende
+APDUs werden von einer Lese-Task zerlegt, sofort quittiert und in eine
+Warteschlange gelegt, auch wenn mehrere in einem Paket ankommen.
+Terminals hängen per TCP/IP oder seriell (DLE/STX-Rahmen mit CRC) an.
+"""
+
+import time
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from card_terminal import (TerminalDriver, ProgressCallback,
+                           STATE_WAITING_FOR_CARD, STATE_AUTHORIZING)
+from serial_transport import SerialSettings, SerialTransportError, serial_ports
+
+DEFAULT_PORT = 20007
+
+# Serielle Rahmen: DLE STX <APDU> DLE ETX CRC, Quittung mit einem ACK-/NAK-Byte
+DLE = 0x10
+STX = 0x02
+ETX = 0x03
+LINE_ACK = 0x06
+LINE_NAK = 0x15
+
+# APDU-Steuerfelder (Klasse, Instruktion)
+ACK = (0x80, 0x00)
+NAK = 0x84
+CMD_REGISTRATION = (0x06, 0x00)
+CMD_AUTHORIZATION = (0x06, 0x01)
+CMD_LOG_OFF = (0x06, 0x02)
+CMD_ABORT = (0x06, 0xB0)
+CMD_STATUS_ENQUIRY = (0x05, 0x01)
+PT_COMPLETION = (0x06, 0x0F)
+PT_ABORT = (0x06, 0x1E)
+PT_STATUS_INFORMATION = (0x04, 0x0F)
+PT_INTERMEDIATE_STATUS = (0x04, 0xFF)
+PT_PRINT_LINE = (0x06, 0xD1)
+PT_PRINT_TEXT_BLOCK = (0x06, 0xD3)
+
+# Registrierung: Terminal sendet Zwischenstatus (0x08), Kasse steuert die Zahlung (0x10)
+REGISTRATION_CONFIG = 0x18
+CURRENCY_CODES = {'EUR': 978, 'CHF': 756, 'USD': 840, 'GBP': 826}
+
+# Zwischenstatus (04 FF) -> Anzeigetext
+INTERMEDIATE_TEXTS = {
+    0x00: 'Terminal wartet auf Betragsbestätigung',
+    0x01: 'Bitte Anzeigen auf dem PIN-Pad beachten',
+    0x02: 'Bitte Anzeigen auf dem PIN-Pad beachten',
+    0x03: 'Vorgang nicht möglich',
+    0x04: 'Terminal wartet auf Antwort vom Rechenzentrum',
+    0x05: 'Terminal sendet automatischen Storno',
+    0x06: 'Terminal sendet Nachbuchungen',
+    0x07: 'Karte nicht zugelassen',
+    0x08: 'Karte unbekannt',
+    0x09: 'Karte verfallen',
+    0x0A: 'Karte einstecken',
+    0x0B: 'Bitte Karte entnehmen',
+    0x0C: 'Karte nicht lesbar',
+    0x0D: 'Vorgang abgebrochen',
+    0x0E: 'Vorgang wird bearbeitet, bitte warten',
+    0x0F: 'Terminal leitet automatischen Kassenabschluss ein',
+    0x10: 'Karte ungültig',
+    0x11: 'Guthabenanzeige',
+    0x12: 'Systemfehler',
+    0x13: 'Zahlung nicht möglich',
+    0x14: 'Guthaben nicht ausreichend',
+    0x15: 'Geheimzahl falsch',
+    0x16: 'Limit nicht ausreichend',
+    0x17: 'Bitte warten',
+    0x18: 'Geheimzahl zu oft falsch',
+    0x19: 'Kartendaten falsch',
+    0x1A: 'Servicemodus',
+    0x1B: 'Autorisierung erfolgt',
+    0x1C: 'Zahlung erfolgt',
+    0x1D: 'Autorisierung nicht möglich',
+}
+WAITING_FOR_CARD_STATUS = (0x01, 0x02, 0x0A, 0x0B)
+AUTHORIZING_STATUS = (0x04, 0x0E, 0x17, 0x1B, 0x1C)
+
+# Ergebniscodes (BMP 27, Abbruch 06 1E)
+RESULT_TEXTS = {
+    0x00: 'Erfolgreich',
+    0x05: 'Zahlung abgelehnt',
+    0x64: 'Karte nicht lesbar',
+    0x65: 'Kartendaten nicht vorhanden',
+    0x66: 'Verarbeitungsfehler',
+    0x67: 'Funktion nicht zulässig für EC- und Maestro-Karten',
+    0x68: 'Funktion nicht zulässig für Kredit- und Tankkarten',
+    0x6A: 'Abschluss nicht möglich',
+    0x6B: 'Zahlung nicht möglich (Sperre)',
+    0x6C: 'Abbruch über Timeout oder Abbruchtaste',
+    0x6F: 'Falsche Währung',
+    0x78: 'Karte gesperrt',
+    0x9A: 'ZVT-Protokoll nicht vollständig',
+    0x9C: 'Wiederholung',
+    0xA0: 'Empfänger nicht bereit',
+    0xB4: 'Bereits gebucht',
+    0xB5: 'Storno nicht möglich',
+    0xFF: 'Systemfehler',
+}
+
+# BMP -> Länge (int = fest, 'LL'/'LLL' = variable Länge mit Fx-Längenbytes)
+BMP_LENGTHS = {
+    0x01: 1, 0x02: 1, 0x03: 1, 0x04: 6, 0x05: 1, 0x0B: 3, 0x0C: 3, 0x0D: 2, 0x0E: 2,
+    0x17: 2, 0x19: 1, 0x22: 'LL', 0x23: 'LL', 0x24: 'LLL', 0x27: 1, 0x29: 4, 0x2A: 15,
+    0x2D: 'LL', 0x2E: 'LL', 0x37: 3, 0x3A: 2, 0x3B: 8, 0x3C: 'LLL', 0x3D: 3, 0x49: 2,
+    0x60: 'LLL', 0x87: 2, 0x88: 3, 0x8A: 1, 0x8B: 'LL', 0x8C: 1, 0x9A: 'LLL', 0xA0: 1,
+    0xA7: 'LL', 0xAA: 3, 0xAF: 'LLL', 0xBA: 5, 0xD0: 1, 0xD1: 'LL', 0xD2: 'LL',
+    0xD3: 1, 0xE0: 1, 0xE1: 'LL', 0xE2: 'LL', 0xE3: 'LL', 0xE4: 'LL', 0xE5: 'LL',
+    0xE6: 'LL', 0xE7: 'LL', 0xE8: 'LL', 0xE9: 'LL', 0xEA: 'LL', 0xEB: 'LL', 0xEC: 'LL',
+    0xED: 'LL', 0xEE: 'LL', 0xF0: 'LLL', 0xF1: 'LL', 0xF2: 'LL', 0xF3: 'LL', 0xF4: 'LL',
+}
+
+
+class ZvtError(Exception):
+    """Fehler in der ZVT-Kommunikation"""
+
+
+def bcd_encode(value: int, length: int) -> bytes:
+    """Zahl als gepacktes BCD mit fester Byte-Länge"""
+    digits = str(value).rjust(length * 2, '0')
+    if len(digits) > length * 2:
+        raise ValueError(f'Wert {value} passt nicht in {length} BCD-Bytes')
+    return bytes.fromhex(digits)
+
+
+def bcd_decode(data: bytes) -> str:
+    """Gepacktes BCD als Ziffernfolge (F-Auffüllung wird entfernt)"""
+    return data.hex().rstrip('f')
+
+
+def encode_apdu(command: Tuple[int, int], data: bytes = b'') -> bytes:
+    """APDU: Klasse, Instruktion, Länge (ab 255 Byte erweitert) und Daten"""
+    if len(data) < 0xFF:
+        length = bytes([len(data)])
+    else:
+        length = b'\xFF' + len(data).to_bytes(2, 'little')
+    return bytes(command) + length + data
+
+
+def decode_apdu(apdu: bytes) -> Tuple[Tuple[int, int], bytes]:
+    """Zerlegt eine vollständige APDU in Steuerfeld und Daten"""
+    length, start = apdu[2], 3
+    if length == 0xFF:
+        length, start = int.from_bytes(apdu[3:5], 'little'), 5
+    return (apdu[0], apdu[1]), apdu[start:start + length]
+
+
+def crc_ccitt(data: bytes) -> int:
+    """CRC-CCITT (Polynom 0x1021, bitgespiegelt, Startwert 0) wie im seriellen ZVT-Rahmen"""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x8408 if crc & 1 else crc >> 1
+    return crc
+
+
+def encode_serial_frame(apdu: bytes) -> bytes:
+    """Serieller Rahmen mit verdoppelten DLE-Bytes und CRC über APDU und ETX"""
+    crc = crc_ccitt(apdu + bytes([ETX]))
+    return (bytes([DLE, STX]) + apdu.replace(b'\x10', b'\x10\x10') +
+            bytes([DLE, ETX]) + crc.to_bytes(2, 'little'))
+
+
+class SerialFrameDecoder:
+    """Zerlegt den seriellen Datenstrom in Rahmen und Quittungsbytes"""
+
+    def __init__(self):
+        self._state = 'idle'
+        self._frame = bytearray()
+        self._crc = bytearray()
+
+    def feed(self, data: bytes) -> List[Tuple[str, Optional[bytes]]]:
+        """Liefert Ereignisse ('ack'|'nak'|'frame'|'bad', APDU oder None)"""
+        events = []
+        for byte in data:
+            state = self._state
+            if state == 'idle':
+                if byte == DLE:
+                    self._state = 'start'
+                elif byte == LINE_ACK:
+                    events.append(('ack', None))
+                elif byte == LINE_NAK:
+                    events.append(('nak', None))
+            elif state == 'start':
+                self._state = 'frame' if byte == STX else 'idle'
+                self._frame = bytearray()
+            elif state == 'frame':
+                if byte == DLE:
+                    self._state = 'escape'
+                else:
+                    self._frame.append(byte)
+            elif state == 'escape':
+                if byte == DLE:
+                    self._frame.append(DLE)
+                    self._state = 'frame'
+                elif byte == ETX:
+                    self._crc = bytearray()
+                    self._state = 'crc'
+                else:
+                    # Rahmenfehler
+                    events.append(('bad', None))
+                    self._state = 'idle'
+            else:
+                self._crc.append(byte)
+                if len(self._crc) == 2:
+                    self._state = 'idle'
+                    frame = bytes(self._frame)
+                    if int.from_bytes(self._crc, 'little') == crc_ccitt(frame + bytes([ETX])) and len(frame) >= 3:
+                        events.append(('frame', frame))
+                    else:
+                        events.append(('bad', None))
+        return events
+
+
+def _var_length(data: bytes, position: int, digits: int) -> Tuple[int, int]:
+    """Liest eine LL/LLL-Längenangabe (Bytes 0xF0-0xF9)"""
+    length = 0
+    for index in range(digits):
+        length = length * 10 + (data[position + index] & 0x0F)
+    return length, position + digits
+
+
+def _tlv_length(data: bytes, position: int) -> Tuple[int, int]:
+    first = data[position]
+    if first < 0x80:
+        return first, position + 1
+    count = first & 0x7F
+    return int.from_bytes(data[position + 1:position + 1 + count], 'big'), position + 1 + count
+
+
+def parse_bmps(data: bytes) -> Dict[int, bytes]:
+    """Zerlegt die Datenfelder (BMPs) einer Statusinformation"""
+    fields = {}
+    position = 0
+    while position < len(data):
+        bmp = data[position]
+        position += 1
+        if bmp == 0x06:
+            # TLV-Container
+            length, position = _tlv_length(data, position)
+        else:
+            spec = BMP_LENGTHS.get(bmp)
+            if spec is None:
+                # Unbekanntes Feld: Länge nicht bestimmbar
+                break
+            if spec == 'LL':
+                length, position = _var_length(data, position, 2)
+            elif spec == 'LLL':
+                length, position = _var_length(data, position, 3)
+            else:
+                length = spec
+        fields[bmp] = data[position:position + length]
+        position += length
+    return fields
+
+
+def describe_status(fields: Dict[int, bytes]) -> Dict:
+    """Wandelt die BMPs einer Statusinformation in lesbare Felder"""
+    result = {}
+    if 0x27 in fields:
+        code = fields[0x27][0]
+        result['result_code'] = code
+        result['result_text'] = RESULT_TEXTS.get(code, f'Fehler 0x{code:02X}')
+    if 0x04 in fields:
+        result['amount'] = int(bcd_decode(fields[0x04]) or 0) / 100
+    if 0x0B in fields:
+        result['trace_number'] = bcd_decode(fields[0x0B])
+    if 0x87 in fields:
+        result['receipt_number'] = bcd_decode(fields[0x87])
+    if 0x88 in fields:
+        result['turnover_number'] = bcd_decode(fields[0x88])
+    if 0x29 in fields:
+        result['terminal_id'] = bcd_decode(fields[0x29])
+    if 0x2A in fields:
+        result['vu_number'] = fields[0x2A].decode('latin-1').strip()
+    if 0x0C in fields and 0x0D in fields:
+        clock, day = bcd_decode(fields[0x0C]), bcd_decode(fields[0x0D])
+        result['time'] = f'{day[2:4]}.{day[0:2]}. {clock[0:2]}:{clock[2:4]}:{clock[4:6]}'
+    if 0x22 in fields:
+        # PAN ist vom Terminal maskiert (E statt Ziffern)
+        result['card_number'] = fields[0x22].hex().rstrip('f').upper().replace('E', '*')
+    if 0x8B in fields:
+        result['card_name'] = fields[0x8B].decode('latin-1').rstrip('\x00')
+    if 0x8A in fields:
+        result['card_type'] = fields[0x8A][0]
+    if 0x3B in fields:
+        result['authorization_code'] = fields[0x3B].decode('latin-1').rstrip('\x00')
+    return result
+
+
+class ZvtConnection:
+    """TCP-Verbindung zum Terminal mit Lese-Task und automatischer Quittung"""
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT, connect_timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.reader = None
+        self.writer = None
+        self.queue = None
+        self._read_task = None
+        self.connected_at = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.writer is not None and self._read_task is not None and not self._read_task.done()
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.connect_timeout)
+        self.queue = asyncio.Queue()
+        self._read_task = asyncio.ensure_future(self._read_loop())
+        self.connected_at = time.time()
+
+    async def read_apdu(self) -> Tuple[Tuple[int, int], bytes]:
+        header = await self.reader.readexactly(3)
+        length = header[2]
+        if length == 0xFF:
+            length = int.from_bytes(await self.reader.readexactly(2), 'little')
+        data = await self.reader.readexactly(length) if length else b''
+        return (header[0], header[1]), data
+
+    async def _read_loop(self):
+        try:
+            while True:
+                command, data = await self.read_apdu()
+                if command != ACK and command[0] != NAK:
+                    # Meldungen des Terminals sofort quittieren
+                    self.writer.write(encode_apdu(ACK))
+                await self.queue.put((command, data))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            await self.queue.put((None, str(e) or 'Verbindung vom Terminal getrennt'))
+
+    async def send(self, command: Tuple[int, int], data: bytes = b''):
+        self.writer.write(encode_apdu(command, data))
+        await self.writer.drain()
+
+    async def receive(self, timeout: Optional[float] = None) -> Tuple[Tuple[int, int], bytes]:
+        """Nächste APDU vom Terminal (ZvtError bei Verbindungsabbruch)"""
+        command, data = await asyncio.wait_for(self.queue.get(), timeout)
+        if command is None:
+            raise ZvtError(data)
+        return command, data
+
+    async def close(self):
+        if self._read_task is not None:
+            self._read_task.cancel()
+        if self.writer is not None:
+            try:
+                self.writer.close()
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+        self.reader = self.writer = self._read_task = None
+
+    def describe(self) -> Dict:
+        return {'host': self.host, 'port': self.port}
+
+
+class ZvtSerialConnection:
+    """Serielle Verbindung zum Terminal über den asynchronen Port-Pool"""
+
+    def __init__(self, serial_port: str, config: SerialSettings,
+                 line_timeout: float = 1.0, retries: int = 3):
+        self.serial_port = serial_port
+        self.config = config
+        self.line_timeout = line_timeout
+        self.retries = retries
+        self.transport = None
+        self.queue = None
+        self.connected_at = None
+        self._read_task = None
+        self._line_ack = None
+        self._send_lock = None
+
+    @property
+    def is_open(self) -> bool:
+        return (self.transport is not None and self.transport.is_open and
+                self._read_task is not None and not self._read_task.done())
+
+    async def open(self):
+        try:
+            self.transport = await serial_ports.get(self.serial_port, self.config)
+        except SerialTransportError as e:
+            raise ZvtError(str(e))
+        self.transport.reset_input()
+        self.queue = asyncio.Queue()
+        self._send_lock = asyncio.Lock()
+        self._read_task = asyncio.ensure_future(self._read_loop())
+        self.connected_at = time.time()
+
+    async def _read_loop(self):
+        decoder = SerialFrameDecoder()
+        try:
+            while True:
+                for event, apdu in decoder.feed(await self.transport.read_some()):
+                    if event in ('ack', 'nak'):
+                        if self._line_ack is not None and not self._line_ack.done():
+                            self._line_ack.set_result(event == 'ack')
+                    elif event == 'bad':
+                        self.transport.write(bytes([LINE_NAK]))
+                    else:
+                        self.transport.write(bytes([LINE_ACK]))
+                        command, data = decode_apdu(apdu)
+                        if command != ACK and command[0] != NAK:
+                            # Quittung über eigene Task, die Lese-Task wartet nie auf das Terminal
+                            asyncio.ensure_future(self.send(ACK))
+                        await self.queue.put((command, data))
+        except SerialTransportError as e:
+            await self.queue.put((None, str(e)))
+
+    async def send(self, command: Tuple[int, int], data: bytes = b''):
+        """Sendet einen Rahmen und wartet auf das ACK-Byte (mit Wiederholung bei NAK)"""
+        frame = encode_serial_frame(encode_apdu(command, data))
+        async with self._send_lock:
+            for _ in range(self.retries):
+                self._line_ack = asyncio.get_running_loop().create_future()
+                self.transport.write(frame)
+                try:
+                    if await asyncio.wait_for(self._line_ack, self.line_timeout):
+                        return
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    self._line_ack = None
+        raise ZvtError('Terminal bestätigt die Übertragung nicht')
+
+    async def receive(self, timeout: Optional[float] = None) -> Tuple[Tuple[int, int], bytes]:
+        command, data = await asyncio.wait_for(self.queue.get(), timeout)
+        if command is None:
+            raise ZvtError(data)
+        return command, data
+
+    async def close(self):
+        if self._read_task is not None:
+            self._read_task.cancel()
+        if self.transport is not None:
+            await serial_ports.close(self.serial_port)
+        self.transport = self._read_task = None
+
+    def describe(self) -> Dict:
+        return {'serial_port': self.serial_port, 'settings': self.config.to_dict()}
+
+
+class ZvtClient:
+    """
+    ZVT-Kasse (ECR) mit dauerhafter Verbindung pro Terminal.
+
+    Die Verbindung wird beim ersten Befehl aufgebaut, einmal registriert und
+    danach wiederverwendet; nur nach einem Fehler wird neu verbunden.
+    """
+
+    def __init__(self, connection, password: str = '000000', currency: str = 'EUR',
+                 ack_timeout: float = 5.0):
+        self.connection = connection
+        self.password = password
+        self.currency = currency
+        self.ack_timeout = ack_timeout
+        self.registered = False
+        self.last_error = None
+        self.connects = 0
+        self._lock = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Lock erst in der Loop anlegen
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def _ensure_connected(self):
+        if self.connection.is_open and self.registered:
+            return
+        await self.connection.close()
+        self.registered = False
+        await self.connection.open()
+        self.connects += 1
+        await self._register()
+
+    async def _drain(self):
+        """Verwirft liegengebliebene Meldungen eines früheren Vorgangs"""
+        while not self.connection.queue.empty():
+            command, data = self.connection.queue.get_nowait()
+            if command is None:
+                raise ZvtError(data)
+
+    async def _command(self, command: Tuple[int, int], data: bytes = b''):
+        """Sendet einen Befehl und wartet auf die Quittung (80 00)"""
+        await self.connection.send(command, data)
+        response, payload = await self.connection.receive(self.ack_timeout)
+        if response[0] == NAK:
+            raise ZvtError(f'Terminal hat den Befehl abgelehnt (Code 0x{response[1]:02X})')
+        if response != ACK:
+            raise ZvtError(f'Unerwartete Antwort {response[0]:02X} {response[1]:02X}')
+
+    async def _register(self):
+        data = (bcd_encode(int(self.password), 3) + bytes([REGISTRATION_CONFIG]) +
+                bcd_encode(CURRENCY_CODES.get(self.currency, 978), 2))
+        await self._command(CMD_REGISTRATION, data)
+        await self._wait_completion(lambda state, message: None)
+        self.registered = True
+
+    async def _wait_completion(self, progress: ProgressCallback) -> Dict:
+        """Verarbeitet Zwischenmeldungen bis zum Abschluss (06 0F) oder Abbruch (06 1E)"""
+        status = {}
+        while True:
+            command, data = await self.connection.receive()
+            if command == PT_INTERMEDIATE_STATUS and data:
+                code = data[0]
+                text = INTERMEDIATE_TEXTS.get(code, f'Status 0x{code:02X}')
+                if code in WAITING_FOR_CARD_STATUS:
+                    progress(STATE_WAITING_FOR_CARD, text)
+                elif code in AUTHORIZING_STATUS:
+                    progress(STATE_AUTHORIZING, text)
+                else:
+                    progress(None, text)
+            elif command == PT_STATUS_INFORMATION:
+                status.update(describe_status(parse_bmps(data)))
+            elif command == PT_COMPLETION:
+                status.setdefault('result_code', 0x00)
+                return status
+            elif command == PT_ABORT:
+                code = data[0] if data else 0xFF
+                status['result_code'] = code
+                status['result_text'] = RESULT_TEXTS.get(code, f'Fehler 0x{code:02X}')
+                return status
+            # Druckzeilen (06 D1/D3) und sonstige Meldungen sind bereits quittiert
+
+    async def run(self, command: Tuple[int, int], data: bytes, progress: ProgressCallback) -> Dict:
+        """Führt einen Terminal-Vorgang exklusiv aus (mit einmaligem Neuaufbau bei toter Verbindung)"""
+        async with self._get_lock():
+            for attempt in (1, 2):
+                try:
+                    await self._ensure_connected()
+                    await self._drain()
+                    await self._command(command, data)
+                    break
+                except (ZvtError, SerialTransportError, ConnectionError, OSError, asyncio.TimeoutError) as e:
+                    self.last_error = str(e) or 'Zeitüberschreitung'
+                    await self.connection.close()
+                    self.registered = False
+                    if attempt == 2:
+                        raise ZvtError(f'Terminal nicht erreichbar: {self.last_error}')
+            return await self._wait_completion(progress)
+
+    async def authorize(self, amount_cents: int, currency: str, progress: ProgressCallback) -> Dict:
+        data = b'\x04' + bcd_encode(amount_cents, 6)
+        data += b'\x49' + bcd_encode(CURRENCY_CODES.get(currency, 978), 2)
+        progress(STATE_WAITING_FOR_CARD, 'Verbindung zum Terminal')
+        return await self.run(CMD_AUTHORIZATION, data, progress)
+
+    async def abort(self):
+        """Bricht den laufenden Vorgang am Terminal ab (06 B0)"""
+        if not self.connection.is_open:
+            return
+        async with self._get_lock():
+            try:
+                await self.connection.send(CMD_ABORT)
+                await asyncio.wait_for(self._wait_completion(lambda state, message: None), 10)
+            except (ZvtError, asyncio.TimeoutError) as e:
+                self.last_error = str(e) or 'Zeitüberschreitung beim Abbruch'
+                await self.connection.close()
+                self.registered = False
+
+    async def close(self):
+        if self.connection.is_open:
+            try:
+                await self.connection.send(CMD_LOG_OFF)
+            except Exception:
+                pass
+        await self.connection.close()
+        self.registered = False
+
+
+class ZvtTerminalDriver(TerminalDriver):
+    """Treiber für die Transaktions-Engine (Einstellung protocol: zvt)"""
+
+    name = 'zvt'
+
+    def __init__(self, client: ZvtClient):
+        self.client = client
+
+    async def authorize(self, amount_cents: int, currency: str, progress: ProgressCallback) -> Dict:
+        status = await self.client.authorize(amount_cents, currency, progress)
+        approved = status.get('result_code') == 0x00
+        status['approved'] = approved
+        status['message'] = 'Zahlung erfolgt' if approved else status.get('result_text', 'Zahlung abgelehnt')
+        return status
+
+    async def abort(self):
+        await self.client.abort()
+
+    async def close(self):
+        await self.client.close()
+
+    def get_status(self) -> Dict:
+        connection = self.client.connection
+        status = {
+            'protocol': self.name,
+            'connected': connection.is_open,
+            'registered': self.client.registered,
+            'connects': self.client.connects,
+            'last_error': self.client.last_error
+        }
+        status.update(connection.describe())
+        return status
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+DeviceBox ZVT-Simulator
+Lokales EC-Terminal für Tests und Messungen ohne Hardware. Beherrscht
+Registrierung, Autorisierung mit Zwischenstatus, Abbruch und Abmeldung.
+
+    python3 zvt_simulator.py --port 20007            # Terminal simulieren
+    python3 zvt_simulator.py --benchmark 200         # Latenz messen
+
+Beträge mit 99 Cent werden abgelehnt, Beträge mit 98 Cent warten bis zum Abbruch.
+"""
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime
+
+from zvt import (ACK, CMD_REGISTRATION, CMD_AUTHORIZATION, CMD_LOG_OFF, CMD_ABORT,
+                 CMD_STATUS_ENQUIRY, PT_COMPLETION, PT_ABORT, PT_STATUS_INFORMATION,
+                 PT_INTERMEDIATE_STATUS, DEFAULT_PORT, ZvtClient, ZvtConnection, bcd_encode, bcd_decode,
+                 encode_apdu)
+
+
+def ll_var(value: bytes, digits: int = 2) -> bytes:
+    """Stellt einem Feld variabler Länge die LL/LLL-Längenangabe voran (Ziffern als 0xF0-0xF9)"""
+    return bytes(0xF0 | int(digit) for digit in str(len(value)).zfill(digits)) + value
+
+
+class TerminalSession:
+    """Eine Kassenverbindung zum simulierten Terminal"""
+
+    def __init__(self, simulator, reader, writer):
+        self.simulator = simulator
+        self.reader = reader
+        self.writer = writer
+        self.acks = asyncio.Queue()
+        self.busy = None
+
+    async def read_apdu(self):
+        header = await self.reader.readexactly(3)
+        length = header[2]
+        if length == 0xFF:
+            length = int.from_bytes(await self.reader.readexactly(2), 'little')
+        data = await self.reader.readexactly(length) if length else b''
+        return (header[0], header[1]), data
+
+    async def send(self, command, data=b'', wait_ack=True):
+        self.writer.write(encode_apdu(command, data))
+        await self.writer.drain()
+        if wait_ack:
+            await asyncio.wait_for(self.acks.get(), 5)
+
+    async def run(self):
+        tasks = set()
+        try:
+            while True:
+                command, data = await self.read_apdu()
+                if command == ACK:
+                    self.acks.put_nowait(command)
+                elif command == CMD_ABORT:
+                    await self.send(ACK, wait_ack=False)
+                    if self.busy is not None:
+                        self.busy.cancel()
+                    else:
+                        await self.send(PT_COMPLETION)
+                elif self.busy is not None:
+                    # Terminal beschäftigt
+                    await self.send((0x84, 0x83), wait_ack=False)
+                else:
+                    task = asyncio.ensure_future(self.handle(command, data))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.writer.close()
+
+    async def handle(self, command, data):
+        if command == CMD_REGISTRATION:
+            await self.send(ACK, wait_ack=False)
+            await self.send(PT_COMPLETION)
+        elif command == CMD_LOG_OFF:
+            await self.send(ACK, wait_ack=False)
+        elif command == CMD_STATUS_ENQUIRY:
+            await self.send(ACK, wait_ack=False)
+            await self.send(PT_COMPLETION)
+        elif command == CMD_AUTHORIZATION:
+            amount = int(bcd_decode(data[1:7])) if data[:1] == b'\x04' else 0
+            await self.send(ACK, wait_ack=False)
+            self.busy = asyncio.current_task()
+            try:
+                await self.authorize(amount)
+            except asyncio.CancelledError:
+                self.busy = None
+                await self.send(PT_ABORT, b'\x6C')
+        else:
+            await self.send((0x84, 0x83), wait_ack=False)
+
+    async def authorize(self, amount):
+        simulator = self.simulator
+        await self.send(PT_INTERMEDIATE_STATUS, b'\x0A')
+        await asyncio.sleep(simulator.card_delay)
+        if amount % 100 == 98:
+            # Kunde legt keine Karte vor
+            await asyncio.Event().wait()
+        await self.send(PT_INTERMEDIATE_STATUS, b'\x0E')
+        await asyncio.sleep(simulator.authorize_delay)
+        # Ab hier nicht mehr abbrechbar
+        self.busy = None
+
+        simulator.trace += 1
+        now = datetime.now()
+        result = 0x05 if amount % 100 == 99 else 0x00
+        status = (b'\x27' + bytes([result]) +
+                  b'\x04' + bcd_encode(amount, 6) +
+                  b'\x0B' + bcd_encode(simulator.trace, 3) +
+                  b'\x0C' + bytes.fromhex(now.strftime('%H%M%S')) +
+                  b'\x0D' + bytes.fromhex(now.strftime('%m%d')) +
+                  b'\x29' + bcd_encode(simulator.terminal_id, 4) +
+                  b'\x87' + bcd_encode(simulator.trace % 10000, 2) +
+                  b'\x22\xF1\xF0' + bytes.fromhex('6726EEEEEEEEEE1234') + b'\xFF' +
+                  b'\x8A\x05' +
+                  b'\x8B' + ll_var(b'girocard'))
+        await self.send(PT_STATUS_INFORMATION, status)
+        if result == 0x00:
+            await self.send(PT_COMPLETION)
+        else:
+            await self.send(PT_ABORT, bytes([result]))
+
+
+class ZvtSimulator:
+    """Simuliertes ZVT-Terminal (TCP)"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 card_delay: float = 1.0, authorize_delay: float = 1.0,
+                 terminal_id: int = 52500001):
+        self.host = host
+        self.port = port
+        self.card_delay = card_delay
+        self.authorize_delay = authorize_delay
+        self.terminal_id = terminal_id
+        self.trace = random.randint(1, 5000)
+        self.connections = 0
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._accept, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def _accept(self, reader, writer):
+        self.connections += 1
+        await TerminalSession(self, reader, writer).run()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+async def benchmark(count: int):
+    """Misst die Dauer von Transaktionen mit dauerhafter und mit jeweils neuer Verbindung"""
+    simulator = await ZvtSimulator(port=0, card_delay=0, authorize_delay=0).start()
+    progress = lambda state, message: None
+
+    client = ZvtClient(ZvtConnection('127.0.0.1', simulator.port))
+    await client.authorize(100, 'EUR', progress)
+    started = time.perf_counter()
+    for _ in range(count):
+        await client.authorize(100, 'EUR', progress)
+    persistent = (time.perf_counter() - started) / count
+    connects = client.connects
+    await client.close()
+
+    started = time.perf_counter()
+    for _ in range(count):
+        client = ZvtClient(ZvtConnection('127.0.0.1', simulator.port))
+        await client.authorize(100, 'EUR', progress)
+        await client.close()
+    reconnect = (time.perf_counter() - started) / count
+
+    await simulator.stop()
+    print(f"{count} Transaktionen")
+    print(f"  dauerhafte Verbindung: {persistent * 1000:.2f} ms pro Transaktion ({connects} Verbindungsaufbau)")
+    print(f"  neue Verbindung:       {reconnect * 1000:.2f} ms pro Transaktion")
+
+
+async def serve(args):
+    simulator = await ZvtSimulator(args.host, args.port, args.card_delay, args.authorize_delay).start()
+    print(f"ZVT-Simulator läuft auf {args.host}:{simulator.port}")
+    await simulator.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DeviceBox ZVT-Simulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--card-delay', type=float, default=1.0)
+    parser.add_argument('--authorize-delay', type=float, default=1.0)
+    parser.add_argument('--benchmark', type=int, metavar='N')
+    args = parser.parse_args()
+    try:
+        if args.benchmark:
+            asyncio.run(benchmark(args.benchmark))
+        else:
+            asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()